@@ -40,8 +40,10 @@ __all__ = [
     "RiskRewardShortOverrides",
 
     "CreateShape",
+    "CreateShapes",
     "GetAllShapes",
     "RemoveShape",
+    "RemoveShapes",
     "RemoveAllShapes",
     "Shapes",
 
@@ -81,8 +83,11 @@ from .shape import (
 
     # Convenience helpers
     CreateShape,
+    CreateShapes,
     GetAllShapes,
+    GetShapesBetween,
     RemoveShape,
+    RemoveShapes,
     RemoveAllShapes,
 
     # Facade
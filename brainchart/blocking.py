@@ -0,0 +1,247 @@
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Modules
+#
+# Keeping blocking work off the backend's event loop.
+#
+# The datafeed routes read files, build pyramids with NumPy/pandas and encode responses. Run on the
+# event loop, one slow request for a large symbol would stall every other request of the worker,
+# static files of the charting library included. BlockingPool runs that work on a bounded thread
+# pool instead (NumPy and the file readers release the GIL; a process pool would not share the
+# process-wide bar cache). LoopLagMonitor measures how late the loop wakes up, i.e. how long ready
+# callbacks wait because something still blocks it.
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
+import os
+import time
+import asyncio
+import functools
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### BlockingPool
+#
+DEFAULT_IO_THREADS   = min(32, (os.cpu_count() or 1) + 4)
+DEFAULT_LAG_INTERVAL = 0.5          # seconds between two event-loop lag probes
+DEFAULT_LAG_WINDOW   = 120          # probes kept for the mean / p99
+
+
+class BlockingPool:
+
+    """
+    Bounded thread pool for the blocking part of the routes.
+
+    Parameters
+    ----------
+
+    max_workers : int, optional
+        Number of threads; further calls queue until one is free.
+        `Default=min(32, cpu_count + 4)`
+    """
+
+    def __init__(self, max_workers:int=DEFAULT_IO_THREADS):
+
+        self.max_workers = max(1, int(max_workers))
+
+        self.submitted   = 0
+        self.completed   = 0
+        self.failed      = 0
+        self.active      = 0
+        self.wait_total  = 0.0
+        self.wait_max    = 0.0
+        self.busy_total  = 0.0
+
+        self._executor   = ThreadPoolExecutor(self.max_workers, thread_name_prefix="brainchart-io")
+        self._lock       = threading.Lock()
+    #
+
+    async def run(self, fn:Callable[..., Any], *args, **kwargs) -> Any:
+
+        """Await `fn(*args, **kwargs)` run on a pool thread."""
+
+        with self._lock:
+
+            self.submitted += 1
+        #
+
+        call = functools.partial(self._call, time.perf_counter(), fn, args, kwargs)
+
+        return (await asyncio.get_running_loop().run_in_executor(self._executor, call))
+    #
+
+    def _call(self, queued:float, fn:Callable[..., Any], args:tuple, kwargs:dict) -> Any:
+
+        start = time.perf_counter()
+        wait  = start - queued
+
+        with self._lock:
+
+            self.active     += 1
+            self.wait_total += wait
+            self.wait_max    = max(self.wait_max, wait)
+        #
+
+        failed = True
+
+        try:
+
+            value  = fn(*args, **kwargs)
+            failed = False
+
+            return (value)
+        #
+        finally:
+
+            with self._lock:
+
+                self.active     -= 1
+                self.completed  += 1
+                self.failed     += failed
+                self.busy_total += time.perf_counter() - start
+            #
+        #
+    #
+
+    def shutdown(self, wait:bool=False):
+
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+    #
+
+    def stats(self) -> dict:
+
+        with self._lock:
+
+            done = max(self.completed, 1)
+
+            return {
+                "threads"      : self.max_workers,
+                "active"       : self.active,
+                "queued"       : self.submitted - self.completed - self.active,
+                "submitted"    : self.submitted,
+                "completed"    : self.completed,
+                "failed"       : self.failed,
+                "mean_wait_ms" : self.wait_total / done * 1e3,
+                "max_wait_ms"  : self.wait_max * 1e3,
+                "mean_busy_ms" : self.busy_total / done * 1e3,
+            }
+        #
+    #
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### LoopLagMonitor
+#
+class LoopLagMonitor:
+
+    """
+    Event-loop lag probe: sleeps `interval` seconds in a loop and records how much later than
+    that it wakes up.
+
+    Parameters
+    ----------
+
+    interval : float, optional
+        Seconds between two probes.
+        `Default=0.5`
+
+    window : int, optional
+        Number of recent probes the mean and p99 are computed over.
+        `Default=120`
+    """
+
+    def __init__(self, interval:float=DEFAULT_LAG_INTERVAL, window:int=DEFAULT_LAG_WINDOW):
+
+        self.interval = float(interval)
+        self.max_lag  = 0.0
+        self.probes   = 0
+
+        self._lags    : deque = deque(maxlen=int(window))
+        self._task    : Optional[asyncio.Task] = None
+    #
+
+    def start(self):
+
+        """Start probing on the running loop (idempotent)."""
+
+        if (self._task is None  or  self._task.done()):
+
+            self._task = asyncio.get_running_loop().create_task(self._probe())
+        #
+    #
+
+    async def stop(self):
+
+        if (self._task is not None):
+
+            self._task.cancel()
+
+            try:
+
+                await self._task
+            #
+            except asyncio.CancelledError:
+
+                pass
+            #
+
+            self._task = None
+        #
+    #
+
+    async def _probe(self):
+
+        loop = asyncio.get_running_loop()
+
+        while (True):
+
+            start = loop.time()
+
+            await asyncio.sleep(self.interval)
+
+            lag           = max(0.0, loop.time() - start - self.interval)
+            self.max_lag  = max(self.max_lag, lag)
+            self.probes  += 1
+
+            self._lags.append(lag)
+        #
+    #
+
+    def stats(self) -> dict:
+
+        lags = sorted(self._lags)
+
+        return {
+            "interval_ms" : self.interval * 1e3,
+            "probes"      : self.probes,
+            "last_ms"     : (self._lags[-1] * 1e3) if (lags) else (None),
+            "mean_ms"     : (sum(lags) / len(lags) * 1e3) if (lags) else (None),
+            "p99_ms"      : (lags[min(len(lags) - 1, int(0.99 * len(lags)))] * 1e3) if (lags) else (None),
+            "max_ms"      : self.max_lag * 1e3,
+        }
+    #
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Instances
+#
+io_pool = BlockingPool(
+    max_workers = int(os.environ.get("BRAINCHART_IO_THREADS", DEFAULT_IO_THREADS)),
+)
+
+loop_lag = LoopLagMonitor(
+    interval = float(os.environ.get("BRAINCHART_LAG_INTERVAL", DEFAULT_LAG_INTERVAL)),
+)
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
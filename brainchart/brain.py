@@ -19,11 +19,11 @@ from typing import List
 from IPython.display import IFrame
 from IPython.display import clear_output
 
-import json
 
 
 from .symbol import Symbol
 from .widget import ChartWidget
+from .registry import write_registry
 #
 ###################################################################################################
 ###################################################################################################
@@ -31,7 +31,10 @@ from .widget import ChartWidget
 #
 class BrainChart:
 
-    def __init__(self, symbols_list:List[Symbol]=None, chart_widget:ChartWidget=None, server_port=8000):
+    def __init__(self, symbols_list:List[Symbol]=None, chart_widget:ChartWidget=None, server_port=8000,
+                 cache_max_bytes:int=None, cache_eviction:str=None,
+                 response_cache_max_bytes:int=None, response_cache_ttl:float=None,
+                 io_threads:int=None, workers:int=1):
         
         if (symbols_list is None):
 
@@ -50,6 +53,34 @@ class BrainChart:
 
         self.server_port = server_port
         self.server_url  = f"http://localhost:{self.server_port}"
+        self.workers     = max(1, int(workers))
+
+        # Backend tuning, handed to the uvicorn process through its environment
+        self.server_env  = {}
+
+        if (cache_max_bytes is not None):
+
+            self.server_env["BRAINCHART_CACHE_MAX_BYTES"] = str(int(cache_max_bytes))
+        #
+        if (cache_eviction is not None):
+
+            self.server_env["BRAINCHART_CACHE_EVICTION"] = str(cache_eviction)
+        #
+        if (response_cache_max_bytes is not None):
+
+            self.server_env["BRAINCHART_RESPONSE_CACHE_MAX_BYTES"] = str(int(response_cache_max_bytes))
+        #
+        if (response_cache_ttl is not None):
+
+            self.server_env["BRAINCHART_RESPONSE_CACHE_TTL"] = str(float(response_cache_ttl))
+        #
+        if (io_threads is not None):
+
+            self.server_env["BRAINCHART_IO_THREADS"] = str(int(io_threads))
+        #
+
+        # Worker processes share the bars through memory-mapped mirrors and live rows through journals (see fast_api)
+        self.server_env["BRAINCHART_WORKERS"] = str(self.workers)
 
 
         self._register()
@@ -68,7 +99,15 @@ class BrainChart:
         for item in os.listdir(datafeed_dir):
 
             item_path = os.path.join(datafeed_dir, item)
-            os.remove(item_path)
+
+            if (os.path.isdir(item_path)):
+
+                shutil.rmtree(item_path)
+            #
+            else:
+
+                os.remove(item_path)
+            #
         #
 
 
@@ -79,10 +118,7 @@ class BrainChart:
         registry_path = datafeed_dir / "registry.json"
         registry      = {"server_port":self.server_port, "server_url":self.server_url}
 
-        with open(registry_path, 'w', encoding='utf-8') as file:
-
-            json.dump(registry, file, indent=4)
-        #
+        write_registry(registry_path, registry)
     #    
     ##############################################################
     #
@@ -118,9 +154,15 @@ class BrainChart:
 
             cmd = ["uvicorn", module_path, "--host", "0.0.0.0", "--port", str(self.server_port)]
 
+            if (self.workers > 1):
+
+                cmd += ["--workers", str(self.workers)]
+            #
+
             # Ensure the project root is on PYTHONPATH so 'brainchart.*' imports work
             env = os.environ.copy()
             env["PYTHONPATH"] = str(root_dir) + (os.pathsep + env.get("PYTHONPATH",""))
+            env.update(self.server_env)
             
             if (verbose):
                             
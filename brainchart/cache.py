@@ -0,0 +1,588 @@
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Modules
+#
+# Process-wide caches used by the FastAPI backend.
+#
+# BarCache keeps each datafeed file's bars as NumPy columns (or a BarPyramid built on top of them),
+# so a symbol is parsed once per (path, mtime, size) instead of once per request; concurrent misses
+# of one key wait for a single load instead of each parsing their own copy. Entries are
+# invalidated when the file on disk changes (e.g. `Symbol._register` rewrote it) and evicted once
+# the byte budget is exceeded. Memory-mapped columns (the "npy" storage format) live in the OS
+# page cache, not in the process, and are not charged against the budget.
+#
+# ResponseCache keeps finished, encoded responses (e.g. `/history` bodies) per exact query, tied to
+# the symbol's `data_version` so a re-registered symbol never serves old bytes.
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
+import os
+import mmap
+import time
+import threading
+
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Any, Tuple
+
+import numpy as np
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Helpers
+#
+EVICTION_POLICIES = ("lru", "lfu", "fifo")
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024   # 512 MiB
+DEFAULT_CACHE_EVICTION  = "lru"
+
+DEFAULT_RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024   # 64 MiB
+DEFAULT_RESPONSE_CACHE_TTL       = 300.0              # seconds
+
+
+def file_signature(path:Path) -> tuple[int, int, int]:
+
+    # The inode catches files (or "npy" column directories) replaced by rename
+    st = os.stat(path)
+
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+#
+
+def is_mapped(arr:np.ndarray) -> bool:
+
+    """True when `arr` is (a view of) a memory-mapped file rather than process memory."""
+
+    while (isinstance(arr, np.ndarray)):
+
+        if (isinstance(arr, np.memmap)):
+
+            return (True)
+        #
+
+        arr = arr.base
+    #
+
+    return (isinstance(arr, mmap.mmap))
+#
+
+def _sizeof(value:Any) -> int:
+
+    """
+    Approximate resident size of a cached value in bytes.
+    Dicts of arrays are summed, memory-mapped arrays count as 0; anything else may expose its
+    own `nbytes`.
+    """
+
+    if (isinstance(value, dict)):
+
+        return (sum(_sizeof(v) for v in value.values()))
+    #
+    if (isinstance(value, np.ndarray)):
+
+        return (0) if (is_mapped(value)) else (int(value.nbytes))
+    #
+
+    return (int(getattr(value, "nbytes", 0)))
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### BarCache
+#
+class _Entry:
+
+    __slots__ = ("signature", "value", "nbytes", "uses", "generation")
+
+    def __init__(self, signature:tuple, value:Any, nbytes:int):
+
+        self.signature  = signature
+        self.value      = value
+        self.nbytes     = nbytes
+        self.uses       = 1
+        self.generation = getattr(value, "generation", None)     # values growing in place count their builds
+    #
+#
+
+class BarCache:
+
+    """
+    Byte-bounded cache of columnar bar data keyed by file path.
+
+    Parameters
+    ----------
+
+    max_bytes : int, optional
+        Byte budget for all cached entries. Entries larger than the budget are returned
+        to the caller but not kept.
+        `Default=512 MiB`
+
+    eviction : str, optional
+        Which entry to drop once the budget is exceeded:
+        - "lru"  → least recently used
+        - "lfu"  → least frequently used (ties broken by recency)
+        - "fifo" → oldest inserted
+        `Default="lru"`
+    """
+
+    def __init__(self, max_bytes:int=DEFAULT_CACHE_MAX_BYTES, eviction:str=DEFAULT_CACHE_EVICTION):
+
+        eviction = str(eviction).lower()
+
+        if (eviction not in EVICTION_POLICIES):
+
+            raise ValueError(f"eviction must be one of {EVICTION_POLICIES}, got '{eviction}'")
+        #
+
+        self.max_bytes     = int(max_bytes)
+        self.eviction      = eviction
+
+        self.hits          = 0
+        self.misses        = 0
+        self.coalesced     = 0
+        self.evictions     = 0
+        self.invalidations = 0
+
+        self._entries : "OrderedDict[Any, _Entry]"      = OrderedDict()
+        self._loading : Dict[Any, Tuple[tuple, Future]] = {}
+        self._nbytes  = 0
+        self._lock    = threading.RLock()
+    #
+
+    def get(self, path:Path, loader:Callable[[Path], Dict[str, np.ndarray]], key:Any=None, signature:Optional[tuple]=None) -> Dict[str, np.ndarray]:
+
+        """
+        Return the cached value for `path`, calling `loader(path)` on a miss.
+        `key` defaults to the path; pass a tuple to cache several views of one file.
+        The file's (mtime, size, inode) is checked on every call, so a rewritten file is reloaded;
+        pass `signature` when the value depends on more than that one file (e.g. appended segments).
+        Callers missing a key that is being loaded wait for that load (and share its error).
+        """
+
+        key       = (str(path)) if (key is None) else (key)
+        signature = (file_signature(path)) if (signature is None) else (signature)
+
+        with self._lock:
+
+            entry = self._entries.get(key)
+
+            if (entry is not None  and  entry.signature == signature):
+
+                self.hits  += 1
+                entry.uses += 1
+
+                if (self.eviction != "fifo"):
+
+                    self._entries.move_to_end(key)
+                #
+
+                if (entry.generation != getattr(entry.value, "generation", None)):
+
+                    self._remeasure(key)
+                #
+
+                return (entry.value)
+            #
+
+            if (entry is not None):
+
+                self._drop(key)
+                self.invalidations += 1
+            #
+
+            loading = self._loading.get(key)
+
+            if (loading is not None  and  loading[0] == signature):
+
+                self.coalesced += 1
+
+                waiting = True
+                future  = loading[1]
+            #
+            else:
+
+                self.misses += 1
+
+                waiting            = False
+                future             = Future()
+                self._loading[key] = (signature, future)
+            #
+        #
+
+        if (waiting):
+
+            return (future.result())
+        #
+
+        return (self._load(path, loader, key, signature, future))
+    #
+
+    def _load(self, path:Path, loader:Callable[[Path], Any], key:Any, signature:tuple, future:Future) -> Any:
+
+        try:
+
+            value = loader(path)
+        #
+        except BaseException as e:
+
+            with self._lock:
+
+                self._finish(key, future)
+            #
+
+            future.set_exception(e)
+            raise
+        #
+
+        with self._lock:
+
+            # Not kept when the entry was invalidated (or reloaded) meanwhile
+            if (self._finish(key, future)):
+
+                self._put(key, signature, value)
+            #
+        #
+
+        future.set_result(value)
+
+        return (value)
+    #
+
+    def _finish(self, key:Any, future:Future) -> bool:
+
+        if (key in self._loading  and  self._loading[key][1] is future):
+
+            del self._loading[key]
+            return (True)
+        #
+
+        return (False)
+    #
+
+    def invalidate(self, path:Optional[Path]=None):
+
+        """Drop every entry of `path`, or everything when `path` is None."""
+
+        with self._lock:
+
+            if (path is None):
+
+                self._entries.clear()
+                self._loading.clear()
+                self._nbytes = 0
+                return
+            #
+
+            name    = str(path)
+            matches = lambda k: (k == name  or  (isinstance(k, tuple) and k and k[0] == name))
+
+            for key in [k for k in self._entries if (matches(k))]:
+
+                self._drop(key)
+                self.invalidations += 1
+            #
+
+            for key in [k for k in self._loading if (matches(k))]:
+
+                del self._loading[key]
+            #
+        #
+    #
+
+    def stats(self) -> dict:
+
+        with self._lock:
+
+            lookups = self.hits + self.misses
+
+            return {
+                "entries"       : len(self._entries),
+                "bytes"         : self._nbytes,
+                "max_bytes"     : self.max_bytes,
+                "eviction"      : self.eviction,
+                "hits"          : self.hits,
+                "misses"        : self.misses,
+                "hit_ratio"     : (self.hits / lookups) if (lookups) else (0.0),
+                "coalesced"     : self.coalesced,
+                "loading"       : len(self._loading),
+                "evictions"     : self.evictions,
+                "invalidations" : self.invalidations,
+            }
+        #
+    #
+
+    def _put(self, key:Any, signature:tuple, value:Any):
+
+        nbytes = _sizeof(value)
+
+        if (nbytes > self.max_bytes):
+
+            return
+        #
+
+        if (key in self._entries):
+
+            self._drop(key)
+        #
+
+        self._entries[key] = _Entry(signature, value, nbytes)
+        self._nbytes      += nbytes
+
+        while (self._nbytes > self.max_bytes  and  len(self._entries) > 1):
+
+            self._drop(self._victim(exclude=key))
+            self.evictions += 1
+        #
+    #
+
+    def _remeasure(self, key:Any):
+
+        """Re-account an entry that grew in place (e.g. a lazily built pyramid level)."""
+
+        entry            = self._entries[key]
+        nbytes           = _sizeof(entry.value)
+        entry.generation = getattr(entry.value, "generation", None)
+
+        if (nbytes == entry.nbytes):
+
+            return
+        #
+
+        self._nbytes += nbytes - entry.nbytes
+        entry.nbytes  = nbytes
+
+        while (self._nbytes > self.max_bytes  and  len(self._entries) > 1):
+
+            self._drop(self._victim(exclude=key))
+            self.evictions += 1
+        #
+    #
+
+    def _victim(self, exclude:Any=None) -> Any:
+
+        # OrderedDict iterates oldest/least-recent first; the entry being inserted is never the victim
+        keys = [k for k in self._entries if (k != exclude)]
+
+        if (self.eviction == "lfu"):
+
+            return (min(keys, key=lambda k: self._entries[k].uses))
+        #
+
+        return (keys[0])
+    #
+
+    def _drop(self, key:Any):
+
+        entry         = self._entries.pop(key)
+        self._nbytes -= entry.nbytes
+    #
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### ResponseCache
+#
+class _Response:
+
+    __slots__ = ("value", "nbytes", "expires")
+
+    def __init__(self, value:Any, nbytes:int, expires:float):
+
+        self.value   = value
+        self.nbytes  = nbytes
+        self.expires = expires
+    #
+#
+
+class ResponseCache:
+
+    """
+    LRU cache of encoded responses with a time-to-live and a byte budget.
+
+    Entries are grouped (e.g. by ticker) under the group's data version: using a group with
+    another version drops all of its entries at once.
+
+    Parameters
+    ----------
+
+    max_bytes : int, optional
+        Byte budget for all cached values; least recently used entries are evicted beyond it.
+        `Default=64 MiB`
+
+    ttl : float, optional
+        Seconds an entry stays valid; 0 or less keeps entries until evicted.
+        `Default=300`
+    """
+
+    def __init__(self, max_bytes:int=DEFAULT_RESPONSE_CACHE_MAX_BYTES, ttl:float=DEFAULT_RESPONSE_CACHE_TTL):
+
+        self.max_bytes     = int(max_bytes)
+        self.ttl           = float(ttl)
+
+        self.hits          = 0
+        self.misses        = 0
+        self.evictions     = 0
+        self.expirations   = 0
+        self.invalidations = 0
+
+        self._entries : "OrderedDict[tuple, _Response]" = OrderedDict()
+        self._groups  : Dict[Any, set]                  = {}
+        self._versions: Dict[Any, Any]                  = {}
+        self._nbytes  = 0
+        self._lock    = threading.Lock()
+    #
+
+    def get(self, group:Any, key:Any, version:Any) -> Optional[Any]:
+
+        """Cached value of `key` in `group` at `version`, or None."""
+
+        with self._lock:
+
+            self._check_version(group, version)
+
+            entry = self._entries.get((group, key))
+
+            if (entry is not None  and  entry.expires <= time.monotonic()):
+
+                self._drop((group, key))
+                self.expirations += 1
+                entry = None
+            #
+
+            if (entry is None):
+
+                self.misses += 1
+                return (None)
+            #
+
+            self.hits += 1
+            self._entries.move_to_end((group, key))
+
+            return (entry.value)
+        #
+    #
+
+    def put(self, group:Any, key:Any, version:Any, value:Any, nbytes:int):
+
+        if (self.max_bytes <= 0  or  nbytes > self.max_bytes):
+
+            return
+        #
+
+        expires = (time.monotonic() + self.ttl) if (self.ttl > 0) else (float("inf"))
+
+        with self._lock:
+
+            self._check_version(group, version)
+
+            if ((group, key) in self._entries):
+
+                self._drop((group, key))
+            #
+
+            self._versions[group]       = version
+            self._entries[(group, key)] = _Response(value, nbytes, expires)
+            self._groups.setdefault(group, set()).add(key)
+            self._nbytes += nbytes
+
+            while (self._nbytes > self.max_bytes):
+
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            #
+        #
+    #
+
+    def invalidate(self, group:Any=None):
+
+        """Drop every entry of `group`, or everything when `group` is None."""
+
+        with self._lock:
+
+            if (group is None):
+
+                self._entries.clear()
+                self._groups.clear()
+                self._versions.clear()
+                self._nbytes = 0
+                return
+            #
+
+            self._drop_group(group)
+        #
+    #
+
+    def stats(self) -> dict:
+
+        with self._lock:
+
+            lookups = self.hits + self.misses
+
+            return {
+                "entries"       : len(self._entries),
+                "bytes"         : self._nbytes,
+                "max_bytes"     : self.max_bytes,
+                "ttl"           : self.ttl,
+                "hits"          : self.hits,
+                "misses"        : self.misses,
+                "hit_ratio"     : (self.hits / lookups) if (lookups) else (0.0),
+                "evictions"     : self.evictions,
+                "expirations"   : self.expirations,
+                "invalidations" : self.invalidations,
+            }
+        #
+    #
+
+    def _check_version(self, group:Any, version:Any):
+
+        # A new data version (re-registered symbol) makes every entry of the group stale
+        if (group in self._versions  and  self._versions[group] != version):
+
+            self._drop_group(group)
+        #
+    #
+
+    def _drop_group(self, group:Any):
+
+        for key in list(self._groups.get(group, ())):
+
+            self._drop((group, key))
+            self.invalidations += 1
+        #
+    #
+
+    def _drop(self, full_key:tuple):
+
+        entry         = self._entries.pop(full_key)
+        self._nbytes -= entry.nbytes
+        group, key    = full_key
+        keys          = self._groups[group]
+
+        keys.discard(key)
+
+        if (not keys):
+
+            del self._groups[group]
+            self._versions.pop(group, None)
+        #
+    #
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Instances
+#
+bar_cache = BarCache(
+    max_bytes = int(os.environ.get("BRAINCHART_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES)),
+    eviction  = os.environ.get("BRAINCHART_CACHE_EVICTION", DEFAULT_CACHE_EVICTION),
+)
+
+history_cache = ResponseCache(
+    max_bytes = int(os.environ.get("BRAINCHART_RESPONSE_CACHE_MAX_BYTES", DEFAULT_RESPONSE_CACHE_MAX_BYTES)),
+    ttl       = float(os.environ.get("BRAINCHART_RESPONSE_CACHE_TTL", DEFAULT_RESPONSE_CACHE_TTL)),
+)
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
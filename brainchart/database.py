@@ -13,13 +13,17 @@
 ###################################################################################################
 ###################################################################################################
 #
+import json
+
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text, update
 # from sqlalchemy.ext.declarative import declarative_base ?????????
-from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey, Index
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Boolean, Float, ForeignKey, Index
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base, relationship
 #
 ###################################################################################################
 ###################################################################################################
@@ -69,7 +73,11 @@ class Chart(Base):
 class Shape(Base):
 
     __tablename__  = "shapes"
-    __table_args__ = (Index("ix_shapes_symbol_sig", "symbol", "sig"),)
+    __table_args__ = (
+        Index("ix_shapes_symbol_sig"   , "symbol", "sig"),
+        Index("ix_shapes_symbol_rev"   , "symbol", "rev"),
+        Index("ix_shapes_symbol_extent", "symbol", "t_min", "t_max"),
+    )
 
     id         = Column(Integer , primary_key=True, index=True)
     symbol     = Column(String  , nullable=False  , index=True)
@@ -79,8 +87,257 @@ class Shape(Base):
     sig        = Column(String  , nullable=False  , index=True)
     created_at = Column(DateTime, default=datetime.now)
 
+    # Revision of the write that last touched the row (see `next_shape_rev`); deleted rows stay
+    # as tombstones so clients syncing with `/shapes?since=` learn about the deletion, until
+    # `purge_shape_tombstones` drops them
+    rev        = Column(Integer , nullable=False  , default=0)
+    deleted    = Column(Boolean , nullable=False  , default=False)
+
+    # Extent of `points` (see `shape_extent`), for `/shapes?from=&to=`
+    t_min      = Column(Integer , nullable=True)
+    t_max      = Column(Integer , nullable=True)
+    p_min      = Column(Float   , nullable=True)
+    p_max      = Column(Float   , nullable=True)
+
     chart_id   = Column(Integer, ForeignKey("charts.id"), nullable=True)
     chart      = relationship("Chart", back_populates="shapes")
+
+    def set_extent(self):
+
+        """Recompute the extent columns after `shape_type`, `points` or `options` changed."""
+
+        self.t_min, self.t_max, self.p_min, self.p_max = shape_extent(self.shape_type, self.points, self.options)
+    #
+#
+
+
+class ShapeMove(Base):
+
+    """
+    Tombstone of a shape moved to another symbol: the row keeps its id under the new symbol,
+    this tells `/shapes?symbol=<old>&since=` readers it is gone from the old one.
+    """
+
+    __tablename__  = "shape_moves"
+    __table_args__ = (
+        Index("ix_shape_moves_symbol_rev", "symbol", "rev"),
+    )
+
+    shape_id = Column(Integer, primary_key=True)
+    symbol   = Column(String , primary_key=True)      # the symbol it left
+    rev      = Column(Integer, nullable=False)
+#
+
+
+class ShapeRevision(Base):
+
+    """
+    Single-row counter of shape writes, shared by every backend worker through the database,
+    and the horizon: tombstones up to that revision are purged, so a `since` older than it
+    can no longer be answered with a delta.
+    """
+
+    __tablename__ = "shape_revision"
+
+    id      = Column(Integer, primary_key=True)
+    rev     = Column(Integer, nullable=False, default=0)
+    horizon = Column(Integer, nullable=False, default=0)
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Extents
+#
+SHAPE_TIME_MIN = -(2 ** 53)     # t_min of shapes reaching back indefinitely
+SHAPE_TIME_MAX = 2 ** 53        # t_max of shapes reaching forward indefinitely
+
+# Drawings spanning more time than their points
+SHAPES_UNBOUNDED      = {"horizontal_line", "extended", "cross_line"}
+SHAPES_UNBOUNDED_LATE = {"horizontal_ray", "anchored_vwap", "fib_timezone", "cyclic_lines", "sine_line"}
+
+
+def shape_extent(shape_type:str, points:Optional[List[Dict]], options:Optional[Dict[str, Any]]=None) -> Tuple[int, int, Optional[float], Optional[float]]:
+
+    """
+    (t_min, t_max, p_min, p_max) of a shape: time (Unix seconds) and price range of its points.
+    Times widen to SHAPE_TIME_MIN / SHAPE_TIME_MAX for drawings extending past their points
+    (horizontal lines, rays, `extendLeft` / `extendRight` overrides) or without any time;
+    prices are None without any priced point.
+    """
+
+    points = points or []
+    times  = [int(p["time"]) for p in points if (p.get("time") is not None)]
+    prices = [float(p["price"]) for p in points if (p.get("price") is not None)]
+
+    if (not times  or  shape_type in SHAPES_UNBOUNDED):
+
+        t_min, t_max = SHAPE_TIME_MIN, SHAPE_TIME_MAX
+    #
+    else:
+
+        t_min, t_max = min(times), max(times)
+    #
+
+    overrides = (options or {}).get("overrides") or {}
+    earlier   = any(value for key, value in overrides.items() if (key.endswith("extendLeft")))
+    later     = any(value for key, value in overrides.items() if (key.endswith("extendRight")))
+
+    if (shape_type == "ray"  and  len(times) > 1):
+
+        # a ray runs from its first point through the second, and on
+        earlier |= times[1] < times[0]
+        later   |= times[1] >= times[0]
+    #
+
+    if (earlier):
+
+        t_min = SHAPE_TIME_MIN
+    #
+    if (later  or  shape_type in SHAPES_UNBOUNDED_LATE):
+
+        t_max = SHAPE_TIME_MAX
+    #
+
+    return (t_min, t_max, (min(prices)) if (prices) else (None), (max(prices)) if (prices) else (None))
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Revisions
+#
+def next_shape_rev(db:Session) -> int:
+
+    """
+    Revision for the rows written by the current transaction. Bumping the counter is the
+    transaction's first write, so SQLite's write lock hands out revisions in commit order:
+    a reader that saw revision R never misses a later commit with a revision <= R. Purges the
+    old tombstones along the way (see `purge_shape_tombstones`).
+    """
+
+    db.execute(update(ShapeRevision).where(ShapeRevision.id == 1).values(rev=ShapeRevision.rev + 1))
+
+    rev = current_shape_rev(db)
+
+    purge_shape_tombstones(db, rev)
+
+    return (rev)
+#
+
+def current_shape_rev(db:Session) -> int:
+
+    return (db.query(ShapeRevision.rev).filter(ShapeRevision.id == 1).scalar() or 0)
+#
+
+def shape_rev_horizon(db:Session) -> Tuple[int, int]:
+
+    """(current revision, horizon) read together."""
+
+    row = db.query(ShapeRevision.rev, ShapeRevision.horizon).filter(ShapeRevision.id == 1).first()
+
+    return ((int(row[0]), int(row[1])) if (row) else (0, 0))
+#
+
+SHAPE_TOMBSTONE_REVS = 10_000   # revisions a tombstone is kept for
+SHAPE_PURGE_EVERY    = 1_000    # revisions between two purges
+
+def purge_shape_tombstones(db:Session, rev:int) -> int:
+
+    """
+    In the transaction writing `rev`: delete the tombstones (deleted rows, moves) older than SHAPE_TOMBSTONE_REVS
+    revisions and move the horizon there, at most once every SHAPE_PURGE_EVERY revisions.
+    Returns the count purged.
+    """
+
+    horizon = rev - SHAPE_TOMBSTONE_REVS
+
+    if (horizon - shape_rev_horizon(db)[1] < SHAPE_PURGE_EVERY):
+
+        return (0)
+    #
+
+    purged  = db.query(Shape).filter(Shape.deleted == True, Shape.rev <= horizon).delete(synchronize_session=False)
+    purged += db.query(ShapeMove).filter(ShapeMove.rev <= horizon).delete(synchronize_session=False)
+
+    db.execute(update(ShapeRevision).where(ShapeRevision.id == 1).values(horizon=horizon))
+
+    return (purged)
+#
+
+def init_db():
+
+    """Create missing tables and migrate older ones. Several workers may run it at once on a new database."""
+
+    for attempt in range(3):
+
+        try:
+
+            Base.metadata.create_all(bind=engine)
+            migrate_shapes(engine)
+
+            return
+        #
+        except OperationalError as e:
+
+            # another worker created the table between the existence check and CREATE TABLE
+            if ("already exists" not in str(e)  or  attempt == 2):
+
+                raise
+            #
+        #
+    #
+#
+
+def migrate_shapes(engine):
+
+    """
+    Bring an older `shapes` table to the current schema: add `rev` (1 for existing rows),
+    `deleted` and the extent columns (computed for the rows lacking them), their indexes, the
+    counter row and its horizon. Safe to run from several workers at once.
+    """
+
+    columns = {(table, column["name"]) for table in ("shapes", "shape_revision") for column in inspect(engine).get_columns(table)}
+    added   = {
+        ("shapes", "rev")             : "ALTER TABLE shapes ADD COLUMN rev INTEGER NOT NULL DEFAULT 1",
+        ("shapes", "deleted")         : "ALTER TABLE shapes ADD COLUMN deleted BOOLEAN NOT NULL DEFAULT 0",
+        ("shapes", "t_min")           : "ALTER TABLE shapes ADD COLUMN t_min INTEGER",
+        ("shapes", "t_max")           : "ALTER TABLE shapes ADD COLUMN t_max INTEGER",
+        ("shapes", "p_min")           : "ALTER TABLE shapes ADD COLUMN p_min FLOAT",
+        ("shapes", "p_max")           : "ALTER TABLE shapes ADD COLUMN p_max FLOAT",
+        ("shape_revision", "horizon") : "ALTER TABLE shape_revision ADD COLUMN horizon INTEGER NOT NULL DEFAULT 0",
+    }
+
+    with engine.begin() as conn:
+
+        for column, ddl in added.items():
+
+            if (column not in columns):
+
+                try:
+
+                    conn.execute(text(ddl))
+                #
+                except OperationalError as e:
+
+                    # another worker added it first
+                    if ("duplicate column" not in str(e).lower()):
+
+                        raise
+                    #
+                #
+            #
+        #
+
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_shapes_symbol_rev ON shapes (symbol, rev)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_shapes_symbol_extent ON shapes (symbol, t_min, t_max)"))
+
+        rows = conn.execute(text("SELECT id, shape_type, points, options FROM shapes WHERE t_min IS NULL")).all()
+
+        if (rows):
+
+            extents = [dict(zip(("t_min", "t_max", "p_min", "p_max"), shape_extent(shape_type, json.loads(points or "[]"), json.loads(options or "{}"))), id=id) for id, shape_type, points, options in rows]
+
+            conn.execute(text("UPDATE shapes SET t_min = :t_min, t_max = :t_max, p_min = :p_min, p_max = :p_max WHERE id = :id"), extents)
+        #
+        conn.execute(text("INSERT OR IGNORE INTO shape_revision (id, rev, horizon) SELECT 1, COALESCE(MAX(rev), 0), 0 FROM shapes"))
+    #
 #
 ###################################################################################################
 ###################################################################################################
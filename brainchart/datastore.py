@@ -0,0 +1,966 @@
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Modules
+#
+# On-disk storage of symbol bars under runtime/datafeed/.
+#
+# `Symbol._register` writes one file per ticker in the selected format and the backend reads it
+# back column-projected: `/history` only needs 'timestamp' + OHLCV, `#SERIES` only 'timestamp' and
+# the one column. Parquet and Arrow IPC (Feather) need `pyarrow`; CSV is always available.
+#
+# Tick data (timestamp, price, size) is stored the same way under `ticks_key(ticker)`.
+#
+# Bars added after registration go to `<ticker>.segments/`, one small file (or "npy" directory) per
+# append in the ticker's format, so growing a symbol never rewrites its history. Readers stitch the
+# base and its segments back together: a segment supersedes every stored row at or after its first
+# timestamp. `compact_bars` merges the segments in the background (into one segment, or into the
+# base once they grew large) and swaps the result in by rename.
+#
+# With several server workers, `shared_columns` converts other formats once into an "npy" mirror
+# under a shared directory, so every worker maps the same pages instead of parsing its own copy.
+#
+# The "npy" format stores a ticker as a directory of fixed-width `.npy` files, one per column
+# (int64 'timestamp', float64 or float32 values). The backend memory-maps them: a window slice only
+# touches the pages it needs and the OS page cache is shared by every server process.
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
+import io
+import os
+import glob
+import time
+import shutil
+import hashlib
+import threading
+
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy  as np
+import pandas as pd
+
+from .cache import file_signature
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Formats
+#
+STORAGE_FORMATS = ("csv", "parquet", "feather", "npy")
+PRICE_DTYPES    = ("float64", "float32")
+
+_SUFFIX = {
+    "csv"     : ".csv",
+    "parquet" : ".parquet",
+    "feather" : ".feather",
+    "npy"     : ".columns",     # directory of <column>.npy files
+}
+
+# Lookup order when a ticker exists in several formats: memory-mapped columns, then columnar files, then CSV
+_READ_ORDER = ("npy", "feather", "parquet", "csv")
+
+
+def check_storage_format(fmt:str) -> str:
+
+    fmt = str(fmt).lower()
+
+    if (fmt not in STORAGE_FORMATS):
+
+        raise ValueError(f"storage format must be one of {STORAGE_FORMATS}, got '{fmt}'")
+    #
+
+    return (fmt)
+#
+
+def check_price_dtype(dtype:str) -> str:
+
+    dtype = str(np.dtype(dtype))
+
+    if (dtype not in PRICE_DTYPES):
+
+        raise ValueError(f"price dtype must be one of {PRICE_DTYPES}, got '{dtype}'")
+    #
+
+    return (dtype)
+#
+
+def bars_path(datafeed_dir:Path, ticker:str, fmt:str="csv") -> Path:
+
+    return (Path(datafeed_dir) / f"{ticker}{_SUFFIX[check_storage_format(fmt)]}")
+#
+
+SWAP_RETRIES = 50       # lookups while an "npy" directory is being swapped in, 1 ms apart
+
+
+def find_bars(datafeed_dir:Path, ticker:str) -> Optional[Path]:
+
+    """
+    Path of the stored bars of `ticker`, whatever format they were written in. While
+    `_write_columns` swaps an "npy" directory in, the ticker briefly has no directory (only
+    `<path>.old`): the lookup is retried then instead of reporting the ticker missing.
+    """
+
+    for _ in range(SWAP_RETRIES):
+
+        for fmt in _READ_ORDER:
+
+            path = bars_path(datafeed_dir, ticker, fmt)
+
+            if (path.exists()):
+
+                return (path)
+            #
+        #
+
+        columns = bars_path(datafeed_dir, ticker, "npy")
+
+        if (not columns.with_name(columns.name + ".old").exists()):
+
+            return (None)
+        #
+
+        time.sleep(0.001)
+    #
+
+    return (None)
+#
+
+def path_format(path:Path) -> str:
+
+    for fmt, suffix in _SUFFIX.items():
+
+        if (str(path).endswith(suffix)):
+
+            return (fmt)
+        #
+    #
+
+    raise ValueError(f"Unknown datafeed file type: '{path}'")
+#
+
+def ticks_key(ticker:str) -> str:
+
+    """Storage name of the tick data of `ticker`: written and found like bars, as `<ticker>.ticks.csv`, ..."""
+
+    return (f"{ticker}.ticks")
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Write
+#
+def _write_columns(df:pd.DataFrame, path:Path, price_dtype:Optional[str]="float64"):
+
+    """
+    Write the numeric columns of `df` as `<path>/<column>.npy`. The directory is built next to
+    `path` and swapped in by rename, so readers never see a half-written ticker; processes that
+    still map the old files keep reading them until they reload. `price_dtype=None` keeps the
+    dtypes of `df`.
+    """
+
+    tmp = path.with_name(path.name + ".tmp")
+    old = path.with_name(path.name + ".old")
+
+    for stale in (tmp, old):
+
+        if (stale.exists()):
+
+            shutil.rmtree(stale)
+        #
+    #
+
+    tmp.mkdir(parents=True)
+
+    for name in df.columns:
+
+        if (not pd.api.types.is_numeric_dtype(df[name])):
+
+            continue
+        #
+
+        if (name == "timestamp"):
+
+            arr = df[name].to_numpy(dtype=np.int64)
+        #
+        elif (price_dtype is None):
+
+            arr = df[name].to_numpy()
+        #
+        else:
+
+            arr = df[name].to_numpy(dtype=price_dtype, na_value=np.nan)
+        #
+
+        np.save(tmp / f"{name}.npy", np.ascontiguousarray(arr))
+    #
+
+    if (path.exists()):
+
+        os.replace(path, old)
+    #
+
+    os.replace(tmp, path)
+
+    if (old.exists()):
+
+        shutil.rmtree(old)
+    #
+#
+
+def _write_frame(df:pd.DataFrame, path:Path, fmt:str, price_dtype:str="float64"):
+
+    """Write `df` to `path`; files are written next to it and renamed in, like "npy" directories."""
+
+    if (fmt == "npy"):
+
+        _write_columns(df, path, price_dtype)
+        return
+    #
+
+    tmp = path.with_name(path.name + ".tmp")
+
+    if (fmt == "csv"):
+
+        df.to_csv(tmp, index=False)
+    #
+    elif (fmt == "parquet"):
+
+        df.to_parquet(tmp, index=False)
+    #
+    else:
+
+        df.reset_index(drop=True).to_feather(tmp)
+    #
+
+    os.replace(tmp, path)
+#
+
+def _read_frame(path:Path, columns:Optional[List[str]]=None) -> pd.DataFrame:
+
+    fmt = path_format(path)
+
+    if (fmt == "npy"):
+
+        names = (columns) if (columns is not None) else (available_columns(path))
+
+        return (pd.DataFrame({name: np.load(path / f"{name}.npy") for name in names}))
+    #
+    if (fmt == "csv"):
+
+        return (pd.read_csv(path, usecols=columns))
+    #
+    if (fmt == "parquet"):
+
+        return (pd.read_parquet(path, columns=columns))
+    #
+
+    return (pd.read_feather(path, columns=columns))
+#
+
+def _remove(path:Path):
+
+    if (path.is_dir()):
+
+        shutil.rmtree(path)
+    #
+    else:
+
+        path.unlink()
+    #
+#
+
+def write_bars(df:pd.DataFrame, datafeed_dir:Path, ticker:str, fmt:str="csv", price_dtype:str="float64") -> Path:
+
+    """
+    Write the bars of `ticker` in `fmt`, sorted by timestamp, and remove copies of the same
+    ticker stored in other formats so the backend never reads a stale file.
+    `price_dtype` only applies to the "npy" format.
+    """
+
+    fmt         = check_storage_format(fmt)
+    price_dtype = check_price_dtype(price_dtype)
+    path        = bars_path(datafeed_dir, ticker, fmt)
+
+    if ("timestamp" in df.columns):
+
+        df = df.sort_values("timestamp", kind="stable")
+    #
+
+    _write_frame(df, path, fmt, price_dtype)
+
+    for other in STORAGE_FORMATS:
+
+        stale = bars_path(datafeed_dir, ticker, other)
+
+        if (other != fmt  and  stale.exists()):
+
+            _remove(stale)
+        #
+    #
+
+    # A full write supersedes the appended segments
+    segments = segments_dir(datafeed_dir, ticker)
+
+    if (segments.exists()):
+
+        shutil.rmtree(segments)
+    #
+
+    return (path)
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Read
+#
+def available_columns(path:Path) -> List[str]:
+
+    """Column names stored in `path`, without reading any data."""
+
+    fmt = path_format(path)
+
+    if (fmt == "npy"):
+
+        return (sorted(p.name[:-len(".npy")] for p in path.glob("*.npy")))
+    #
+    if (fmt == "csv"):
+
+        return (list(pd.read_csv(path, nrows=0).columns))
+    #
+    if (fmt == "parquet"):
+
+        import pyarrow.parquet as pq
+
+        return (list(pq.read_schema(path).names))
+    #
+
+    import pyarrow.ipc as ipc
+
+    with ipc.open_file(path) as reader:
+
+        return (list(reader.schema.names))
+    #
+#
+
+def read_columns(path:Path, columns:Optional[Sequence[str]]=None) -> Dict[str, np.ndarray]:
+
+    """
+    Read `columns` of a datafeed file into read-only NumPy arrays. Requested columns that are
+    not stored are skipped; non-numeric columns (e.g. 'time_iran') are never returned.
+    "npy" columns come back as read-only `np.memmap`s, nothing is read until sliced.
+    Appended segments are stitched after the stored rows (the result is then held in memory).
+    """
+
+    # A compaction may rename or remove files between listing and reading them: read again
+    for attempt in range(3):
+
+        try:
+
+            return (_read_stored(path, columns))
+        #
+        except FileNotFoundError:
+
+            if (attempt == 2):
+
+                raise
+            #
+        #
+    #
+#
+
+def _read_stored(path:Path, columns:Optional[Sequence[str]]) -> Dict[str, np.ndarray]:
+
+    segments = list_segments(_segments_of(path))
+
+    if (not segments):
+
+        return (_read_file(path, columns))
+    #
+
+    wanted = (None) if (columns is None) else (list(dict.fromkeys(["timestamp", *columns])))
+    parts  = [_read_file(path, wanted)]
+    parts += [_read_file(segment, list(parts[0])) for segment in segments]
+    kept   = _kept_rows([part["timestamp"] for part in parts])
+    cols   = {}
+
+    for name in parts[0]:
+
+        if (columns is not None  and  name not in columns):
+
+            continue
+        #
+
+        arr = np.concatenate([
+            (part[name][:n]) if (name in part) else (np.full(n, np.nan))
+            for part, n in zip(parts, kept)
+        ])
+        arr.flags.writeable = False
+        cols[name] = arr
+    #
+
+    return (cols)
+#
+
+def _read_file(path:Path, columns:Optional[Sequence[str]]=None) -> Dict[str, np.ndarray]:
+
+    if (columns is None):
+
+        wanted = None
+    #
+    else:
+
+        stored = set(available_columns(path))
+        wanted = [c for c in dict.fromkeys(columns) if (c in stored)]
+    #
+
+    if (path_format(path) == "npy"):
+
+        names = (wanted) if (wanted is not None) else (available_columns(path))
+
+        return {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in names}
+    #
+
+    df   = _read_frame(path, wanted)
+    cols = {}
+
+    for name in df.columns:
+
+        if (not pd.api.types.is_numeric_dtype(df[name])):
+
+            continue
+        #
+
+        arr = df[name].to_numpy()
+        arr.flags.writeable = False
+        cols[name] = arr
+    #
+
+    return (cols)
+#
+
+def read_last_row(path:Path) -> Dict[str, float]:
+
+    """
+    Numeric columns of the newest stored row of `path` (its last segment's, if any), reading
+    only that row: the last element of "npy" columns, the last row group / record batch of
+    Parquet / Feather files, the header and last line of a CSV file. Empty when there is no row.
+    """
+
+    for attempt in range(3):
+
+        try:
+
+            segments = list_segments(_segments_of(path))
+            frame    = _last_frame((segments[-1]) if (segments) else (path))
+
+            break
+        #
+        except FileNotFoundError:
+
+            if (attempt == 2):
+
+                raise
+            #
+        #
+    #
+
+    if (not len(frame)):
+
+        return ({})
+    #
+
+    return {name: float(frame[name].iloc[-1]) for name in frame.columns if (pd.api.types.is_numeric_dtype(frame[name]))}
+#
+
+def _last_frame(path:Path) -> pd.DataFrame:
+
+    fmt = path_format(path)
+
+    if (fmt == "npy"):
+
+        columns = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in available_columns(path)}
+
+        return (pd.DataFrame({name: arr[-1:] for name, arr in columns.items()}))
+    #
+    if (fmt == "parquet"):
+
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+
+        return ((parquet.read_row_group(parquet.num_row_groups - 1).to_pandas()) if (parquet.num_row_groups) else (pd.DataFrame()))
+    #
+    if (fmt == "feather"):
+
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+
+        with pa.memory_map(str(path)) as source:
+
+            reader = ipc.open_file(source)
+
+            return ((reader.get_batch(reader.num_record_batches - 1).to_pandas()) if (reader.num_record_batches) else (pd.DataFrame()))
+        #
+    #
+
+    with open(path, "rb") as f:
+
+        header = f.readline()
+        end    = f.seek(0, os.SEEK_END)
+        block  = b""
+
+        # Read backwards until the block holds a whole last line
+        while (block.rstrip(b"\r\n").count(b"\n") < 1  and  len(header) + len(block) < end):
+
+            step  = min(max(len(block), 4096), end - len(header) - len(block))
+            f.seek(end - len(block) - step)
+            block = f.read(step) + block
+        #
+    #
+
+    last = block.rstrip(b"\r\n").rsplit(b"\n", 1)[-1]
+
+    return (pd.read_csv(io.BytesIO(header + last)))
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Segments
+#
+SEGMENTS_SUFFIX       = ".segments"
+COMPACT_SEGMENTS      = 16       # segments that make `Symbol.extend` start a background compaction
+COMPACT_BASE_FRACTION = 0.25     # merged segments at least this share of the base size are folded into it
+LOCK_TTL              = 600      # seconds after which a left-over lock file (compaction, shared mirror) is ignored
+
+_compactions      : Dict[str, threading.Thread] = {}
+_compactions_lock = threading.Lock()
+
+
+def segments_dir(datafeed_dir:Path, ticker:str) -> Path:
+
+    return (Path(datafeed_dir) / f"{ticker}{SEGMENTS_SUFFIX}")
+#
+
+def _segments_of(path:Path) -> Path:
+
+    """Segments directory of the stored bars at `path`."""
+
+    return (path.with_name(path.name[:-len(_SUFFIX[path_format(path)])] + SEGMENTS_SUFFIX))
+#
+
+def _segment_number(path:Path) -> int:
+
+    return (int(path.name.split(".", 1)[0]))
+#
+
+def list_segments(segments:Path) -> List[Path]:
+
+    """Segment files (or "npy" directories) in `segments`, in append order."""
+
+    try:
+
+        names = os.listdir(segments)
+    #
+    except FileNotFoundError:
+
+        return ([])
+    #
+
+    paths = [segments / name for name in names if (name.split(".", 1)[0].isdigit()  and  not name.endswith((".tmp", ".old")))]
+
+    return (sorted(paths, key=_segment_number))
+#
+
+def stored_signature(path:Path) -> tuple:
+
+    """
+    Signature of the stored bars at `path` with their segments: changes on every write, append
+    and compaction (the cache key of the backend's BarCache).
+    """
+
+    segments = _segments_of(path)
+
+    try:
+
+        listing = (os.stat(segments).st_mtime_ns, tuple(p.name for p in list_segments(segments)))
+    #
+    except FileNotFoundError:
+
+        listing = ()
+    #
+
+    return (file_signature(path) + listing)
+#
+
+def _kept_rows(stamps:List[np.ndarray]) -> List[int]:
+
+    """
+    Rows kept from the start of each part (base, then segments, each sorted by timestamp) when
+    every part supersedes the rows of the earlier parts at or after its first timestamp.
+    """
+
+    kept = [len(ts) for ts in stamps]
+
+    for i in range(1, len(stamps)):
+
+        if (not len(stamps[i])):
+
+            continue
+        #
+
+        for j in range(i - 1, -1, -1):
+
+            kept[j] = int(np.searchsorted(stamps[j][:kept[j]], stamps[i][0], side="left"))
+
+            if (kept[j]):
+
+                break
+            #
+        #
+    #
+
+    return (kept)
+#
+
+def _stitched_frame(paths:List[Path]) -> pd.DataFrame:
+
+    """All columns of `paths` (base and/or segments, in order) as one frame, stitched like `read_columns`."""
+
+    frames = [_read_frame(path) for path in paths]
+    kept   = _kept_rows([frame["timestamp"].to_numpy(dtype=np.int64) for frame in frames])
+
+    return (pd.concat([frame.iloc[:n] for frame, n in zip(frames, kept)], ignore_index=True))
+#
+
+def _nbytes(path:Path) -> int:
+
+    if (path.is_dir()):
+
+        return (sum(p.stat().st_size for p in path.iterdir()))
+    #
+
+    return (path.stat().st_size)
+#
+
+def append_bars(df:pd.DataFrame, datafeed_dir:Path, ticker:str, price_dtype:str="float64") -> Path:
+
+    """
+    Store `df` as the next segment of `ticker`, in the format of its stored bars, without
+    touching what is already stored. Rows at or after the first timestamp of `df` that were
+    stored earlier are superseded (e.g. the forming last bar). Returns the segment path.
+    """
+
+    base = find_bars(datafeed_dir, ticker)
+
+    if (base is None):
+
+        raise FileNotFoundError(f"No stored bars for ticker '{ticker}'")
+    #
+
+    fmt      = path_format(base)
+    segments = segments_dir(datafeed_dir, ticker)
+    segments.mkdir(exist_ok=True)
+
+    stored   = list_segments(segments)
+    number   = (_segment_number(stored[-1]) + 1) if (stored) else (1)
+    path     = segments / f"{number:08d}{_SUFFIX[fmt]}"
+
+    _write_frame(df.sort_values("timestamp", kind="stable"), path, fmt, check_price_dtype(price_dtype))
+
+    return (path)
+#
+
+def _lock(path:Path) -> bool:
+
+    """Create the lock file `path`, False when another process holds it (stale locks are taken over)."""
+
+    for _ in range(2):
+
+        try:
+
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+
+            return (True)
+        #
+        except FileExistsError:
+
+            try:
+
+                if (time.time() - path.stat().st_mtime < LOCK_TTL):
+
+                    return (False)
+                #
+            #
+            except FileNotFoundError:
+
+                pass
+            #
+
+            path.unlink(missing_ok=True)
+        #
+    #
+
+    return (False)
+#
+
+def compact_bars(datafeed_dir:Path, ticker:str, price_dtype:str="float64", full:bool=False) -> bool:
+
+    """
+    Merge the appended segments of `ticker`. The merged rows replace the base file when they
+    reach `COMPACT_BASE_FRACTION` of its size (or with `full=True`), else they become one
+    segment. Results are swapped in by rename and only the merged segments are removed, so
+    readers and concurrent `append_bars` calls stay consistent. Returns False when there was
+    nothing to merge or another process is compacting the ticker.
+    """
+
+    base     = find_bars(datafeed_dir, ticker)
+    segments = segments_dir(datafeed_dir, ticker)
+    lock     = segments / ".compact"
+
+    if (base is None  or  len(list_segments(segments)) < ((1) if (full) else (2))  or  not _lock(lock)):
+
+        return (False)
+    #
+
+    try:
+
+        stored      = list_segments(segments)
+        fmt         = path_format(base)
+        price_dtype = check_price_dtype(price_dtype)
+        fold        = full  or  sum(_nbytes(p) for p in stored) >= COMPACT_BASE_FRACTION * _nbytes(base)
+
+        if (fold):
+
+            _write_frame(_stitched_frame([base] + stored), base, fmt, price_dtype)
+            target = None
+        #
+        else:
+
+            target = segments / f"{_segment_number(stored[-1]):08d}{_SUFFIX[fmt]}"
+            _write_frame(_stitched_frame(stored), target, fmt, price_dtype)
+        #
+
+        for path in stored:
+
+            if (path != target):
+
+                _remove(path)
+            #
+        #
+    #
+    finally:
+
+        lock.unlink(missing_ok=True)
+    #
+
+    return (True)
+#
+
+def compact_in_background(datafeed_dir:Path, ticker:str, price_dtype:str="float64") -> threading.Thread:
+
+    """Run `compact_bars` in a thread, one per ticker at a time; the interpreter waits for it at exit."""
+
+    with _compactions_lock:
+
+        thread = _compactions.get(ticker)
+
+        if (thread is None  or  not thread.is_alive()):
+
+            thread = threading.Thread(target=compact_bars, args=(datafeed_dir, ticker, price_dtype), name=f"compact-{ticker}")
+            thread.start()
+
+            _compactions[ticker] = thread
+        #
+    #
+
+    return (thread)
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Shared
+#
+SHARED_BUILD_TIMEOUT = 120      # seconds a process waits for another one to build a shared mirror
+
+
+def shared_columns(path:Path, shared_dir:Path, columns:Optional[Sequence[str]]=None) -> Dict[str, np.ndarray]:
+
+    """
+    `read_columns` for several server processes: the stored bars at `path` (with their
+    segments) are converted once into an "npy" mirror under `shared_dir`, named after their
+    `stored_signature`, and every process memory-maps that mirror, so the OS page cache holds
+    the only copy of the bars. "npy" bars without segments are mapped in place.
+    """
+
+    if (path_format(path) == "npy"  and  not list_segments(_segments_of(path))):
+
+        return (read_columns(path, columns))
+    #
+
+    digest = _shared_digest(path)
+    mirror = Path(shared_dir) / f"{path.name}-{digest}{_SUFFIX['npy']}"
+
+    if (not _build_shared(mirror, lambda: _build_mirror(path, mirror, digest))):
+
+        return (read_columns(path, columns))
+    #
+
+    return (read_columns(mirror, columns))
+#
+
+def shared_level(path:Path, shared_dir:Path, name:str, build:Callable[[], Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+
+    """
+    Columns derived from the stored bars at `path` (an aggregated level called `name`), built by
+    `build()` once for every server process into an "npy" directory under `shared_dir`, named
+    after the bars' `stored_signature`, and memory-mapped by all of them like the mirrors.
+    """
+
+    digest = _shared_digest(path)
+    target = Path(shared_dir) / f"{path.name}-{digest}.{name}{_SUFFIX['npy']}"
+
+    def write():
+
+        _remove_stale(path, Path(shared_dir), digest)
+        _write_columns(pd.DataFrame(build(), copy=False), target, price_dtype=None)
+    #
+
+    if (not _build_shared(target, write)):
+
+        return (build())
+    #
+
+    return (read_columns(target))
+#
+
+def _shared_digest(path:Path) -> str:
+
+    return (hashlib.sha1(repr(stored_signature(path)).encode("utf-8")).hexdigest()[:16])
+#
+
+def _build_shared(target:Path, build:Callable[[], None]) -> bool:
+
+    """Run `build()` to create `target` in one process (the others wait for it); False on timeout."""
+
+    lock     = target.with_name(target.name + ".lock")
+    deadline = time.monotonic() + SHARED_BUILD_TIMEOUT
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    while (not target.exists()):
+
+        if (_lock(lock)):
+
+            try:
+
+                if (not target.exists()):
+
+                    build()
+                #
+            #
+            finally:
+
+                lock.unlink(missing_ok=True)
+            #
+        #
+        elif (time.monotonic() > deadline):
+
+            return (False)
+        #
+        else:
+
+            time.sleep(0.05)
+        #
+    #
+
+    return (True)
+#
+
+def _remove_stale(path:Path, shared_dir:Path, digest:str):
+
+    """Mirrors and levels of older versions of the bars at `path`; processes still mapping them keep their pages."""
+
+    for stale in shared_dir.glob(f"{glob.escape(path.name)}-*{_SUFFIX['npy']}"):
+
+        if (stale.name.startswith(f"{path.name}-{digest}")):
+
+            continue
+        #
+
+        try:
+
+            _remove(stale)
+        #
+        except OSError:
+
+            pass
+        #
+    #
+#
+
+def _build_mirror(path:Path, mirror:Path, digest:str):
+
+    _remove_stale(path, mirror.parent, digest)
+
+    _write_columns(pd.DataFrame(read_columns(path), copy=False), mirror, price_dtype=None)
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Migration
+#
+def migrate_datafeed(datafeed_dir:Path, to_format:str="parquet", remove_source:bool=True) -> List[Path]:
+
+    """
+    Convert every stored ticker under `datafeed_dir` to `to_format` (e.g. existing CSV files to
+    Parquet). Tickers already stored in `to_format` are skipped and `registry.json` is left
+    untouched. With `remove_source=False` the old files stay, but the backend prefers the
+    columnar copy. Returns the written paths.
+
+    Example:
+        migrate_datafeed(Path("runtime/datafeed"), "parquet")
+    """
+
+    to_format = check_storage_format(to_format)
+    written   = []
+
+    for path in sorted(Path(datafeed_dir).iterdir()):
+
+        try:
+
+            fmt = path_format(path)
+        #
+        except ValueError:
+
+            continue
+        #
+
+        if (fmt == to_format):
+
+            continue
+        #
+
+        ticker = path.name[: -len(_SUFFIX[fmt])]
+        target = bars_path(datafeed_dir, ticker, to_format)
+
+        if (target.exists()):
+
+            continue
+        #
+
+        df = _stitched_frame([path] + list_segments(_segments_of(path)))
+
+        if (remove_source):
+
+            written.append(write_bars(df, datafeed_dir, ticker, to_format))
+        #
+        else:
+
+            _write_frame(df, target, to_format)
+            written.append(target)
+        #
+    #
+
+    return (written)
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
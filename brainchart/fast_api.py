@@ -4,8 +4,10 @@
 ################################################################################################### Imports
 #
 from pathlib import Path
-from typing import Optional, Any, Dict, List
-import json, hashlib
+from typing import Optional, Any, Callable, Dict, List, Tuple
+from email.utils import formatdate, parsedate_to_datetime
+from contextlib import asynccontextmanager
+import os, json, hashlib, asyncio
 
 # -----------------------------------------------
 
@@ -14,11 +16,12 @@ import numpy  as np
 
 # -----------------------------------------------
 
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 
 from sqlalchemy.orm import Session
 
@@ -29,7 +32,14 @@ from datetime import datetime
 
 # -----------------------------------------------
 
-from .database import engine, Base, get_db, Shape
+from .database import get_db, init_db, SessionLocal, Shape, ShapeMove, SHAPE_TIME_MIN, SHAPE_TIME_MAX, current_shape_rev, next_shape_rev, shape_rev_horizon
+from .cache import bar_cache, history_cache
+from .blocking import io_pool, loop_lag
+from .history import BarPyramid, LevelStore, OHLCV, TICK_COLUMNS, TickStore, bucket_start, parse_resolution
+from .datastore import find_bars, read_columns, read_last_row, shared_columns, shared_level, stored_signature, ticks_key
+from .registry import Registry, RegistryStore
+from .live import LiveHub, LiveStore, LiveTail, ShapeHub, live_history, live_next_time, live_rows
+from .serialize import history_json, history_binary, history_batch_binary, HISTORY_BINARY_MEDIA_TYPE
 #
 ###################################################################################################
 ###################################################################################################
@@ -44,6 +54,16 @@ DATAFEED_DIR.mkdir(parents=True, exist_ok=True)
 
 TV_LIB_DIR    = ROOT_DIR / "charting_library"               # charting_library/
 TV_DF_DIR     = ROOT_DIR / "charting_library" / "datafeeds" # charting_library/datafeeds/
+
+SHARED_DIR    = DATAFEED_DIR / ".shared"                    # runtime/datafeed/.shared: "npy" mirrors mapped by every worker
+
+OHLCV_COLUMNS = ["timestamp", *OHLCV]                       # columns read for /history
+
+HISTORY_BATCH_LIMIT = 64                                     # symbols per /history/batch request
+
+# Number of uvicorn worker processes serving this app (`BrainChart(workers=...)`). With more than
+# one, bars are read through shared memory-mapped mirrors and live rows through per-ticker journals
+WORKERS       = max(1, int(os.environ.get("BRAINCHART_WORKERS", 1)))
 #
 ###################################################################################################
 ###################################################################################################
@@ -83,310 +103,443 @@ class ShapeResponse(BaseModel):
     points     : List[Dict]
     options    : Optional[Dict[str, Any]] = None
     created_at : datetime
+    rev        : int
+    t_min      : Optional[int]   = None     # time extent of the points (None: unbounded)
+    t_max      : Optional[int]   = None
+    p_min      : Optional[float] = None     # price extent of the points (None: no price)
+    p_max      : Optional[float] = None
 #
 
 class ShapeAPIResponse(BaseModel):
 
-    items : List[ShapeResponse]
+    items   : List[ShapeResponse]
+    deleted : List[int] = []            # with `since`: ids deleted (or moved to another symbol, or out of `from`/`to`) after that revision
+    rev     : int       = 0             # high-water mark, the next `since`
+    reset   : bool      = False         # `since` predates the purged tombstones: `items` is the full list, drop every other shape
+#
+
+class ShapeBulkItem(BaseModel):
+
+    shape_type : str
+    points     : List[Dict]
+    options    : Optional[Dict[str, Any]] = None
+#
+
+class ShapeBulkCreate(BaseModel):
+
+    symbol : str
+    shapes : List[ShapeBulkItem]
+#
+
+class ShapeBulkResponse(BaseModel):
+
+    ids : List[int]
+#
+
+class ShapeDeleteFilter(BaseModel):
+
+    symbol         : Optional[str]       = None
+    shape_type     : Optional[str]       = None
+    ids            : Optional[List[int]] = None
+    created_before : Optional[datetime]  = None
+#
+
+class BarsAppend(BaseModel):
+
+    symbol : str
+    bars   : Dict[str, List[Optional[float]]]     # columnar: 'timestamp' (ms), 'open', ..., series columns
+#
+
+class HistoryResponse(Response):
+
+    """`/history` payload already encoded to JSON bytes by `serialize.history_json`."""
+
+    media_type = "application/json"
 #
 ###################################################################################################
 ###################################################################################################
 ################################################################################################### Routes
 #
 router = APIRouter()
+
+registry_store = RegistryStore(DATAFEED_DIR / "registry.json")
+live_store     = LiveStore((DATAFEED_DIR) if (WORKERS > 1) else (None))
+live_hub       = LiveHub()
+shape_hub      = ShapeHub()
 #
 ################################################# General Routes
 #
-def load_registry() -> dict:
+def current_registry() -> Registry:
 
-    registry_path = DATAFEED_DIR / "registry.json"
-    
-    if (not registry_path.exists()):
+    """Parsed registry, re-read only when registry.json changed on disk."""
+
+    try:
+
+        return (registry_store.get())
+    #
+    except FileNotFoundError:
 
         raise HTTPException(500, detail="No registry.json found")
     #
+#
 
-    with open(registry_path) as f:
+def load_registry() -> dict:
 
-        return (json.load(f))
-    #
+    return (current_registry().raw)
 #
 
-def load_ticker_history_csv(ticker:str) -> pd.DataFrame:
+def symbol_version(symbol:str) -> Optional[int]:
+
+    """
+    `data_version` of a ticker (or of the base ticker of a '#SERIES:' symbol), set by
+    `Symbol._register`, or the version of its live tail once bars were appended.
+    """
 
-    csv_path = DATAFEED_DIR / f"{ticker}.csv"
+    pair   = parse_series_symbol(symbol or "")
+    ticker = (pair[0]) if (pair) else (symbol)
 
-    if (not csv_path.exists()):
+    try:
 
-        raise HTTPException(404, detail=f"No OHLCV data for ticker '{ticker}'")
+        meta = current_registry().get(ticker)
     #
+    except HTTPException:
 
-    return (pd.read_csv(csv_path))
+        return (None)
+    #
+
+    if (not isinstance(meta, dict)):
+
+        return (None)
+    #
+
+    tail = live_store.get(ticker, meta.get("data_version"))
+
+    return ((max(tail.version, meta.get("data_version") or 0)) if (tail is not None) else (meta.get("data_version")))
 #
-################################################# Chart Routes
+
+def live_tail(ticker:str) -> Optional[LiveTail]:
+
+    """Bars appended to `ticker` since its current registration, if any."""
+
+    meta = current_registry().get(ticker)
+
+    return ((live_store.get(ticker, meta.get("data_version"))) if (meta) else (None))
 #
-@router.get("/config")
-async def get_config():
 
-    registry        = load_registry()
-    all_resolutions = set()
+def data_version(ticker:str) -> Optional[int]:
 
-    for key, meta in registry.items():
+    """`data_version` of the current registration of `ticker`, None when it is not registered."""
 
-        if (not isinstance(meta, dict)):
+    try:
 
-            continue
-        #
+        meta = current_registry().get(ticker)
+    #
+    except HTTPException:
 
-        all_resolutions.update(meta.get("supported_resolutions", ['1', '5', '15', '30', '60', '1D', '1W', '1M']))
+        return (None)
     #
 
-    return {
-        "supported_resolutions"    : sorted(list(all_resolutions)),
-        "supports_search"          : True,
-        "supports_group_request"   : False,
-        "supports_marks"           : False,
-        "supports_timescale_marks" : False,
-        "supports_time": True,
-    }
+    return ((meta.get("data_version")) if (meta) else (None))
 #
 
-@router.get("/time")
-async def get_server_time(symbol:Optional[str]=None):
+def registry_version() -> Optional[int]:
 
-    if (symbol is not None):
+    """
+    Version of the whole registry: the newest symbol `data_version`. `BrainChart` re-registers
+    every symbol when it rebuilds the registry, so removing a symbol also bumps it.
+    """
 
-        try:
+    try:
 
-            df = load_ticker_history_csv(symbol)
-            return int(df['timestamp'].max() / 1000)
-        #
-        except Exception as e:
+        return (current_registry().version)
+    #
+    except HTTPException:
 
-            raise HTTPException(status_code=500, detail={"s": "error", "errmsg": str(e)})
-        #
+        return (None)
     #
+#
 
+def conditional_response(request:Request, version:Optional[int], build:Callable[[], Any]) -> Response:
 
-    # Fallback: return latest timestamp across all symbols
-    try:
+    """
+    HTTP conditional caching of a datafeed response. The ETag is derived from `version`
+    (a `data_version`, in ns) and the query string; a matching `If-None-Match` (or a fresh
+    enough `If-Modified-Since`) is answered with 304 without calling `build()`. Responses are
+    `Cache-Control: no-cache`, so browsers keep them across reloads but revalidate each use.
+    UDF error payloads are never tagged.
+    """
 
-        registry = load_registry()
-        latest   = 0
+    if (version is None):
 
-        for key, meta in registry.items():
+        return (build())
+    #
 
-            if (not isinstance(meta, dict)):
+    query    = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    etag     = '"' + hashlib.sha1(f"{request.url.path}?{query}|{version}".encode("utf-8")).hexdigest()[:24] + '"'
+    modified = int(version) // 1_000_000_000
+    headers  = {"ETag": etag, "Last-Modified": formatdate(modified, usegmt=True), "Cache-Control": "no-cache"}
 
-                continue
-            #
+    if_none_match     = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if (if_none_match is not None):
 
-            df = load_ticker_history_csv(key)
-            ts = df['timestamp'].max()
+        if (etag in [tag.strip() for tag in if_none_match.split(",")]  or  if_none_match.strip() == "*"):
 
-            if (ts > latest):
+            return (Response(status_code=304, headers=headers))
+        #
+    #
+    elif (if_modified_since is not None):
+
+        try:
 
-                latest = ts
+            if (parsedate_to_datetime(if_modified_since).timestamp() >= modified):
+
+                return (Response(status_code=304, headers=headers))
             #
         #
+        except (TypeError, ValueError):
 
-        return (int(latest / 1000))
+            pass
+        #
     #
-    except Exception as e:
 
-        raise HTTPException(status_code=500, detail={"s": "error", "errmsg": str(e)})
+    response = build()
+    response = (response) if (isinstance(response, Response)) else (JSONResponse(content=response))
+
+    if (response.status_code == 200  and  not bytes(response.body).startswith(b'{"s":"error"')):
+
+        response.headers.update(headers)
     #
+
+    return (response)
 #
 
-@router.get("/search")
-async def search_symbols(query:str="", type:Optional[str]=None, exchange:Optional[str]=None, limit:Optional[int]=None):
-    
-    registry = load_registry()
-    matches  = []
+def stored_columns(path:Path, columns:Optional[List[str]]=None) -> Dict[str, np.ndarray]:
 
-    for key, meta in registry.items():
+    """Columns of stored bars; several workers map one shared mirror instead of each parsing its own copy."""
 
-        if (not isinstance(meta, dict)):
+    return ((shared_columns(path, SHARED_DIR, columns)) if (WORKERS > 1) else (read_columns(path, columns)))
+#
 
-            continue
-        #
+def level_store(path:Path) -> Optional[LevelStore]:
 
-        if (query.lower() in key.lower()):
+    """Several workers build each aggregated level of the bars at `path` once and map it, like the bars."""
 
-            if (exchange and meta.get("exchange").lower() != exchange.lower()):
-                
-                continue
-            #
-            
-            if (type and meta.get("type").lower() != type.lower()):
-                
-                continue
-            #
+    return ((lambda name, build: shared_level(path, SHARED_DIR, name, build)) if (WORKERS > 1) else (None))
+#
 
-            matches.append({
-                "symbol"      : key,
-                "name"        : meta.get("name"),
-                "ticker"      : meta.get("ticker"),
-                "full_name"   : meta.get("full_name"),
-                "description" : meta.get("description"),
-                "exchange"    : meta.get("exchange"),
-                "type"        : meta.get("type"),
-            })
-        #
+def load_ticker_pyramid(ticker:str, columns:Optional[List[str]]=None) -> BarPyramid:
+
+    """
+    Cached multi-resolution bars of a ticker, read with column projection (`columns`, default
+    'timestamp' + OHLCV). The pyramid is built on first use from the symbol's
+    `supported_resolutions` and dropped when the stored file or its appended segments change on disk.
+    """
+
+    path = find_bars(DATAFEED_DIR, ticker)
+
+    if (path is None):
+
+        raise HTTPException(404, detail=f"No OHLCV data for ticker '{ticker}'")
     #
 
-    if (limit):
+    columns = list(columns or OHLCV_COLUMNS)
+
+    def loader(path:Path) -> BarPyramid:
 
-        matches = matches[:limit]
+        meta = load_registry().get(ticker)
+        meta = (meta) if (isinstance(meta, dict)) else ({})
+
+        return (BarPyramid(stored_columns(path, columns), meta.get("supported_resolutions"), level_store(path)).build())
     #
 
-    return (matches)
-#
-################################################# Symbol Routes
+    return (bar_cache.get(path, loader, key=(str(path), tuple(columns)), signature=stored_signature(path)))
 #
-def load_ticker_metadata(ticker:str) -> dict:
 
-    registry = load_registry()
-    meta     = registry.get(ticker)
+def load_ticker_ticks(ticker:str) -> Optional[TickStore]:
 
-    if (not meta):
+    """Cached tick data of a ticker with its aggregated levels, or None when it has no ticks stored."""
 
-        raise HTTPException(404, detail=f"Ticker '{ticker}' not found in registry")
+    path = find_bars(DATAFEED_DIR, ticks_key(ticker))
+
+    if (path is None):
+
+        return (None)
     #
 
-    return (meta)
+    return (bar_cache.get(path, lambda path: TickStore(stored_columns(path, TICK_COLUMNS), level_store(path)), key=(str(path), TICK_COLUMNS), signature=stored_signature(path)))
 #
 
+def load_ticker_history(ticker:str) -> pd.DataFrame:
 
-def parse_series_symbol(raw:str) -> tuple[str, str] | None:
+    return (pd.DataFrame(load_ticker_pyramid(ticker).base, copy=False))
+#
+################################################# Chart Routes
+#
+# The datafeed routes stay `async` but hand their work (registry and bar file reads, aggregation,
+# encoding) to `io_pool`, so a slow symbol never blocks the event loop serving everything else.
+#
+@router.get("/config")
+async def get_config(request:Request):
 
-    SERIES_SEP = "#SERIES:"
-    return ((tuple(raw.split(SERIES_SEP, 1))) if (SERIES_SEP in raw) else (None))
+    return (await io_pool.run(lambda: conditional_response(request, registry_version(), _config)))
 #
 
-def _parse_resolution(res:str) -> tuple[str, int]:
+def _config() -> dict:
 
-    """
-    Return (kind, n) where kind in {'sec','min','day','week','month'} and n is the multiplier.
-    '15' -> ('min', 15), '60' -> ('min', 60), '1S' -> ('sec', 1), '1D' -> ('day', 1),
-    '1W' -> ('week', 1), '1M' -> ('month', 1)
-    """
+    return {
+        "supported_resolutions"    : current_registry().supported_resolutions,
+        "supports_search"          : True,
+        "supports_group_request"   : False,
+        "supports_marks"           : False,
+        "supports_timescale_marks" : False,
+        "supports_time": True,
+    }
+#
+
+@router.get("/time")
+async def get_server_time(symbol:Optional[str]=None):
+
+    return (await io_pool.run(_server_time, symbol))
+#
+
+def _server_time(symbol:Optional[str]) -> int:
+
+    # Answered from the `bar_stats` of the registry; only symbols registered without them are read
+    try:
+
+        registry = current_registry()
+
+        if (symbol is not None):
 
-    r = str(res or "").strip().upper()
+            return (int(last_bar_timestamp(registry, symbol) / 1000))
+        #
+
+        # Fallback: return latest timestamp across all symbols, bars appended live included
+        if (registry.last_timestamp is not None):
 
-    if (r.endswith("S")):
+            tails = [live_tail(key) for key in live_store.tickers() if (key in registry.symbols)]
+
+            return (int(max([registry.last_timestamp] + [tail.last for tail in tails if (tail is not None  and  len(tail))]) / 1000))
+        #
 
-        return ("sec", int(r[:-1] or "1"))
+        return (int(max((last_bar_timestamp(registry, key) for key in registry.symbols), default=0) / 1000))
     #
-    if (r.endswith("D")):
+    except Exception as e:
 
-        return ("day", int(r[:-1] or "1"))
+        raise HTTPException(status_code=500, detail={"s": "error", "errmsg": str(e)})
     #
-    if (r.endswith("W")):
+#
+
+def last_bar_timestamp(registry:Registry, ticker:str) -> int:
 
-        return ("week", int(r[:-1] or "1"))
+    tail = live_tail(ticker)
+
+    if (tail is not None  and  len(tail)):
+
+        return (tail.last)
     #
-    if (r.endswith("M")):
 
-        return ("month", int(r[:-1] or "1"))
+    stats = registry.stats(ticker)
+
+    if (stats  and  stats.get("last_timestamp") is not None):
+
+        return (stats["last_timestamp"])
     #
 
-    return ("min", int(r or "1"))
+    return (int(load_ticker_history(ticker)['timestamp'].max()))
 #
 
-def _agg_ohlcv(df:pd.DataFrame, kind:str, n:int) -> pd.DataFrame:
+@router.get("/search")
+async def search_symbols(request:Request, query:str="", type:Optional[str]=None, exchange:Optional[str]=None, limit:Optional[int]=None):
 
-    """
-    Aggregate OHLCV to the requested bucket.
-    Expects df with 'timestamp' (ms), 'open','high','low','close','volume'.
-    Returns the same columns, with 'timestamp' aligned to bucket start (ms).
-    """
+    return (await io_pool.run(lambda: conditional_response(request, registry_version(), lambda: _search(query, type, exchange, limit))))
+#
 
-    if (df.empty):
+def _search(query:str, type:Optional[str], exchange:Optional[str], limit:Optional[int]) -> list:
 
-        return df
-    #
+    # Ranked exact > prefix > substring by the index built at registry load, cut at `limit`
+    registry = current_registry()
+    matches  = []
 
-    if (kind in ("sec", "min")):
+    for key in registry.index.search(query, exchange=exchange, type=type, limit=limit):
 
-        bucket_ms = (n * 1000) if kind == "sec" else (n * 60_000)
-        gb        = (df["timestamp"] // bucket_ms) * bucket_ms
-        out       = (df.assign(_b=gb)
-                       .groupby("_b", as_index=False)
-                       .agg({
-                            "open": "first",
-                            "high": "max",
-                            "low":  "min",
-                            "close":"last",
-                            "volume":"sum"
-                        })
-                    )
-        
-        out = out.rename(columns={"_b": "timestamp"})
+        meta = registry.symbols[key]
 
-        return (out.dropna())
+        matches.append({
+            "symbol"      : key,
+            "name"        : meta.get("name"),
+            "ticker"      : meta.get("ticker"),
+            "full_name"   : meta.get("full_name"),
+            "description" : meta.get("description"),
+            "exchange"    : meta.get("exchange"),
+            "type"        : meta.get("type"),
+        })
     #
 
-    rule = {"day":"D", "week":"W-MON", "month":"M"}[kind]
-    ts   = pd.to_datetime(df["timestamp"], unit="ms", utc=True)
-    out  = (df.assign(_ts=ts).set_index("_ts")
-              .resample(rule, label="left", closed="left", origin="epoch")
-              .agg({
-                  "open": "first",
-                  "high": "max",
-                  "low":  "min",
-                  "close":"last",
-                  "volume":"sum"
-               })
-             .dropna()
-             .reset_index()
-          )
-    
-    out["timestamp"] = (out["_ts"].astype("int64") // 10**6)
+    return (matches)
+#
+
+@router.get("/stats")
+async def get_stats():
 
-    return (out.drop(columns=["_ts"]))
+    return {
+        "bar_cache"     : bar_cache.stats(),
+        "history_cache" : history_cache.stats(),
+        "registry"      : registry_store.stats(),
+        "live"          : {**live_store.stats(), **live_hub.stats()},
+        "shapes"        : shape_hub.stats(),
+        "io_pool"       : io_pool.stats(),
+        "loop_lag"      : loop_lag.stats(),
+    }
 #
 
-def _agg_series(x:pd.DataFrame, col:str, kind:str, n:int) -> pd.DataFrame:
+@router.post("/registry/reload")
+async def reload_registry():
 
-    """
-    Aggregate a single numeric series to requested bucket (use last value per bucket).
-    Expects x with 'timestamp' (ms) and the 'col'.
-    """
+    """Reload hook: re-read registry.json now instead of on the next detected change."""
 
-    if x.empty:
+    try:
 
-        return x[["timestamp", col]]
+        registry = await io_pool.run(registry_store.reload)
     #
+    except FileNotFoundError:
 
-    if kind in ("sec", "min"):
+        raise HTTPException(500, detail="No registry.json found")
+    #
 
-        bucket_ms = (n * 1000) if kind == "sec" else (n * 60_000)
-        gb        = (x["timestamp"] // bucket_ms) * bucket_ms
-        y         = (x.assign(_b=gb)
-                       .groupby("_b", as_index=False)[col]
-                       .last()
-                    )
-        
-        return (y.rename(columns={"_b": "timestamp"}).dropna())
+    return {"s": "ok", "symbols": len(registry.symbols), "version": registry.version}
+#
+################################################# Symbol Routes
+#
+def load_ticker_metadata(ticker:str) -> dict:
+
+    registry = load_registry()
+    meta     = registry.get(ticker)
+
+    if (not meta):
+
+        raise HTTPException(404, detail=f"Ticker '{ticker}' not found in registry")
     #
 
-    rule = {"day":"D", "week":"W-MON", "month":"M"}[kind]
-    ts   = pd.to_datetime(x["timestamp"], unit="ms", utc=True)
-    y   = (x.assign(_ts=ts).set_index("_ts")[col]
-             .resample(rule, label="left", closed="left", origin="epoch")
-             .last()
-             .dropna()
-             .reset_index()
-          )
-    
-    y["timestamp"] = (y["_ts"].astype("int64") // 10**6)
+    return (meta)
+#
+
 
-    return (y.drop(columns=["_ts"]))
+def parse_series_symbol(raw:str) -> tuple[str, str] | None:
+
+    SERIES_SEP = "#SERIES:"
+    return ((tuple(raw.split(SERIES_SEP, 1))) if (SERIES_SEP in raw) else (None))
 #
 
 @router.get("/symbols")
-async def get_symbols(symbol:str):
+async def get_symbols(request:Request, symbol:str):
+
+    return (await io_pool.run(lambda: conditional_response(request, symbol_version(symbol), lambda: _symbols(symbol))))
+#
+
+def _symbols(symbol:str) -> dict:
 
     pair = parse_series_symbol(symbol)
     if (pair):
@@ -426,145 +579,530 @@ async def get_symbols(symbol:str):
     return (meta)
 #
 
-@router.get("/history")
-async def get_history(symbol:str, resolution:str, from_time:int=Query(..., alias="from", description="Start time of the data"), to_time:int=Query(..., alias="to", description="End time of the data"), countback:Optional[int]=None):
-
-    try:
-        
-        if (not symbol):
+def history_response(fmt:str, t:np.ndarray, o:Optional[np.ndarray], h:Optional[np.ndarray], l:Optional[np.ndarray], c:np.ndarray, v:Optional[np.ndarray], ms:bool=False) -> Response:
 
-            raise HTTPException(status_code=400, detail="Symbol parameter is required")
-        #
+    """
+    Encode an "ok" history payload. JSON (the UDF default) repeats `c` for missing o/h/l and
+    sends 0 volumes; the binary format marks them absent instead. With `ms`, `t` is in
+    milliseconds (tick bars) and JSON times become fractional seconds.
+    """
 
+    if (fmt == "binary"):
 
-        pair = parse_series_symbol(symbol)
-        if (pair):
+        return Response(content=history_binary(t, o, h, l, c, v, ms=ms), media_type=HISTORY_BINARY_MEDIA_TYPE)
+    #
 
-            base, col = pair
-            df        = load_ticker_history_csv(base)
+    v = (np.zeros(len(c), dtype=np.int64)) if (v is None) else (v)
+    t = (t / 1000) if (ms) else (t)
 
-            if (col not in df.columns):
+    return HistoryResponse(history_json(t, (c if o is None else o), (c if h is None else h), (c if l is None else l), c, v))
+#
 
-                return JSONResponse(content={"s":"no_data", "nextTime": from_time})
-            #
+@router.get("/history")
+async def get_history(request:Request, symbol:str, resolution:str, from_time:int=Query(..., alias="from", description="Start time of the data"), to_time:int=Query(..., alias="to", description="End time of the data"), countback:Optional[int]=None,
+                      fmt:str=Query("json", alias="format", description="'json' (UDF) or 'binary' (see serialize.history_binary)")):
 
-            x       = df[["timestamp", col]].copy()
-            kind, n = _parse_resolution(resolution)
-            x       = _agg_series(x, col, kind, n)
+    return (await io_pool.run(_get_history, request, symbol, resolution, from_time, to_time, countback, fmt))
+#
 
+@router.get("/history/batch")
+async def get_history_batch(symbols:List[str]=Query(..., description="Symbols to load, repeated (`BASE#SERIES:col` included)"), resolution:str=Query(...), from_time:int=Query(..., alias="from", description="Start time of the data"), to_time:int=Query(..., alias="to", description="End time of the data"), countback:Optional[int]=None,
+                            fmt:str=Query("json", alias="format", description="'json' or 'binary' (see serialize.history_batch_binary)")):
 
-            if (resolution == "1D"):
+    if (len(symbols) > HISTORY_BATCH_LIMIT):
 
-                x["timestamp"] = pd.to_datetime(x["timestamp"], unit="ms")
-                x = (
-                    x.set_index("timestamp")[col]
-                     .resample("D").last()
-                     .dropna()
-                     .reset_index()
-                )
-                x["timestamp"] = x["timestamp"].astype(np.int64) // 10**6
-            #
-            else:
+        raise HTTPException(400, detail=f"At most {HISTORY_BATCH_LIMIT} symbols per batch")
+    #
 
-                x = x.dropna()
-            #
+    return (await io_pool.run(_history_batch, symbols, resolution, from_time, to_time, countback, fmt))
+#
 
+def _get_history(request:Request, symbol:str, resolution:str, from_time:int, to_time:int, countback:Optional[int], fmt:str) -> Response:
 
-            if (countback is not None):
+    version = symbol_version(symbol)
 
-                mask = (x["timestamp"] < to_time*1000)
-                xf   = x[mask].sort_values("timestamp").tail(countback).reset_index(drop=True)
-            #
-            else:
+    return (conditional_response(request, version, lambda: _cached_history(symbol, resolution, from_time, to_time, countback, fmt, version)))
+#
 
-                mask = (x["timestamp"] >= from_time*1000) & (x["timestamp"] < to_time*1000)
-                xf   = x[mask].sort_values("timestamp").reset_index(drop=True)
-            #
+def _cached_history(symbol:str, resolution:str, from_time:int, to_time:int, countback:Optional[int], fmt:str, version:Optional[int], load:Optional[Callable[[], BarPyramid]]=None) -> Response:
 
-            if (xf.empty):
+    """
+    `_history` memoized on the full query in `history_cache`, grouped by base ticker and tied to
+    its `data_version`: a repeated window is answered from the encoded bytes. Errors are not kept.
+    """
 
-                return JSONResponse(content={"s":"no_data", "nextTime": from_time})
-            #
+    if (version is None):
 
-            ts  = (xf["timestamp"]/1000).astype(int).tolist()
-            arr = xf[col].astype(float).tolist()
+        return (_history(symbol, resolution, from_time, to_time, countback, fmt, load))
+    #
 
-            return JSONResponse(content={
-                "s": "ok",
-                "t": ts,
-                "o": arr,
-                "h": arr,
-                "l": arr,
-                "c": arr,
-                "v": [0]*len(arr),
-            })
-        #
+    pair  = parse_series_symbol(symbol)
+    group = (pair[0]) if (pair) else (symbol)
+    key   = (symbol, resolution, from_time, to_time, countback, fmt)
+    hit   = history_cache.get(group, key, version)
 
+    if (hit is not None):
 
-        df          = load_ticker_history_csv(symbol)
-        kind, n     = _parse_resolution(resolution)
-        df          = _agg_ohlcv(df, kind, n)
-        filtered_df = None
+        body, media_type = hit
 
-        if (from_time > 0 or to_time > 0):
+        return (Response(content=body, media_type=media_type))
+    #
 
-            if (resolution == '1D'):
-
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df = df.set_index('timestamp').resample('D').agg({
-                    'open'  : 'first',
-                    'high'  : 'max',
-                    'low'   : 'min',
-                    'close' : 'last',
-                    'volume': 'sum'
-                }).reset_index()
-                df['timestamp'] = df['timestamp'].astype(np.int64) // 10**6
-            #
+    response = _history(symbol, resolution, from_time, to_time, countback, fmt, load)
+    body     = bytes(response.body)
 
-            if (countback is not None):
+    if (response.status_code == 200  and  not body.startswith(b'{"s":"error"')):
 
-                mask        = (df['timestamp'] < to_time*1000)
-                filtered_df = df[mask].sort_values(by=['timestamp']).tail(countback).reset_index(drop=True)
-            #
-            else:
+        history_cache.put(group, key, version, (body, response.media_type), len(body))
+    #
 
-                mask        = (df['timestamp'] >= from_time*1000) & (df['timestamp'] < to_time*1000)
-                filtered_df = df[mask].sort_values(by=['timestamp']).reset_index(drop=True)
-            #
+    return (response)
+#
 
-            if (filtered_df.empty or len(filtered_df) == 0):
+def no_data(next_ms:Optional[int]=None, ms:bool=False) -> Response:
 
-                return JSONResponse(content={"s":"no_data", "nextTime":from_time})
-            #
+    """
+    UDF "no_data" payload; `nextTime` (seconds) only when an earlier bar exists, so the client
+    jumps straight to it. With `ms` it keeps the milliseconds of sub-second tick bars.
+    """
 
-            return JSONResponse(content={
-                "s": "ok",
-                "t": (filtered_df['timestamp']/1000).astype(int).tolist(),
-                "o": filtered_df['open'].tolist(),
-                "h": filtered_df['high'].tolist(),
-                "l": filtered_df['low'].tolist(),
-                "c": filtered_df['close'].tolist(),
-                "v": filtered_df['volume'].tolist(),
-            })
-        #
-        else:
+    if (next_ms is None):
 
-            return JSONResponse(content={"s": "no_data", "nextTime": from_time})
-        #
+        return JSONResponse(content={"s": "no_data"})
     #
-    except Exception as e:
 
-        return JSONResponse(content={"s": "error", "errmsg": str(e)})
-    #
+    return JSONResponse(content={"s": "no_data", "nextTime": (next_ms / 1000) if (ms) else (int(next_ms // 1000))})
 #
-################################################# Shaping Routes
-#
-def _canon(obj):
 
-    return (json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False))
-#
+def _history(symbol:str, resolution:str, from_time:int, to_time:int, countback:Optional[int], fmt:str, load:Optional[Callable[[], BarPyramid]]=None) -> Response:
 
-def _normalize_points(points:List[Dict]) -> List[Dict]:
+    """
+    One `/history` payload. `load` supplies the bar pyramid of the base ticker (a batch shares
+    one across its symbols); by default the pyramid of just the columns this symbol needs.
+    """
+
+    try:
+        
+        if (not symbol):
+
+            raise HTTPException(status_code=400, detail="Symbol parameter is required")
+        #
+
+
+        pair  = parse_series_symbol(symbol)
+        kind  = parse_resolution(resolution)[0]
+
+        # Tick ('100T') and seconds resolutions come from the tick data when the symbol has some
+        if (not pair  and  kind in ("tick", "sec")):
+
+            ticks = load_ticker_ticks(symbol)
+
+            if (ticks is not None):
+
+                bars = ticks.history(resolution, from_time*1000, to_time*1000, countback)
+
+                if (len(bars["timestamp"]) == 0):
+
+                    return (no_data(ticks.next_time(resolution, from_time*1000), ms=(kind == "tick")))
+                #
+
+                ms = (kind == "tick")
+
+                return (history_response(fmt, (bars['timestamp']) if (ms) else (bars['timestamp'] // 1000), bars['open'], bars['high'], bars['low'], bars['close'], bars['volume'], ms=ms))
+            #
+        #
+
+        # Tick buckets have no fixed width: without tick data (and for `#SERIES` columns, which
+        # only exist on the bars) there is nothing to aggregate
+        if (kind == "tick"):
+
+            return (no_data())
+        #
+
+        stats = current_registry().stats((pair[0]) if (pair) else (symbol))
+
+        # Window entirely before the bucket of the first stored bar: nothing earlier either, no need to load the bars
+        if (stats  and  stats.get("first_timestamp") is not None):
+
+            first = bucket_start(np.array([stats["first_timestamp"]], dtype=np.int64), *parse_resolution(resolution))[0]
+
+            if (to_time*1000 <= first):
+
+                return (no_data())
+            #
+        #
+
+        if (pair):
+
+            base, col = pair
+            pyramid   = (load()) if (load) else (load_ticker_pyramid(base, ["timestamp", col]))
+
+            if (col not in pyramid.base):
+
+                return (no_data())
+            #
+
+            tail = live_tail(base)
+            x    = live_history(pyramid, tail, resolution, from_time*1000, to_time*1000, countback, col)
+
+            if (len(x["timestamp"]) == 0):
+
+                return (no_data(live_next_time(pyramid, tail, resolution, from_time*1000, col)))
+            #
+
+            arr = x[col].astype(float)
+
+            return (history_response(fmt, x["timestamp"] // 1000, None, None, None, arr, None))
+        #
+
+
+        pyramid = (load()) if (load) else (load_ticker_pyramid(symbol))
+
+        if (from_time > 0 or to_time > 0):
+
+            tail = live_tail(symbol)
+            bars = live_history(pyramid, tail, resolution, from_time*1000, to_time*1000, countback)
+
+            if (len(bars["timestamp"]) == 0):
+
+                return (no_data(live_next_time(pyramid, tail, resolution, from_time*1000)))
+            #
+
+            return (history_response(fmt, bars['timestamp'] // 1000, bars['open'], bars['high'], bars['low'], bars['close'], bars['volume']))
+        #
+        else:
+
+            return (no_data())
+        #
+    #
+    except Exception as e:
+
+        return JSONResponse(content={"s": "error", "errmsg": str(e)})
+    #
+#
+
+def batch_loader(base:str, cols:List[Optional[str]]) -> Callable[[], BarPyramid]:
+
+    """
+    Loader of the one pyramid serving every symbol of a batch on `base`: OHLCV when the base
+    itself is requested (`None` in `cols`), plus each requested series column. Called lazily,
+    so a batch answered from `history_cache` reads nothing.
+    """
+
+    columns  = list(OHLCV_COLUMNS) if (None in cols) else (["timestamp"])
+    columns += sorted({col for col in cols if (col is not None)} - set(columns))
+    loaded   = []
+
+    def load() -> BarPyramid:
+
+        if (not loaded):
+
+            loaded.append(load_ticker_pyramid(base, columns))
+        #
+
+        return (loaded[0])
+    #
+
+    return (load)
+#
+
+def _history_batch(symbols:List[str], resolution:str, from_time:int, to_time:int, countback:Optional[int], fmt:str) -> Response:
+
+    """
+    `/history` of several symbols for one resolution and window. Symbols are grouped by base
+    ticker and each base is read and aggregated once for all its columns. Every symbol keeps
+    its own payload (ok, no_data or error) and its `history_cache` entry.
+    """
+
+    symbols = list(dict.fromkeys(symbol for symbol in symbols if (symbol)))
+    groups  : Dict[str, List[Optional[str]]] = {}
+
+    for symbol in symbols:
+
+        pair = parse_series_symbol(symbol)
+
+        groups.setdefault((pair[0]) if (pair) else (symbol), []).append((pair[1]) if (pair) else (None))
+    #
+
+    loaders  = {base: batch_loader(base, cols) for base, cols in groups.items()}
+    payloads = []
+
+    for symbol in symbols:
+
+        pair     = parse_series_symbol(symbol)
+        response = _cached_history(symbol, resolution, from_time, to_time, countback, fmt, symbol_version(symbol), loaders[(pair[0]) if (pair) else (symbol)])
+
+        payloads.append((symbol, bytes(response.body)))
+    #
+
+    if (fmt == "binary"):
+
+        return Response(content=history_batch_binary(payloads), media_type=HISTORY_BINARY_MEDIA_TYPE)
+    #
+
+    return HistoryResponse(b'{"s":"ok","results":{' + b",".join(json.dumps(symbol).encode() + b":" + body for symbol, body in payloads) + b"}}")
+#
+################################################# Live Routes
+#
+STREAM_KEEPALIVE = 15.0         # seconds between SSE comments on an idle `/stream`, keeps proxies from closing it
+LIVE_FOLLOW      = 0.1          # seconds between two reads of the live journals written by the other workers
+STREAM_RESET     = 1.0          # seconds between two `/stream` checks of the ticker's `data_version`
+
+
+def stored_bar(ticker:str) -> Dict[str, float]:
+
+    """Every stored column of the last stored bar of `ticker`, the seed of a live update to that bar."""
+
+    # Stored rows are sorted: only the newest one is read, not the whole file
+    return (read_last_row(find_bars(DATAFEED_DIR, ticker)))
+#
+
+def bar_events(bars:Dict[str, np.ndarray], col:Optional[str]=None) -> List[dict]:
+
+    """History columns as TradingView bar objects (time in ms), the `/stream` message payloads."""
+
+    times = bars["timestamp"].astype(np.int64).tolist()
+
+    if (col is not None):
+
+        return [{"time": t, "open": v, "high": v, "low": v, "close": v} for t, v in zip(times, bars[col].astype(float).tolist())]
+    #
+
+    values = zip(*(bars[name].astype(float).tolist() for name in OHLCV))
+
+    return [{"time": t, **dict(zip(OHLCV, bar))} for t, bar in zip(times, values)]
+#
+
+def bar_updates(ticker:str, tail:LiveTail, first:int, last:int, subscriptions:List[Tuple[str, str]]) -> List[Tuple[str, str, List[dict]]]:
+
+    """
+    (symbol, resolution, bars) touched by live rows in [first, last] (ms), for each `/stream`
+    subscription fed by `ticker`. Live rows are bars: tick resolutions get no updates from them.
+    A subscription that fails is skipped, the rows are committed already.
+    """
+
+    updates = []
+
+    for symbol, resolution in subscriptions:
+
+        try:
+
+            kind, size = parse_resolution(resolution)
+
+            if (kind == "tick"):
+
+                continue
+            #
+
+            pair    = parse_series_symbol(symbol)
+            col     = (pair[1]) if (pair) else (None)
+            pyramid = (load_ticker_pyramid(ticker, ["timestamp", col])) if (col) else (load_ticker_pyramid(ticker))
+
+            if (col is not None  and  col not in pyramid.base):
+
+                continue
+            #
+
+            start = int(bucket_start(np.array([first], dtype=np.int64), kind, size)[0])
+            bars  = live_history(pyramid, tail, resolution, start, last + 1, None, col)
+        #
+        except Exception:
+
+            continue
+        #
+
+        updates.append((symbol, resolution, bar_events(bars, col)))
+    #
+
+    return (updates)
+#
+
+@router.post("/bars/append")
+async def append_bars(payload:BarsAppend):
+
+    """
+    Merge bars received after registration (`Symbol.append`, `Symbol.update_last_bar`) into the
+    live tail of `payload.symbol`, without touching its stored file, and push the touched bars to
+    `/stream`. A bar at the timestamp of the last bar updates it; older bars are rejected (400).
+    """
+
+    # Subscriptions are read and bars published on the event loop, the rest runs on `io_pool`
+    tail, updates = await io_pool.run(_append_bars, payload, live_hub.subscriptions(payload.symbol))
+
+    for symbol, resolution, bars in updates:
+
+        live_hub.publish(symbol, resolution, bars)
+    #
+
+    return {"s": "ok", "rows": len(tail), "version": tail.version}
+#
+
+def _append_bars(payload:BarsAppend, subscriptions:List[Tuple[str, str]]) -> Tuple[LiveTail, List[Tuple[str, str, List[dict]]]]:
+
+    meta = current_registry().get(payload.symbol)
+
+    if (not meta):
+
+        raise HTTPException(404, detail=f"Ticker '{payload.symbol}' not found in registry")
+    #
+
+    pyramid = load_ticker_pyramid(payload.symbol)
+    stored  = pyramid.base["timestamp"]
+
+    try:
+
+        rows              = live_rows(payload.bars)
+        tail, first, last = live_store.upsert(payload.symbol, meta.get("data_version"), rows, (int(stored[-1])) if (len(stored)) else (None), lambda: stored_bar(payload.symbol))
+    #
+    except (ValueError, TypeError) as e:
+
+        raise HTTPException(400, detail=str(e))
+    #
+
+    return (tail, bar_updates(payload.symbol, tail, first, last, subscriptions))
+#
+
+def followed_updates(ticker:str, subscriptions:List[Tuple[str, str]]) -> List[Tuple[str, str, List[dict]]]:
+
+    """Bars touched in `ticker`'s live journal since the last call (by any worker), for the local `subscriptions`."""
+
+    tail    = live_tail(ticker)
+    touched = live_store.take_touched(ticker)
+
+    if (tail is None  or  touched is None):
+
+        return ([])
+    #
+
+    return (bar_updates(ticker, tail, *touched, subscriptions))
+#
+
+async def follow_journals():
+
+    """
+    With several workers, `/bars/append` reaches one of them: the others pick the rows up from
+    the ticker's journal and publish them to their own `/stream` subscribers.
+    """
+
+    while (True):
+
+        await asyncio.sleep(LIVE_FOLLOW)
+
+        for ticker in live_hub.tickers():
+
+            try:
+
+                updates = await io_pool.run(followed_updates, ticker, live_hub.subscriptions(ticker))
+            #
+            except Exception:
+
+                continue
+            #
+
+            for symbol, resolution, bars in updates:
+
+                live_hub.publish(symbol, resolution, bars)
+            #
+        #
+    #
+#
+
+@router.get("/stream")
+async def stream_bars(request:Request, symbol:str, resolution:str):
+
+    """
+    Server-Sent Events feeding the widget's `subscribeBars`: one `data:` message per bar (JSON,
+    time in ms) at `resolution`, sent as soon as `/bars/append` touches it. When the ticker's
+    `data_version` changes (`Symbol.extend`, a new registration), a `reset` event tells the
+    client to drop its cached bars first.
+    """
+
+    try:
+
+        parse_resolution(resolution)
+    #
+    except ValueError:
+
+        raise HTTPException(400, detail=f"Invalid resolution '{resolution}'")
+    #
+
+    pair   = parse_series_symbol(symbol)
+    ticker = (pair[0]) if (pair) else (symbol)
+
+    # Rows journaled before this worker followed the ticker are in the client's history already
+    if (WORKERS > 1  and  ticker not in live_hub.tickers()):
+
+        await io_pool.run(followed_updates, ticker, [])
+    #
+
+    queue   = live_hub.subscribe(symbol, resolution)
+    version = await io_pool.run(data_version, ticker)
+
+    async def events():
+
+        nonlocal version
+
+        idle = 0.0
+
+        try:
+
+            yield ("retry: 1000\n\n")
+
+            while (not await request.is_disconnected()):
+
+                try:
+
+                    bar = await asyncio.wait_for(queue.get(), timeout=STREAM_RESET)
+                #
+                except asyncio.TimeoutError:
+
+                    bar = None
+                #
+
+                current = await io_pool.run(data_version, ticker)
+
+                if (current != version):
+
+                    version = current
+
+                    yield ("event: reset\ndata: {}\n\n")
+                #
+
+                if (bar is not None):
+
+                    idle = 0.0
+
+                    yield (f"data: {json.dumps(bar)}\n\n")
+                #
+                else:
+
+                    idle += STREAM_RESET
+
+                    if (idle >= STREAM_KEEPALIVE):
+
+                        idle = 0.0
+
+                        yield (": keep-alive\n\n")
+                    #
+                #
+            #
+        #
+        finally:
+
+            live_hub.unsubscribe(symbol, resolution, queue)
+        #
+    #
+
+    return (StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}))
+#
+################################################# Shaping Routes
+#
+def _canon(obj):
+
+    return (json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False))
+#
+
+def _normalize_points(points:List[Dict]) -> List[Dict]:
 
     pts = []
 
@@ -595,13 +1133,43 @@ def _normalize_points(points:List[Dict]) -> List[Dict]:
     return (pts)
 #
 
+def _shape_sig(symbol:str, shape_type:str, points:List[Dict], options:Optional[Dict[str, Any]]) -> str:
+
+    sig_src = f"{symbol}|{shape_type}|{_canon(points)}|{_canon(options or {})}"
+
+    return (hashlib.sha1(sig_src.encode("utf-8")).hexdigest())
+#
+
+def _shape_dict(s:Shape) -> dict:
+
+    return {
+        "id"         : s.id,
+        "symbol"     : s.symbol,
+        "shape_type" : s.shape_type,
+        "points"     : s.points,
+        "options"    : s.options,
+        "created_at" : s.created_at,
+        "rev"        : s.rev,
+        "t_min"      : (s.t_min) if (s.t_min != SHAPE_TIME_MIN) else (None),
+        "t_max"      : (s.t_max) if (s.t_max != SHAPE_TIME_MAX) else (None),
+        "p_min"      : s.p_min,
+        "p_max"      : s.p_max,
+    }
+#
+
+def _in_range(s:Shape, start:Optional[int], end:Optional[int]) -> bool:
+
+    return ((start is None  or  s.t_max >= start)  and  (end is None  or  s.t_min <= end))
+#
+
+SHAPES_BULK_LIMIT = 10_000      # shapes per POST /shapes/bulk; clients send larger sets in chunks
+
+
 @router.post("/shapes", response_model=ShapeResponse)
 def create_shape(payload:ShapeCreate, db:Session=Depends(get_db)):
 
     pts = _normalize_points(payload.points)
-
-    sig_src = f"{payload.symbol}|{payload.shape_type}|{_canon(pts)}|{_canon(payload.options or {})}"
-    sig     = hashlib.sha1(sig_src.encode("utf-8")).hexdigest()
+    sig = _shape_sig(payload.symbol, payload.shape_type, pts, payload.options)
 
     shape = Shape(
         symbol     = payload.symbol,
@@ -609,35 +1177,104 @@ def create_shape(payload:ShapeCreate, db:Session=Depends(get_db)):
         points     = pts,
         options    = payload.options or {},
         sig        = sig,
+        rev        = next_shape_rev(db),
     )
 
+    shape.set_extent()
+
     db.add(shape)
     db.commit()
     db.refresh(shape)
 
-    return {
-        "id"         : shape.id,
-        "symbol"     : shape.symbol,
-        "shape_type" : shape.shape_type,
-        "points"     : shape.points,
-        "options"    : shape.options,
-        "created_at" : shape.created_at,
-    }
+    shape_hub.notify(shape.rev, {shape.symbol})
+
+    return (_shape_dict(shape))
+#
+
+@router.post("/shapes/bulk", response_model=ShapeBulkResponse)
+def create_shapes(payload:ShapeBulkCreate, db:Session=Depends(get_db)):
+
+    """
+    Create many shapes of one symbol in a single transaction: every shape is validated and
+    signed first, then all rows are inserted and committed together (all or nothing).
+    Returns their ids, in request order.
+    """
+
+    if (len(payload.shapes) > SHAPES_BULK_LIMIT):
+
+        raise HTTPException(413, f"at most {SHAPES_BULK_LIMIT} shapes per request")
+    #
+
+    shapes = []
+
+    for i, item in enumerate(payload.shapes):
+
+        try:
+
+            pts = _normalize_points(item.points)
+        #
+        except (TypeError, ValueError) as e:
+
+            raise HTTPException(422, f"shapes[{i}]: invalid points ({e})")
+        #
+
+        shapes.append(Shape(
+            symbol     = payload.symbol,
+            shape_type = item.shape_type,
+            points     = pts,
+            options    = item.options or {},
+            sig        = _shape_sig(payload.symbol, item.shape_type, pts, item.options),
+        ))
+
+        shapes[-1].set_extent()
+    #
+
+    rev = next_shape_rev(db)
+
+    for shape in shapes:
+
+        shape.rev = rev
+    #
+
+    db.add_all(shapes)
+    db.flush()
+
+    ids = [shape.id for shape in shapes]
+
+    db.commit()
+
+    shape_hub.notify(rev, {payload.symbol})
+
+    return {"ids": ids}
 #
 
 @router.put("/shapes/{shape_id}", response_model=ShapeResponse)
 def update_shape(shape_id:int, payload:ShapeUpdate, db:Session=Depends(get_db)):
 
+    """
+    Update a shape in place, keeping its id. Moving it to another symbol leaves a `ShapeMove`
+    tombstone, so the old symbol's `since=` readers drop it.
+    """
+
     s = db.get(Shape, shape_id)
-    if (not s):
+    if (not s  or  s.deleted):
 
         raise HTTPException(404, "shape not found")
     #
 
-    if (payload.symbol is not None):
+    rev     = next_shape_rev(db)
+    symbols = {s.symbol}
+
+    if (payload.symbol is not None  and  payload.symbol != s.symbol):
+
+        db.merge(ShapeMove(shape_id=s.id, symbol=s.symbol, rev=rev))
+        db.query(ShapeMove).filter(ShapeMove.shape_id == s.id, ShapeMove.symbol == payload.symbol).delete(synchronize_session=False)
 
         s.symbol = payload.symbol
+
+        symbols.add(s.symbol)
     #
+
     if (payload.shape_type is not None):
 
         s.shape_type = payload.shape_type
@@ -651,43 +1288,201 @@ def update_shape(shape_id:int, payload:ShapeUpdate, db:Session=Depends(get_db)):
         s.options = payload.options
     #
 
-    sig_src = f"{s.symbol}|{s.shape_type}|{_canon(s.points)}|{_canon(s.options or {})}"
-    s.sig   = hashlib.sha1(sig_src.encode("utf-8")).hexdigest()
+    s.sig = _shape_sig(s.symbol, s.shape_type, s.points, s.options)
+    s.rev = rev
+
+    s.set_extent()
 
     db.add(s)
     db.commit()
     db.refresh(s)
 
-    return {
-        "id"         : s.id,
-        "symbol"     : s.symbol,
-        "shape_type" : s.shape_type,
-        "points"     : s.points,
-        "options"    : s.options,
-        "created_at" : s.created_at,
-    }
+    shape_hub.notify(rev, symbols)
+
+    return (_shape_dict(s))
 #
 
 @router.get("/shapes", response_model=ShapeAPIResponse)
-def list_shapes(symbol:str|None=None, db:Session=Depends(get_db)):
+def list_shapes(symbol:str|None=None, since:Optional[int]=Query(None, description="Only shapes changed after this revision"),
+                start:Optional[int]=Query(None, alias="from", description="Only shapes reaching this time (Unix seconds) or later"),
+                end:Optional[int]=Query(None, alias="to", description="Only shapes reaching this time (Unix seconds) or earlier"),
+                db:Session=Depends(get_db)):
 
-    q = db.query(Shape)
+    """
+    Shapes of `symbol` (or of every symbol), oldest first. With `since`, only the rows written
+    after that revision, in revision order: changed shapes in `items`, ids deleted since then
+    in `deleted`. `rev` is the high-water mark to pass as the next `since`. Tombstones are
+    purged after a while; a `since` older than that gets the full list with `reset` set.
+
+    `from` / `to` keep the shapes whose time extent intersects that range (e.g. the chart's
+    visible range); with `since`, shapes changed to lie outside it are listed in `deleted`.
+    """
+
+    return (_shape_delta(db, symbol, since, start, end))
+#
+
+def _shape_delta(db:Session, symbol:Optional[str], since:Optional[int], start:Optional[int]=None, end:Optional[int]=None) -> dict:
+
+    # Read the mark first: rows committed meanwhile come back again next time, never get lost
+    rev, horizon = shape_rev_horizon(db)
+
+    q     = db.query(Shape)
+    reset = (since is not None  and  0 < since < horizon)
 
     if (symbol):
 
         q = q.filter(Shape.symbol == symbol)
     #
 
-    items = [{
-        "id"         : s.id,
-        "symbol"     : s.symbol,
-        "shape_type" : s.shape_type,
-        "points"     : s.points,
-        "options"    : s.options,
-        "created_at" : s.created_at,
-    } for s in q.order_by(Shape.created_at.asc()).all()]
+    if (since is None  or  since <= 0  or  reset):
+
+        if (end is not None):
+
+            q = q.filter(Shape.t_min <= end)
+        #
+        if (start is not None):
+
+            q = q.filter(Shape.t_max >= start)
+        #
+
+        rows    = q.filter(Shape.deleted == False).order_by(Shape.created_at.asc(), Shape.id.asc()).all()
+        deleted = []
+    #
+    else:
+
+        rows    = q.filter(Shape.rev > since).order_by(Shape.rev.asc(), Shape.id.asc()).all()
+        deleted = [s.id for s in rows if (s.deleted  or  not _in_range(s, start, end))]
+        rows    = [s for s in rows if (not s.deleted  and  _in_range(s, start, end))]
+
+        # Shapes moved to another symbol since then (without `symbol`, they are in `items`)
+        if (symbol):
+
+            moved    = db.query(ShapeMove.shape_id).filter(ShapeMove.symbol == symbol, ShapeMove.rev > since).order_by(ShapeMove.rev.asc())
+            deleted += [shape_id for (shape_id,) in moved]
+        #
+    #
+
+    return {"items": [_shape_dict(s) for s in rows], "deleted": deleted, "rev": rev, "reset": reset}
+#
+
+def _read_shape_delta(symbol:str, since:int, start:Optional[int]=None, end:Optional[int]=None) -> dict:
+
+    with SessionLocal() as db:
 
-    return {"items": items}
+        return (jsonable_encoder(_shape_delta(db, symbol, since, start, end)))
+    #
+#
+
+def _read_shape_rev() -> int:
+
+    with SessionLocal() as db:
+
+        return (current_shape_rev(db))
+    #
+#
+
+@router.get("/shapes/stream")
+async def stream_shapes(request:Request, symbol:str, since:int=0,
+                        start:Optional[int]=Query(None, alias="from", description="Only shapes reaching this time (Unix seconds) or later"),
+                        end:Optional[int]=Query(None, alias="to", description="Only shapes reaching this time (Unix seconds) or earlier")):
+
+    """
+    Server-Sent Events pushing the shape changes of `symbol` as the `/shapes` routes commit
+    them: each `data:` message is a `GET /shapes?since=` answer (items, deleted, rev, reset) covering
+    everything since the previous one. The first message answers `since` (every live shape for 0).
+    `from` / `to` scope every message to a time range, as for `GET /shapes`.
+    """
+
+    event = shape_hub.subscribe(symbol)
+
+    async def events():
+
+        rev   = since
+        first = True
+
+        try:
+
+            yield ("retry: 1000\n\n")
+
+            while (not await request.is_disconnected()):
+
+                # Cleared before reading, so a commit landing during the read wakes the next one
+                event.clear()
+
+                delta = await io_pool.run(_read_shape_delta, symbol, rev, start, end)
+                rev   = delta["rev"]
+
+                if (first  or  delta["items"]  or  delta["deleted"]  or  delta["reset"]):
+
+                    yield (f"data: {json.dumps(delta)}\n\n")
+                #
+
+                first = False
+
+                while (not event.is_set()):
+
+                    try:
+
+                        await asyncio.wait_for(event.wait(), timeout=STREAM_KEEPALIVE)
+                    #
+                    except asyncio.TimeoutError:
+
+                        if (await request.is_disconnected()):
+
+                            return
+                        #
+
+                        yield (": keep-alive\n\n")
+                    #
+                #
+            #
+        #
+        finally:
+
+            shape_hub.unsubscribe(symbol, event)
+        #
+    #
+
+    return (StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}))
+#
+
+async def follow_shape_revisions():
+
+    """
+    With several workers, a shape write reaches one of them: the others see the shared revision
+    counter move and wake their own `/shapes/stream` subscribers.
+    """
+
+    seen = None
+
+    while (True):
+
+        await asyncio.sleep(LIVE_FOLLOW)
+
+        if (not shape_hub.listening()):
+
+            continue
+        #
+
+        try:
+
+            rev = await io_pool.run(_read_shape_rev)
+        #
+        except Exception:
+
+            continue
+        #
+
+        if (rev != seen):
+
+            if (seen is not None):
+
+                shape_hub.notify(rev)
+            #
+
+            seen = rev
+        #
+    #
 #
 
 @router.delete("/shapes/{shape_id}")
@@ -695,21 +1490,119 @@ def delete_shape(shape_id:int, db:Session=Depends(get_db)):
 
     s = db.get(Shape, shape_id)
 
-    if (not s):
+    if (not s  or  s.deleted):
 
         raise HTTPException(404, "shape not found")
     #
 
-    db.delete(s)
+    rev       = next_shape_rev(db)
+    symbol    = s.symbol
+    s.deleted = True
+    s.rev     = rev
+
     db.commit()
 
+    shape_hub.notify(rev, {symbol})
+
     return {"ok": True}
 #
+
+SQL_IN_CHUNK = 500      # values per `IN (...)`: older SQLite builds allow 999 bound variables per statement
+
+
+@router.post("/shapes/delete")
+def delete_shapes(payload:ShapeDeleteFilter, db:Session=Depends(get_db)):
+
+    """
+    Delete every shape matching all the given filters (symbol, shape_type, ids, created
+    before) with one SQL statement (one per 500 ids), turning the rows into tombstones, in one
+    transaction. At least one filter is required; a timezone-aware `created_before` is compared
+    in the server's local time, like `created_at`. Returns the count deleted.
+    """
+
+    if (all(value is None for value in payload.model_dump().values())):
+
+        raise HTTPException(400, "at least one filter is required")
+    #
+
+    q = db.query(Shape).filter(Shape.deleted == False)
+
+    if (payload.symbol is not None):
+
+        q = q.filter(Shape.symbol == payload.symbol)
+    #
+    if (payload.shape_type is not None):
+
+        q = q.filter(Shape.shape_type == payload.shape_type)
+    #
+    if (payload.ids is not None):
+
+        if (len(payload.ids) > SHAPES_BULK_LIMIT):
+
+            raise HTTPException(413, f"at most {SHAPES_BULK_LIMIT} ids per request")
+        #
+
+    #
+    if (payload.created_before is not None):
+
+        before = payload.created_before
+
+        # `created_at` is stored naive, in local time
+        if (before.tzinfo is not None):
+
+            before = before.astimezone().replace(tzinfo=None)
+        #
+
+        q = q.filter(Shape.created_at < before)
+    #
+
+    ids     = (list(payload.ids)) if (payload.ids is not None) else (None)
+    queries = [q.filter(Shape.id.in_(ids[i:i + SQL_IN_CHUNK])) for i in range(0, len(ids), SQL_IN_CHUNK)] if (ids is not None) else ([q])
+    rev     = next_shape_rev(db)
+    deleted = sum(query.update({Shape.deleted: True, Shape.rev: rev}, synchronize_session=False) for query in queries)
+
+    # Nothing matched: give the revision back, clients have nothing to sync
+    if (not deleted):
+
+        db.rollback()
+
+        return {"ok": True, "deleted": 0}
+    #
+
+    db.commit()
+
+    shape_hub.notify(rev, ({payload.symbol}) if (payload.symbol is not None) else (None))
+
+    return {"ok": True, "deleted": deleted}
+#
 ###################################################################################################
 ###################################################################################################
 ################################################################################################### Mounts
 #
-app = FastAPI(title="BrainChart Backend")
+@asynccontextmanager
+async def lifespan(app:FastAPI):
+
+    loop_lag.start()
+
+    loop      = asyncio.get_running_loop()
+    followers = ([loop.create_task(follow_journals()), loop.create_task(follow_shape_revisions())]) if (WORKERS > 1) else ([])
+
+    try:
+
+        yield
+    #
+    finally:
+
+        for follower in followers:
+
+            follower.cancel()
+        #
+
+        await loop_lag.stop()
+    #
+#
+
+app = FastAPI(title="BrainChart Backend", lifespan=lifespan)
 app.include_router(router)
 app.add_middleware(
     CORSMiddleware,
@@ -739,8 +1632,8 @@ app.mount("/"                , StaticFiles(directory=str(WIDGET_DIR), html=True)
 # endregion
 #
 
-# Ensure tables exist
-Base.metadata.create_all(bind=engine)
+# Ensure tables exist (and older shape tables have revisions)
+init_db()
 #
 ###################################################################################################
 ###################################################################################################
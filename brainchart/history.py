@@ -0,0 +1,913 @@
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Modules
+#
+# History engine used by the FastAPI backend.
+#
+# Bars are kept as NumPy columns ({'timestamp': int64 ms, 'open': ..., ...}) sorted by time.
+# A BarPyramid materializes one level per supported resolution; every level is built from the
+# coarsest already-built level whose buckets tile it exactly (e.g. 15 from 5, D from 240), so the
+# whole pyramid costs roughly one pass over the raw data. Resolutions outside the pyramid are
+# aggregated per request, from only the rows behind the requested buckets.
+#
+# Base columns may be read-only memory maps ("npy" storage). They are never copied wholesale:
+# levels whose buckets match the raw bars (e.g. 1S over 1-second data) are served from the map.
+#
+# A TickStore does the same for trades ({'timestamp', 'price', 'size'}): N-second bars and N-tick
+# bars ('100T') are aggregated from the ticks on first request and kept.
+#
+# Both take an optional level store: built levels then go through it (the server workers share
+# them as memory-mapped "npy" files) instead of living in each process.
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import is_mapped
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Resolutions
+#
+Columns    = Dict[str, np.ndarray]
+LevelKey   = Tuple[str, int]
+LevelStore = Callable[[str, Callable[[], Columns]], Columns]     # (level name, build) -> the level's columns
+
+OHLCV      = ("open", "high", "low", "close", "volume")
+
+DEFAULT_RESOLUTIONS = ["1S", "5S", "1", "3", "5", "15", "30", "60", "240", "D", "W"]
+
+_SEC_MS    = 1_000
+_MIN_MS    = 60_000
+_DAY_MS    = 86_400_000
+_WEEK_MS   = 7 * _DAY_MS
+_MONDAY_MS = 4 * _DAY_MS     # 1970-01-05, the first Monday after the epoch: weeks start on Mondays
+
+
+def parse_resolution(res:str) -> LevelKey:
+
+    """
+    Return (kind, n) where kind in {'tick','sec','min','day','week','month'} and n is the multiplier.
+    '15' -> ('min', 15), '60' -> ('min', 60), '1S' -> ('sec', 1), '1D' -> ('day', 1),
+    '1W' -> ('week', 1), '1M' -> ('month', 1), '100T' -> ('tick', 100)
+    """
+
+    r = str(res or "").strip().upper()
+
+    if (r.endswith("T")):
+
+        return ("tick", int(r[:-1] or "1"))
+    #
+    if (r.endswith("S")):
+
+        return ("sec", int(r[:-1] or "1"))
+    #
+    if (r.endswith("D")):
+
+        return ("day", int(r[:-1] or "1"))
+    #
+    if (r.endswith("W")):
+
+        return ("week", int(r[:-1] or "1"))
+    #
+    if (r.endswith("M")):
+
+        return ("month", int(r[:-1] or "1"))
+    #
+
+    return ("min", int(r or "1"))
+#
+
+def step_resolution(step_ms:int) -> Optional[str]:
+
+    """Resolution string of bars spaced `step_ms` apart (60_000 -> '1', 86_400_000 -> '1D'), or None."""
+
+    if (step_ms <= 0):
+
+        return (None)
+    #
+    if (28 * _DAY_MS <= step_ms <= 31 * _DAY_MS):
+
+        return ("1M")
+    #
+    if (step_ms % _WEEK_MS == 0):
+
+        return (f"{step_ms // _WEEK_MS}W")
+    #
+    if (step_ms % _DAY_MS == 0):
+
+        return (f"{step_ms // _DAY_MS}D")
+    #
+    if (step_ms % _MIN_MS == 0):
+
+        return (str(step_ms // _MIN_MS))
+    #
+    if (step_ms % _SEC_MS == 0):
+
+        return (f"{step_ms // _SEC_MS}S")
+    #
+
+    return (None)
+#
+
+def _grid(kind:str, n:int) -> Tuple[int, int]:
+
+    """(width, offset) in ms of a fixed-width bucket grid. Months have no fixed width."""
+
+    if (kind == "sec"):
+
+        return (n * _SEC_MS, 0)
+    #
+    if (kind == "min"):
+
+        return (n * _MIN_MS, 0)
+    #
+    if (kind == "day"):
+
+        return (n * _DAY_MS, 0)
+    #
+    if (kind == "week"):
+
+        return (n * _WEEK_MS, _MONDAY_MS)
+    #
+
+    raise ValueError(f"'{kind}' buckets have no fixed width")
+#
+
+def _nominal_ms(key:LevelKey) -> int:
+
+    kind, n = key
+
+    return ((n * 31 * _DAY_MS) if (kind == "month") else (_grid(kind, n)[0]))
+#
+
+def _divides(fine:LevelKey, coarse:LevelKey) -> bool:
+
+    """True when every `coarse` bucket is an exact union of `fine` buckets."""
+
+    if (fine[0] == "month"):
+
+        return (coarse[0] == "month"  and  coarse[1] % fine[1] == 0)
+    #
+
+    fine_w, fine_o = _grid(*fine)
+
+    if (coarse[0] == "month"):
+
+        return (fine_o == 0  and  _DAY_MS % fine_w == 0)
+    #
+
+    coarse_w, coarse_o = _grid(*coarse)
+
+    return (coarse_w % fine_w == 0  and  (coarse_o - fine_o) % fine_w == 0)
+#
+
+def bucket_start(ts:np.ndarray, kind:str, n:int) -> np.ndarray:
+
+    """Vectorized bucket start (ms) for each timestamp (ms)."""
+
+    if (kind == "month"):
+
+        months = ts.astype("datetime64[ms]").astype("datetime64[M]").astype(np.int64)
+        months = (months // n) * n
+
+        return (months.astype("datetime64[M]").astype("datetime64[ms]").astype(np.int64))
+    #
+
+    width, offset = _grid(kind, n)
+
+    return (((ts - offset) // width) * width + offset)
+#
+
+def _bucket_of(ms:int, kind:str, n:int) -> int:
+
+    return (int(bucket_start(np.array([ms], dtype=np.int64), kind, n)[0]))
+#
+
+def bucket_before(ts:np.ndarray, before_ms:int, kind:str, n:int) -> Optional[int]:
+
+    """
+    Start (ms) of the newest bucket holding a row of sorted `ts` that starts before `before_ms`,
+    or None. That bucket may hold only rows at or after `before_ms` (a week starting before it).
+    """
+
+    i = int(np.searchsorted(ts, before_ms, side="left"))
+
+    if (i < len(ts)):
+
+        start = _bucket_of(int(ts[i]), kind, n)
+
+        if (start < before_ms):
+
+            return (start)
+        #
+    #
+
+    return ((_bucket_of(int(ts[i - 1]), kind, n)) if (i) else (None))
+#
+
+def _next_bucket(start_ms:int, kind:str, n:int) -> int:
+
+    """Start (ms) of the bucket following the one that starts at `start_ms`."""
+
+    if (kind == "month"):
+
+        month = np.datetime64(int(start_ms), "ms").astype("datetime64[M]") + n
+
+        return (int(month.astype("datetime64[ms]").astype(np.int64)))
+    #
+
+    return (start_ms + _grid(kind, n)[0])
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Aggregation
+#
+def _segments(keys:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+
+    """Start/end indices of the runs of equal values in a sorted array."""
+
+    change = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts = np.concatenate(([0], change))
+    ends   = np.concatenate((change, [len(keys)]))
+
+    return (starts, ends)
+#
+
+def aggregate_ohlcv(cols:Columns, kind:str, n:int) -> Columns:
+
+    """
+    Aggregate time-sorted OHLCV columns to the requested bucket.
+    Returns the same columns, with 'timestamp' aligned to bucket start (ms).
+    """
+
+    ts = cols["timestamp"]
+
+    if (len(ts) == 0):
+
+        return {name: cols[name][:0] for name in ("timestamp",) + OHLCV}
+    #
+
+    b            = bucket_start(ts, kind, n)
+    starts, ends = _segments(b)
+
+    if (len(starts) == len(ts)  and  np.array_equal(b, ts)):
+
+        # Already one aligned bar per bucket: share the source columns instead of copying them
+        return {name: cols[name] for name in ("timestamp",) + OHLCV}
+    #
+
+    return {
+        "timestamp" : b[starts],
+        "open"      : cols["open"][starts],
+        "high"      : np.maximum.reduceat(cols["high"], starts),
+        "low"       : np.minimum.reduceat(cols["low"], starts),
+        "close"     : cols["close"][ends - 1],
+        "volume"    : np.add.reduceat(cols["volume"], starts),
+    }
+#
+
+def aggregate_last(cols:Columns, col:str, kind:str, n:int) -> Columns:
+
+    """Aggregate a single time-sorted series to the requested bucket (last value per bucket)."""
+
+    ts = cols["timestamp"]
+
+    if (len(ts) == 0):
+
+        return {"timestamp": ts, col: cols[col]}
+    #
+
+    b            = bucket_start(ts, kind, n)
+    starts, ends = _segments(b)
+
+    if (len(starts) == len(ts)  and  np.array_equal(b, ts)):
+
+        return {"timestamp": ts, col: cols[col]}
+    #
+
+    return {"timestamp": b[starts], col: cols[col][ends - 1]}
+#
+
+def _slice(cols:Columns, lo:int, hi:int) -> Columns:
+
+    return {name: arr[lo:hi] for name, arr in cols.items()}
+#
+
+def aggregate_window(cols:Columns, kind:str, n:int, from_ms:int, to_ms:int, countback:Optional[int]=None, agg:Optional[Callable[[Columns], Columns]]=None) -> Columns:
+
+    """
+    Answer a UDF history request at an arbitrary bucket size by aggregating only the rows of
+    `cols` behind the returned buckets: the raw slice is cut at bucket boundaries first, so the
+    cost follows the response size, not the history length. `agg` defaults to OHLCV.
+    With `countback`, the span is widened (doubling) until enough buckets are found.
+    """
+
+    ts  = cols["timestamp"]
+    agg = (agg) if (agg is not None) else (lambda c: aggregate_ohlcv(c, kind, n))
+    end = _next_bucket(_bucket_of(to_ms - 1, kind, n), kind, n)   # buckets starting before `to_ms`
+    hi  = int(np.searchsorted(ts, end, side="left"))
+
+    if (countback is None):
+
+        start = _bucket_of(from_ms, kind, n)
+
+        if (start < from_ms):
+
+            start = _next_bucket(start, kind, n)
+        #
+
+        lo = int(np.searchsorted(ts, start, side="left"))
+
+        return (agg(_slice(cols, min(lo, hi), hi)))
+    #
+
+    countback = int(countback)
+    span      = max(1, countback) * _nominal_ms((kind, n))
+
+    while (True):
+
+        lo  = int(np.searchsorted(ts, _bucket_of(end - span, kind, n), side="left"))
+        out = agg(_slice(cols, lo, hi))
+        got = len(out["timestamp"])
+
+        if (got >= countback  or  lo == 0):
+
+            return (_slice(out, max(0, got - countback), got))
+        #
+
+        span *= 2
+    #
+#
+
+def window(ts:np.ndarray, from_ms:int, to_ms:int, countback:Optional[int]=None) -> Tuple[int, int]:
+
+    """
+    [lo, hi) slice of a sorted timestamp array answering a UDF history request: bars in
+    [from_ms, to_ms), or the last `countback` bars before `to_ms`. O(log n), no masks.
+    """
+
+    hi = int(np.searchsorted(ts, to_ms, side="left"))
+
+    if (countback is not None):
+
+        return (max(0, hi - int(countback)), hi)
+    #
+
+    lo = int(np.searchsorted(ts, from_ms, side="left"))
+
+    return (min(lo, hi), hi)
+#
+
+def bar_summary(cols:Columns) -> dict:
+
+    """
+    Summary of raw bars, stored in the registry at registration so the backend can answer
+    `/time` and range questions without reading the bars: first/last timestamp (ms), bar
+    count, min/max price (low/high, else every stored price column) and base resolution
+    (the smallest step between bars).
+    """
+
+    ts     = np.asarray(cols["timestamp"], dtype=np.int64)
+    prices = [cols[name] for name in (("low", "high") if ("low" in cols  and  "high" in cols) else (OHLCV[:4])) if (name in cols)]
+    steps  = np.diff(np.unique(ts))
+
+    lows   = [np.nanmin(p) for p in prices if (len(p)  and  not np.isnan(p).all())]
+    highs  = [np.nanmax(p) for p in prices if (len(p)  and  not np.isnan(p).all())]
+
+    return {
+        "first_timestamp" : (int(ts.min())) if (len(ts)) else (None),
+        "last_timestamp"  : (int(ts.max())) if (len(ts)) else (None),
+        "bar_count"       : int(len(ts)),
+        "min_price"       : (float(min(lows))) if (lows) else (None),
+        "max_price"       : (float(max(highs))) if (highs) else (None),
+        "base_resolution" : (step_resolution(int(steps.min()))) if (len(steps)) else (None),
+    }
+#
+
+def extend_summary(summary:Optional[dict], cols:Columns) -> dict:
+
+    """
+    `bar_summary` after appending the raw bars `cols` (at or after the last stored bar) to bars
+    summarized by `summary`, without reading them. The count and the price range assume the
+    appended rows replace at most the last stored bar, whose old prices stay in the range.
+    """
+
+    added = bar_summary(cols)
+
+    if (not summary  or  summary.get("last_timestamp") is None):
+
+        return (added)
+    #
+    if (not added["bar_count"]):
+
+        return (dict(summary))
+    #
+
+    last     = summary["last_timestamp"]
+    ts       = np.unique(np.asarray(cols["timestamp"], dtype=np.int64))
+    replaced = int(ts[0] == last)
+    steps    = [_nominal_ms(parse_resolution(res)) for res in (summary.get("base_resolution"), added["base_resolution"]) if (res)]
+
+    if (ts[0] > last):
+
+        steps.append(int(ts[0] - last))
+    #
+
+    lows  = [x for x in (summary.get("min_price"), added["min_price"]) if (x is not None)]
+    highs = [x for x in (summary.get("max_price"), added["max_price"]) if (x is not None)]
+
+    return {
+        "first_timestamp" : min(summary["first_timestamp"], added["first_timestamp"]),
+        "last_timestamp"  : max(last, added["last_timestamp"]),
+        "bar_count"       : int(summary["bar_count"]) + added["bar_count"] - replaced,
+        "min_price"       : (min(lows)) if (lows) else (None),
+        "max_price"       : (max(highs)) if (highs) else (None),
+        "base_resolution" : (step_resolution(min(steps))) if (steps) else (None),
+    }
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### BarPyramid
+#
+def sorted_columns(cols:Columns) -> Columns:
+
+    """Return `cols` ordered by timestamp (no copy when already sorted)."""
+
+    ts = cols["timestamp"]
+
+    if (len(ts) < 2  or  bool(np.all(ts[1:] >= ts[:-1]))):
+
+        return (cols)
+    #
+
+    order = np.argsort(ts, kind="stable")
+
+    return {name: arr[order] for name, arr in cols.items()}
+#
+
+def _level_name(key:LevelKey) -> str:
+
+    return (f"{key[1]}{key[0]}")
+#
+
+def _stored(store:Optional[LevelStore], name:str, build:Callable[[], Columns]) -> Columns:
+
+    return ((build()) if (store is None) else (store(name, build)))
+#
+
+class BarPyramid:
+
+    """
+    Multi-resolution bar store for one symbol.
+
+    Parameters
+    ----------
+
+    base : dict[str, np.ndarray]
+        Raw columns: int64 'timestamp' (ms), OHLCV and any extra numeric series columns.
+
+    resolutions : list[str], optional
+        Resolutions materialized by `build()` (and on first use of a series column).
+        `Default=DEFAULT_RESOLUTIONS`
+
+    store : LevelStore, optional
+        Called with each level's name and builder instead of building it in this process.
+        `Default=None`
+    """
+
+    def __init__(self, base:Columns, resolutions:Optional[List[str]]=None, store:Optional[LevelStore]=None):
+
+        self.base     = sorted_columns(base)
+        self._keys    = sorted({key for key in map(parse_resolution, resolutions or DEFAULT_RESOLUTIONS) if (key[0] != "tick")}, key=_nominal_ms)
+        self._ohlcv   = None
+        self._store   = store
+
+        # Bumped by every lazily built level: BarCache re-measures the entry only then
+        self.generation = 0
+        self._levels  : Dict[LevelKey, Columns]                      = {}
+        self._series  : Dict[str, Dict[Optional[LevelKey], Columns]] = {}
+    #
+
+    @property
+    def nbytes(self) -> int:
+
+        arrays  = list(self.base.values())
+        arrays += [a for lvl in self._levels.values() for a in lvl.values()]
+        arrays += [a for levels in self._series.values() for lvl in levels.values() for a in lvl.values()]
+
+        # Memory-mapped columns (and levels sharing them) are page cache, not process memory
+        return (sum(int(a.nbytes) for a in {id(a): a for a in arrays}.values() if (not is_mapped(a))))
+    #
+
+    def build(self) -> "BarPyramid":
+
+        """Materialize every configured resolution, finest first (no-op without OHLC columns)."""
+
+        if (not all(name in self.base for name in OHLCV[:4])):
+
+            return (self)
+        #
+
+        for key in self._keys:
+
+            self._level(key)
+        #
+
+        return (self)
+    #
+
+    def level(self, resolution:str) -> Columns:
+
+        """OHLCV columns at `resolution`, built from the nearest finer level if missing."""
+
+        return (self._level(parse_resolution(resolution)))
+    #
+
+    def series_level(self, col:str, resolution:str) -> Columns:
+
+        """{'timestamp', col} at `resolution` (last value per bucket, NaNs skipped)."""
+
+        if (col not in self._series):
+
+            self._build_series(col)
+        #
+
+        return (self._series_level(col, parse_resolution(resolution)))
+    #
+
+    def history(self, resolution:str, from_ms:int, to_ms:int, countback:Optional[int]=None) -> Columns:
+
+        """
+        OHLCV bars answering a UDF history request. Pyramid resolutions are sliced from their
+        level; any other resolution aggregates only the requested window of the finest level
+        (or raw data) that tiles it, without materializing a new level.
+        """
+
+        key = parse_resolution(resolution)
+
+        if (key in self._levels  or  key in self._keys):
+
+            lvl    = self._level(key)
+            lo, hi = window(lvl["timestamp"], from_ms, to_ms, countback)
+
+            return (_slice(lvl, lo, hi))
+        #
+
+        parent = self._parent(self._levels, key)
+        source = (self._raw_ohlcv()) if (parent is None) else (self._levels[parent])
+
+        return (aggregate_window(source, *key, from_ms, to_ms, countback))
+    #
+
+    def series_history(self, col:str, resolution:str, from_ms:int, to_ms:int, countback:Optional[int]=None) -> Columns:
+
+        """Like `history()` for one series column ({'timestamp', col}, last value per bucket)."""
+
+        if (col not in self._series):
+
+            self._build_series(col)
+        #
+
+        key    = parse_resolution(resolution)
+        levels = self._series[col]
+
+        if (key in levels  or  key in self._keys):
+
+            lvl    = self._series_level(col, key)
+            lo, hi = window(lvl["timestamp"], from_ms, to_ms, countback)
+
+            return (_slice(lvl, lo, hi))
+        #
+
+        return (aggregate_window(levels[self._parent(levels, key)], *key, from_ms, to_ms, countback, agg=lambda c: aggregate_last(c, col, *key)))
+    #
+
+    def next_time(self, resolution:str, before_ms:int, col:Optional[str]=None) -> Optional[int]:
+
+        """
+        Start (ms) of the newest `resolution` bucket starting before `before_ms` (of the series
+        `col` when given), or None when there is none: the UDF `nextTime` of an empty window.
+        Pyramid levels are searched directly; other resolutions are not materialized.
+        """
+
+        if (col is not None  and  col not in self._series):
+
+            self._build_series(col)
+        #
+
+        key    = parse_resolution(resolution)
+        levels = (self._levels) if (col is None) else (self._series[col])
+
+        if (key in levels  or  key in self._keys):
+
+            ts = ((self._level(key)) if (col is None) else (self._series_level(col, key)))["timestamp"]
+            i  = int(np.searchsorted(ts, before_ms, side="left"))
+
+            return ((int(ts[i - 1])) if (i) else (None))
+        #
+
+        return (bucket_before(self.raw(col)["timestamp"], before_ms, *key))
+    #
+
+    def raw(self, col:Optional[str]=None) -> Columns:
+
+        """Rows every level is aggregated from: clean OHLCV, or {'timestamp', col} without NaNs."""
+
+        if (col is None):
+
+            return (self._raw_ohlcv())
+        #
+
+        if (col not in self._series):
+
+            self._build_series(col)
+        #
+
+        return (self._series[col][None])
+    #
+
+    def _raw_ohlcv(self) -> Columns:
+
+        """
+        Raw OHLCV rows usable for aggregation: rows with a missing open/high/low/close are
+        dropped and a missing volume counts as 0. Clean columns are used as stored (no copy).
+        """
+
+        if (self._ohlcv is None):
+
+            ts   = self.base["timestamp"]
+            cols = {name: self.base[name] for name in OHLCV[:4]}
+            vol  = self.base.get("volume")
+            ok   = ~(np.isnan(cols["open"]) | np.isnan(cols["high"]) | np.isnan(cols["low"]) | np.isnan(cols["close"]))
+
+            if (vol is None):
+
+                vol = np.zeros(len(ts))
+            #
+            elif (np.isnan(vol).any()):
+
+                vol = np.nan_to_num(vol)
+            #
+
+            self._ohlcv = {"timestamp": ts.astype(np.int64, copy=False)}
+            self._ohlcv.update(cols)
+            self._ohlcv["volume"] = vol
+
+            if (not ok.all()):
+
+                self._ohlcv = {name: arr[ok] for name, arr in self._ohlcv.items()}
+            #
+        #
+
+        return (self._ohlcv)
+    #
+
+    def _parent(self, levels:dict, key:LevelKey):
+
+        """Smallest already-built level whose buckets tile `key`, or None for the raw data."""
+
+        parents = [k for k in levels if (k is not None  and  k != key  and  _divides(k, key))]
+
+        if (not parents):
+
+            return (None)
+        #
+
+        return (min(parents, key=lambda k: len(levels[k]["timestamp"])))
+    #
+
+    def _level(self, key:LevelKey) -> Columns:
+
+        lvl = self._levels.get(key)
+
+        if (lvl is None):
+
+            parent = self._parent(self._levels, key)
+            source = (self._raw_ohlcv()) if (parent is None) else (self._levels[parent])
+            lvl    = _stored(self._store, _level_name(key), lambda: aggregate_ohlcv(source, *key))
+
+            self._levels[key] = lvl
+            self.generation  += 1
+        #
+
+        return (lvl)
+    #
+
+    def _build_series(self, col:str):
+
+        values = self.base[col]
+        ts     = self.base["timestamp"].astype(np.int64, copy=False)
+        ok     = ~np.isnan(values)
+
+        if (ok.all()):
+
+            self._series[col] = {None: {"timestamp": ts, col: values}}
+        #
+        else:
+
+            self._series[col] = {None: {"timestamp": ts[ok], col: values[ok]}}
+        #
+
+        self.generation += 1
+
+        for key in self._keys:
+
+            self._series_level(col, key)
+        #
+    #
+
+    def _series_level(self, col:str, key:LevelKey) -> Columns:
+
+        levels = self._series[col]
+        lvl    = levels.get(key)
+
+        if (lvl is None):
+
+            parent      = self._parent(levels, key)
+            lvl         = _stored(self._store, f"{col}.{_level_name(key)}", lambda: aggregate_last(levels[parent], col, *key))
+            levels[key] = lvl
+
+            self.generation += 1
+        #
+
+        return (lvl)
+    #
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### TickStore
+#
+TICK_COLUMNS = ("timestamp", "price", "size")
+
+
+def aggregate_count(cols:Columns, n:int) -> Columns:
+
+    """Aggregate time-sorted OHLCV rows `n` at a time (N-tick bars); each bar is stamped with its first row."""
+
+    ts = cols["timestamp"]
+
+    if (len(ts) == 0  or  n == 1):
+
+        return {name: cols[name] for name in ("timestamp",) + OHLCV}
+    #
+
+    starts = np.arange(0, len(ts), n)
+    ends   = np.minimum(starts + n, len(ts))
+
+    return {
+        "timestamp" : ts[starts],
+        "open"      : cols["open"][starts],
+        "high"      : np.maximum.reduceat(cols["high"], starts),
+        "low"       : np.minimum.reduceat(cols["low"], starts),
+        "close"     : cols["close"][ends - 1],
+        "volume"    : np.add.reduceat(cols["volume"], starts),
+    }
+#
+
+def unique_times(ts:np.ndarray) -> np.ndarray:
+
+    """
+    `ts` (ms, sorted) pushed forward where needed so every value is at least 1 ms after the
+    previous one: bar times must be unique, while several N-tick bars may start in the same ms.
+    """
+
+    step = np.arange(len(ts), dtype=np.int64)
+
+    return (np.maximum.accumulate(ts.astype(np.int64, copy=False) - step) + step)
+#
+
+class TickStore:
+
+    """
+    Tick data of one symbol and the bar levels aggregated from it. Levels are built on first
+    request and kept: N-tick bars straight from the ticks, N-second bars from the finest
+    already-built seconds level that tiles them (else from the ticks).
+
+    Parameters
+    ----------
+
+    ticks : dict[str, np.ndarray]
+        int64 'timestamp' (ms), 'price' and optional 'size' (traded quantity, volume of the bars).
+
+    store : LevelStore, optional
+        As for BarPyramid. `Default=None`
+    """
+
+    def __init__(self, ticks:Columns, store:Optional[LevelStore]=None):
+
+        self.ticks   = sorted_columns(ticks)
+        self._bars   = None
+        self._store  = store
+        self._levels : Dict[LevelKey, Columns] = {}
+
+        # Bumped by every lazily built level, as for BarPyramid
+        self.generation = 0
+    #
+
+    @property
+    def nbytes(self) -> int:
+
+        arrays  = list(self.ticks.values())
+        arrays += [a for lvl in ([self._bars] if (self._bars) else ([])) + list(self._levels.values()) for a in lvl.values()]
+
+        return (sum(int(a.nbytes) for a in {id(a): a for a in arrays}.values() if (not is_mapped(a))))
+    #
+
+    def level(self, resolution:str) -> Columns:
+
+        """OHLCV bars at a tick ('100T') or seconds ('5S') resolution."""
+
+        key = parse_resolution(resolution)
+        lvl = self._levels.get(key)
+
+        if (lvl is None):
+
+            if (key[0] == "tick"):
+
+                def build() -> Columns:
+
+                    lvl              = dict(aggregate_count(self._tick_bars(), key[1]))
+                    lvl["timestamp"] = unique_times(lvl["timestamp"])
+
+                    return (lvl)
+                #
+            #
+            elif (key[0] == "sec"):
+
+                parents = [k for k in self._levels if (k[0] == "sec"  and  k != key  and  _divides(k, key))]
+                source  = (self._levels[min(parents, key=lambda k: len(self._levels[k]["timestamp"]))]) if (parents) else (None)
+                build   = lambda: aggregate_ohlcv((source) if (source is not None) else (self._tick_bars()), *key)
+            #
+            else:
+
+                raise ValueError(f"Ticks only serve tick and seconds resolutions, got '{resolution}'")
+            #
+
+            lvl = _stored(self._store, _level_name(key), build)
+
+            self._levels[key] = lvl
+            self.generation  += 1
+        #
+
+        return (lvl)
+    #
+
+    def history(self, resolution:str, from_ms:int, to_ms:int, countback:Optional[int]=None) -> Columns:
+
+        lvl    = self.level(resolution)
+        lo, hi = window(lvl["timestamp"], from_ms, to_ms, countback)
+
+        return (_slice(lvl, lo, hi))
+    #
+
+    def next_time(self, resolution:str, before_ms:int) -> Optional[int]:
+
+        """Time (ms) of the newest `resolution` bar before `before_ms`, or None."""
+
+        ts = self.level(resolution)["timestamp"]
+        i  = int(np.searchsorted(ts, before_ms, side="left"))
+
+        return ((int(ts[i - 1])) if (i) else (None))
+    #
+
+    def _tick_bars(self) -> Columns:
+
+        """Ticks viewed as one-trade OHLCV bars (price for open/high/low/close, size as volume)."""
+
+        if (self._bars is None):
+
+            ts    = self.ticks["timestamp"].astype(np.int64, copy=False)
+            price = self.ticks["price"]
+            size  = self.ticks.get("size")
+            ok    = ~np.isnan(price)
+
+            if (not ok.all()):
+
+                ts, price, size = ts[ok], price[ok], (None) if (size is None) else (size[ok])
+            #
+
+            self._bars = {
+                "timestamp" : ts,
+                "open"      : price,
+                "high"      : price,
+                "low"       : price,
+                "close"     : price,
+                "volume"    : (np.zeros(len(ts))) if (size is None) else (np.nan_to_num(size)),
+            }
+
+            self.generation += 1
+        #
+
+        return (self._bars)
+    #
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
@@ -0,0 +1,892 @@
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Modules
+#
+# Live bars: rows pushed to the backend after registration by `Symbol.append` and
+# `Symbol.update_last_bar`.
+#
+# Stored bars and their BarPyramid are never rewritten. Each ticker gets a LiveTail holding the
+# rows received since it was registered. `/history` answers from the pyramid up to the bucket the
+# tail starts in, and aggregates the remaining rows (the few stored rows of that bucket + the tail)
+# per request. `LiveHub` fans the touched bars out to the `/stream` (Server-Sent Events)
+# subscribers of every symbol and resolution. `ShapeHub` wakes the `/shapes/stream` subscribers
+# of a symbol when its drawings change.
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
+import os
+import json
+import time
+import asyncio
+import threading
+
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+
+    import fcntl                        # POSIX: journal writes of several workers are serialized by flock
+#
+except ImportError:
+
+    fcntl = None
+#
+
+import numpy  as np
+import pandas as pd
+
+from .history import Columns, OHLCV, BarPyramid, aggregate_last, aggregate_window, bucket_before, bucket_start, parse_resolution
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Rows
+#
+def live_rows(columns:Dict[str, list]) -> pd.DataFrame:
+
+    """
+    Columnar rows received from a client ({'timestamp': [ms, ...], 'close': [...], ...}) as a
+    DataFrame sorted by timestamp, one row per timestamp: repeated timestamps collapse to the last
+    given value of each column. None stands for "not given".
+    """
+
+    if ("timestamp" not in columns):
+
+        raise ValueError("bars need a 'timestamp' column (ms)")
+    #
+
+    df = pd.DataFrame({name: pd.to_numeric(pd.Series(values, dtype=object), errors="raise") for name, values in columns.items()})
+    df = df.dropna(subset=["timestamp"])
+
+    if (df.empty):
+
+        raise ValueError("no bars given")
+    #
+
+    df["timestamp"] = df["timestamp"].astype(np.int64)
+
+    return (df.groupby("timestamp", sort=True).last().reset_index())
+#
+
+def _merge_bar(current:Dict[str, float], update:Dict[str, float]) -> Dict[str, float]:
+
+    """
+    `current` bar with the given (non-NaN) fields of `update`. A new close without high/low
+    still widens the bar's range, so ticks can be pushed as closes only.
+    """
+
+    merged = dict(current)
+
+    for name, value in update.items():
+
+        if (not np.isnan(value)):
+
+            merged[name] = value
+        #
+    #
+
+    close = update.get("close", np.nan)
+
+    if (not np.isnan(close)):
+
+        if (np.isnan(update.get("high", np.nan))):
+
+            merged["high"] = np.nanmax([current.get("high", np.nan), close])
+        #
+        if (np.isnan(update.get("low", np.nan))):
+
+            merged["low"] = np.nanmin([current.get("low", np.nan), close])
+        #
+    #
+
+    return (merged)
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### LiveTail
+#
+class LiveTail:
+
+    """
+    Rows of one ticker received after registration, kept in growable NumPy columns. Updates and
+    `columns()` snapshots are serialized, so `/history` threads never see a half-applied update.
+
+    Parameters
+    ----------
+
+    data_version : int, optional
+        `data_version` of the registered bars the tail extends. Re-registering the symbol
+        (a new `data_version`) drops the tail.
+    """
+
+    def __init__(self, data_version:Optional[int]=None):
+
+        self.data_version = data_version
+        self.version      = 0
+        self._cols        : Dict[str, np.ndarray] = {"timestamp": np.empty(0, dtype=np.int64)}
+        self._n           = 0
+        self._lock        = threading.Lock()
+    #
+
+    def __len__(self) -> int:
+
+        return (self._n)
+    #
+
+    @property
+    def start(self) -> Optional[int]:
+
+        """Timestamp (ms) of the first live row: stored bars from there on are superseded."""
+
+        return ((int(self._cols["timestamp"][0])) if (self._n) else (None))
+    #
+
+    @property
+    def last(self) -> Optional[int]:
+
+        return ((int(self._cols["timestamp"][self._n - 1])) if (self._n) else (None))
+    #
+
+    def columns(self) -> Columns:
+
+        """Copy of the live rows: the last one keeps changing in place while the bar forms."""
+
+        with self._lock:
+
+            return {name: arr[:self._n].copy() for name, arr in self._cols.items()}
+        #
+    #
+
+    def upsert(self, rows:pd.DataFrame, stored_last:Optional[int]=None, seed:Optional[Callable[[], Dict[str, float]]]=None) -> Tuple[int, int]:
+
+        """
+        Merge `rows` (from `live_rows`) into the tail. A row at the timestamp of the last bar
+        updates the given fields of that bar; newer rows are appended, with missing open/high/low
+        taken from close and a missing volume counted as 0. Rows older than the last bar raise
+        ValueError.
+
+        `stored_last` is the timestamp of the last stored bar and `seed()` its values, used when
+        the first row updates it. Returns the first and last timestamps touched.
+        """
+
+        with self._lock:
+
+            return (self._upsert(rows, stored_last, seed))
+        #
+    #
+
+    def _upsert(self, rows:pd.DataFrame, stored_last:Optional[int], seed:Optional[Callable[[], Dict[str, float]]]) -> Tuple[int, int]:
+
+        last = (self.last) if (self._n) else (stored_last)
+        ts   = rows["timestamp"].to_numpy()
+
+        if (last is not None  and  ts[0] < last):
+
+            raise ValueError(f"bars must not be older than the last bar ({last} ms), got {int(ts[0])} ms")
+        #
+
+        if (last is not None  and  ts[0] == last):
+
+            update = {name: float(rows[name].iloc[0]) for name in rows.columns if (name != "timestamp")}
+            rows   = rows.iloc[1:]
+
+            if (self._n):
+
+                current = {name: float(arr[self._n - 1]) for name, arr in self._cols.items() if (name != "timestamp")}
+                self._set_last(_merge_bar(current, update))
+            #
+            else:
+
+                current = {name: float(value) for name, value in ((seed()) if (seed is not None) else ({})).items() if (name != "timestamp")}
+                self._append({"timestamp": np.array([last], dtype=np.int64), **{name: np.array([value]) for name, value in _merge_bar(current, update).items()}})
+            #
+        #
+
+        if (len(rows)):
+
+            cols = {name: rows[name].to_numpy(dtype=np.float64) for name in rows.columns if (name != "timestamp")}
+
+            if ("close" in cols):
+
+                for name in OHLCV[:3]:
+
+                    cols[name] = (np.where(np.isnan(cols[name]), cols["close"], cols[name])) if (name in cols) else (cols["close"].copy())
+                #
+            #
+
+            cols["volume"] = (np.nan_to_num(cols["volume"])) if ("volume" in cols) else (np.zeros(len(rows)))
+
+            self._append({"timestamp": rows["timestamp"].to_numpy(dtype=np.int64), **cols})
+        #
+
+        self.version = max(time.time_ns(), self.version + 1)
+
+        return (int(ts[0]), self.last)
+    #
+
+    def rows_since(self, first:int) -> Columns:
+
+        """Copy of the rows at or after `first` (ms), the tail suffix an `upsert` touched."""
+
+        with self._lock:
+
+            i = int(np.searchsorted(self._cols["timestamp"][:self._n], first, side="left"))
+
+            return {name: arr[i:self._n].copy() for name, arr in self._cols.items()}
+        #
+    #
+
+    def replace_from(self, cols:Columns, version:int) -> Tuple[int, int]:
+
+        """
+        Replace the rows at or after the first timestamp of `cols` by `cols` and take `version`:
+        replays an `upsert` made by another worker from its journal line.
+        """
+
+        with self._lock:
+
+            ts      = cols["timestamp"]
+            self._n = int(np.searchsorted(self._cols["timestamp"][:self._n], ts[0], side="left"))
+
+            self._append(cols)
+
+            self.version = int(version)
+
+            return (int(ts[0]), self.last)
+        #
+    #
+
+    def _reserve(self, n:int):
+
+        capacity = len(self._cols["timestamp"])
+
+        if (n <= capacity):
+
+            return
+        #
+
+        capacity = max(n, 2 * capacity, 1024)
+
+        for name, arr in self._cols.items():
+
+            grown            = np.full(capacity, np.nan, dtype=arr.dtype) if (arr.dtype.kind == "f") else (np.zeros(capacity, dtype=arr.dtype))
+            grown[:self._n]  = arr[:self._n]
+            self._cols[name] = grown
+        #
+    #
+
+    def _append(self, cols:Columns):
+
+        k = len(cols["timestamp"])
+
+        self._reserve(self._n + k)
+
+        for name, values in cols.items():
+
+            if (name not in self._cols):
+
+                self._cols[name] = np.full(len(self._cols["timestamp"]), np.nan)
+            #
+
+            self._cols[name][self._n:self._n + k] = values
+        #
+
+        for name, arr in self._cols.items():
+
+            if (name not in cols):
+
+                arr[self._n:self._n + k] = np.nan
+            #
+        #
+
+        self._n += k
+    #
+
+    def _set_last(self, bar:Dict[str, float]):
+
+        for name, value in bar.items():
+
+            if (name not in self._cols):
+
+                self._cols[name] = np.full(len(self._cols["timestamp"]), np.nan)
+            #
+
+            self._cols[name][self._n - 1] = value
+        #
+    #
+#
+
+JOURNAL_SUFFIX         = ".live"       # <ticker>.live: the live rows journal shared by the server workers
+JOURNAL_COMPACT_BYTES  = 1 << 20       # journals are never compacted below this size
+JOURNAL_COMPACT_FACTOR = 4             # ... and only once they hold this many times the tail's own size
+
+
+class LiveStore:
+
+    """
+    Live tails of every ticker, each bound to the `data_version` it extends.
+
+    With a `journal_dir`, every `upsert` also appends the tail rows it touched to the ticker's
+    journal (one JSON line, under an exclusive file lock), and every access first replays the
+    lines other worker processes wrote since, so all workers serve the same live bars and tail
+    versions. The ranges touched by replayed or local updates accumulate until `take_touched`
+    (or `upsert`) hands them to the `/stream` publisher.
+
+    The journal is replaced by a single line holding the whole tail when the tail starts over
+    (a new `data_version`) and when it grew `JOURNAL_COMPACT_FACTOR` times past that size, so
+    it stays proportional to the current tail.
+
+    Parameters
+    ----------
+
+    journal_dir : Path, optional
+        Directory of the `<ticker>.live` journals; None keeps the tails in this process only.
+        `Default=None`
+    """
+
+    def __init__(self, journal_dir:Optional[Path]=None):
+
+        self.journal_dir = (Path(journal_dir)) if (journal_dir is not None) else (None)
+
+        self._tails   : Dict[str, LiveTail]             = {}
+        self._offsets : Dict[str, Tuple[int, int]]      = {}     # ticker -> (journal inode, bytes replayed)
+        self._touched : Dict[str, Tuple[int, int]]      = {}     # ticker -> (first, last) ms not yet published
+        self._lock    = threading.RLock()
+    #
+
+    def get(self, ticker:str, data_version:Optional[int]=None) -> Optional[LiveTail]:
+
+        """Tail of `ticker`, or None when there is none or it extends an older registration."""
+
+        self.sync(ticker, data_version)
+
+        tail = self._tails.get(ticker)
+
+        if (tail is not None  and  tail.data_version != data_version):
+
+            with self._lock:
+
+                if (self._tails.get(ticker) is tail):
+
+                    del self._tails[ticker]
+                #
+            #
+
+            return (None)
+        #
+
+        return (tail)
+    #
+
+    def upsert(self, ticker:str, data_version:Optional[int], rows:pd.DataFrame, stored_last:Optional[int]=None, seed:Optional[Callable[[], Dict[str, float]]]=None) -> Tuple[LiveTail, int, int]:
+
+        """`LiveTail.upsert` on the tail of `ticker`; returns it with the range touched since the last publish."""
+
+        with self._lock, self._journal(ticker) as journal:
+
+            if (journal is not None):
+
+                self._replay(ticker, data_version, journal)
+            #
+
+            tail  = self._tails.get(ticker)
+            fresh = (tail is None  or  tail.data_version != data_version)
+
+            if (fresh):
+
+                tail = LiveTail(data_version)
+            #
+
+            first, last         = tail.upsert(rows, stored_last, seed)
+            self._tails[ticker] = tail
+
+            if (journal is not None):
+
+                self._write(ticker, data_version, tail, first, journal, fresh)
+            #
+
+            self._touch(ticker, first, last)
+
+            return ((tail,) + self.take_touched(ticker))
+        #
+    #
+
+    def sync(self, ticker:str, data_version:Optional[int]):
+
+        """Replay the journal lines of `ticker` written by other workers since the last sync."""
+
+        if (self.journal_dir is None):
+
+            return
+        #
+
+        try:
+
+            st = os.stat(self.journal_dir / f"{ticker}{JOURNAL_SUFFIX}")
+        #
+        except FileNotFoundError:
+
+            return
+        #
+
+        if (self._offsets.get(ticker) == (st.st_ino, st.st_size)):
+
+            return
+        #
+
+        with self._lock, self._journal(ticker, shared=True) as journal:
+
+            self._replay(ticker, data_version, journal)
+        #
+    #
+
+    def take_touched(self, ticker:str) -> Optional[Tuple[int, int]]:
+
+        """(first, last) ms touched since the last call, or None."""
+
+        with self._lock:
+
+            return (self._touched.pop(ticker, None))
+        #
+    #
+
+    def tickers(self) -> Set[str]:
+
+        """Tickers with a tail in this process or a journal written by any worker."""
+
+        names = set(self._tails)
+
+        if (self.journal_dir is not None):
+
+            names.update(path.name[:-len(JOURNAL_SUFFIX)] for path in self.journal_dir.glob(f"*{JOURNAL_SUFFIX}"))
+        #
+
+        return (names)
+    #
+
+    def version(self, ticker:str) -> int:
+
+        tail = self._tails.get(ticker)
+
+        return ((tail.version) if (tail is not None) else (0))
+    #
+
+    def stats(self) -> dict:
+
+        return {"tickers": len(self._tails), "rows": sum(len(tail) for tail in list(self._tails.values())), "journaled": self.journal_dir is not None}
+    #
+
+    @contextmanager
+    def _journal(self, ticker:str, shared:bool=False) -> Iterator:
+
+        """
+        Journal file of `ticker` opened for appending and locked (shared lock for readers); None
+        without `journal_dir`. A journal replaced while waiting for the lock is opened again.
+        """
+
+        if (self.journal_dir is None):
+
+            yield (None)
+            return
+        #
+
+        path = self.journal_dir / f"{ticker}{JOURNAL_SUFFIX}"
+
+        while (True):
+
+            journal = open(path, "a+b")
+
+            if (fcntl is not None):
+
+                fcntl.flock(journal, (fcntl.LOCK_SH) if (shared) else (fcntl.LOCK_EX))
+            #
+
+            try:
+
+                if (os.stat(path).st_ino == os.fstat(journal.fileno()).st_ino):
+
+                    break
+                #
+            #
+            except FileNotFoundError:
+
+                pass
+            #
+
+            journal.close()
+        #
+
+        with journal:
+
+            yield (journal)
+        #
+    #
+
+    def _replay(self, ticker:str, data_version:Optional[int], journal):
+
+        inode  = os.fstat(journal.fileno()).st_ino
+        offset = self._offsets.get(ticker, (inode, 0))
+        offset = (offset[1]) if (offset[0] == inode) else (0)
+
+        journal.seek(offset)
+
+        # Line by line: a worker catching up never holds more than one line in memory
+        for line in journal:
+
+            if (not line.endswith(b"\n")):
+
+                break
+            #
+
+            offset += len(line)
+            entry   = json.loads(line)
+
+            if (entry["data_version"] != data_version):
+
+                continue
+            #
+
+            tail = self._tails.get(ticker)
+
+            if (tail is None  or  tail.data_version != data_version):
+
+                tail                = LiveTail(data_version)
+                self._tails[ticker] = tail
+            #
+
+            # A compacted journal starts with the whole tail: only the rows from our last one on are new
+            if (entry.get("compact")  and  len(tail)  and  tail.version == entry["version"]):
+
+                continue
+            #
+
+            known       = (tail.last) if (entry.get("compact")  and  len(tail)) else (None)
+            cols        = {name: np.array(values, dtype=(np.int64) if (name == "timestamp") else (np.float64)) for name, values in entry["rows"].items()}
+            first, last = tail.replace_from(cols, entry["version"])
+
+            self._touch(ticker, (first) if (known is None) else (max(first, known)), last)
+        #
+
+        self._offsets[ticker] = (inode, offset)
+    #
+
+    def _write(self, ticker:str, data_version:Optional[int], tail:LiveTail, first:int, journal, fresh:bool=False):
+
+        rows = tail.rows_since(first)
+        line = _journal_line(data_version, tail.version, rows)
+        size = os.fstat(journal.fileno()).st_size + len(line)
+
+        # A new registration starts a new journal; a long one is rewritten as the tail it adds up to
+        if (fresh  or  size > max(JOURNAL_COMPACT_BYTES, JOURNAL_COMPACT_FACTOR * len(line) * len(tail) / len(rows["timestamp"]))):
+
+            self._rewrite(ticker, _journal_line(data_version, tail.version, tail.rows_since(tail.start), compact=True))
+            return
+        #
+
+        journal.write(line)
+        journal.flush()
+
+        self._offsets[ticker] = (os.fstat(journal.fileno()).st_ino, journal.tell())
+    #
+
+    def _rewrite(self, ticker:str, line:bytes):
+
+        """Replace the journal of `ticker` (locked by the caller) by `line`; waiting writers reopen it."""
+
+        path = self.journal_dir / f"{ticker}{JOURNAL_SUFFIX}"
+        tmp  = path.with_name(path.name + ".tmp")
+
+        with open(tmp, "wb") as f:
+
+            f.write(line)
+        #
+
+        os.replace(tmp, path)
+
+        self._offsets[ticker] = (os.stat(path).st_ino, len(line))
+    #
+
+    def _touch(self, ticker:str, first:int, last:int):
+
+        touched               = self._touched.get(ticker)
+        self._touched[ticker] = ((first, last)) if (touched is None) else ((min(touched[0], first), max(touched[1], last)))
+    #
+#
+
+def _journal_line(data_version:Optional[int], version:int, rows:Columns, compact:bool=False) -> bytes:
+
+    entry = {"data_version": data_version, "version": version, "rows": {name: np.where(np.isnan(arr), None, arr).tolist() if (arr.dtype.kind == "f") else (arr.tolist()) for name, arr in rows.items()}}
+
+    if (compact):
+
+        entry["compact"] = True
+    #
+
+    return (json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n")
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Queries
+#
+def _live_source(tail:LiveTail, col:Optional[str]) -> Columns:
+
+    """Tail rows usable for aggregation: complete OHLCV rows, or {'timestamp', col} without NaNs."""
+
+    cols  = tail.columns()
+    names = (("timestamp",) + OHLCV) if (col is None) else (("timestamp", col))
+
+    if (any(name not in cols for name in names)):
+
+        return {name: np.empty(0, dtype=(np.int64) if (name == "timestamp") else (np.float64)) for name in names}
+    #
+
+    ok = ~np.isnan(cols[col]) if (col is not None) else (~np.isnan(np.vstack([cols[name] for name in OHLCV[:4]])).any(axis=0))
+
+    return {name: cols[name][ok] for name in names}
+#
+
+def live_history(pyramid:BarPyramid, tail:Optional[LiveTail], resolution:str, from_ms:int, to_ms:int, countback:Optional[int]=None, col:Optional[str]=None) -> Columns:
+
+    """
+    `pyramid.history()` (or `series_history()` for `col`) extended with the live rows of `tail`:
+    buckets before the one holding the first live row come from the pyramid, the rest are
+    aggregated from that bucket's stored rows followed by the tail.
+    """
+
+    stored = (lambda to: pyramid.history(resolution, from_ms, to, countback)) if (col is None) else (lambda to: pyramid.series_history(col, resolution, from_ms, to, countback))
+
+    if (tail is None  or  not len(tail)):
+
+        return (stored(to_ms))
+    #
+
+    kind, n = parse_resolution(resolution)
+    t0      = tail.start
+    b0      = int(bucket_start(np.array([t0], dtype=np.int64), kind, n)[0])
+    head    = stored(min(to_ms, b0))
+
+    if (to_ms <= b0):
+
+        return (head)
+    #
+
+    raw    = pyramid.raw(col)
+    lo     = int(np.searchsorted(raw["timestamp"], b0, side="left"))
+    hi     = int(np.searchsorted(raw["timestamp"], t0, side="left"))
+    live   = _live_source(tail, col)
+    source = {name: np.concatenate([raw[name][lo:hi], live[name]]) for name in live}
+    agg    = (None) if (col is None) else (lambda c: aggregate_last(c, col, kind, n))
+    fresh  = aggregate_window(source, kind, n, from_ms, to_ms, countback, agg)
+    out    = {name: np.concatenate([head[name], fresh[name]]) for name in fresh}
+
+    if (countback is not None):
+
+        got = len(out["timestamp"])
+        out = {name: arr[max(0, got - int(countback)):] for name, arr in out.items()}
+    #
+
+    return (out)
+#
+
+def live_next_time(pyramid:BarPyramid, tail:Optional[LiveTail], resolution:str, before_ms:int, col:Optional[str]=None) -> Optional[int]:
+
+    """`pyramid.next_time()` taking the live rows of `tail` into account."""
+
+    if (tail is None  or  not len(tail)):
+
+        return (pyramid.next_time(resolution, before_ms, col))
+    #
+
+    # The stored rows before the tail, then the tail: only the rows next to `before_ms` matter
+    stored = pyramid.raw(col)["timestamp"]
+    stored = stored[:int(np.searchsorted(stored, tail.start, side="left"))]
+    live   = _live_source(tail, col)["timestamp"]
+    i      = int(np.searchsorted(stored, before_ms, side="left"))
+    j      = int(np.searchsorted(live, before_ms, side="left"))
+    ts     = np.concatenate([stored[max(0, i - 1):i + 1], live[max(0, j - 1):j + 1]]).astype(np.int64, copy=False)
+
+    return (bucket_before(ts, before_ms, *parse_resolution(resolution)))
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### LiveHub
+#
+class LiveHub:
+
+    """
+    `/stream` subscribers by (symbol, resolution). Each subscriber owns a bounded queue of bar
+    dicts; a slow client loses its oldest pending bars rather than blocking the publisher.
+    Every method must be called from the event loop the subscribers wait on.
+    """
+
+    def __init__(self, max_pending:int=1000):
+
+        self.max_pending = max_pending
+        self._subs       : Dict[Tuple[str, str], Set[asyncio.Queue]] = {}
+    #
+
+    def subscribe(self, symbol:str, resolution:str) -> asyncio.Queue:
+
+        queue = asyncio.Queue(maxsize=self.max_pending)
+        self._subs.setdefault((symbol, resolution), set()).add(queue)
+
+        return (queue)
+    #
+
+    def unsubscribe(self, symbol:str, resolution:str, queue:asyncio.Queue):
+
+        subs = self._subs.get((symbol, resolution))
+
+        if (subs is not None):
+
+            subs.discard(queue)
+
+            if (not subs):
+
+                del self._subs[(symbol, resolution)]
+            #
+        #
+    #
+
+    def subscriptions(self, ticker:str) -> List[Tuple[str, str]]:
+
+        """(symbol, resolution) pairs fed by `ticker`, including its '#SERIES:' symbols."""
+
+        return [(symbol, resolution) for symbol, resolution in self._subs if (symbol == ticker  or  symbol.startswith(ticker + "#SERIES:"))]
+    #
+
+    def publish(self, symbol:str, resolution:str, bars:List[dict]):
+
+        for queue in list(self._subs.get((symbol, resolution), ())):
+
+            for bar in bars:
+
+                if (queue.full()):
+
+                    queue.get_nowait()
+                #
+
+                queue.put_nowait(bar)
+            #
+        #
+    #
+
+    def tickers(self) -> Set[str]:
+
+        """Tickers feeding at least one subscriber (a '#SERIES:' symbol counts for its base ticker)."""
+
+        return {symbol.split("#SERIES:", 1)[0] for symbol, _ in self._subs}
+    #
+
+    def stats(self) -> dict:
+
+        return {"streams": len(self._subs), "subscribers": sum(len(subs) for subs in self._subs.values())}
+    #
+#
+
+class ShapeHub:
+
+    """
+    `/shapes/stream` subscribers by symbol. Subscribers hold an `asyncio.Event` set when shapes
+    of their symbol may have changed and read the changes themselves (by revision), so wake-ups
+    coalesce and none is lost. `notify` may be called from any thread, the other methods from
+    the event loop the subscribers wait on.
+    """
+
+    def __init__(self):
+
+        self.rev   = 0                  # newest shape revision this worker has notified
+        self._subs : Dict[str, Set[asyncio.Event]] = {}
+        self._loop : Optional[asyncio.AbstractEventLoop] = None
+    #
+
+    def subscribe(self, symbol:str) -> asyncio.Event:
+
+        self._loop = asyncio.get_running_loop()
+        event      = asyncio.Event()
+
+        self._subs.setdefault(symbol, set()).add(event)
+
+        return (event)
+    #
+
+    def unsubscribe(self, symbol:str, event:asyncio.Event):
+
+        subs = self._subs.get(symbol)
+
+        if (subs is not None):
+
+            subs.discard(event)
+
+            if (not subs):
+
+                del self._subs[symbol]
+            #
+        #
+    #
+
+    def notify(self, rev:int, symbols:Optional[Set[str]]=None):
+
+        """Revision `rev` was committed, touching `symbols` (every symbol when None)."""
+
+        loop = self._loop
+
+        if (loop is None  or  loop.is_closed()):
+
+            self.rev = max(self.rev, rev)
+            return
+        #
+
+        try:
+
+            running = asyncio.get_running_loop()
+        #
+        except RuntimeError:
+
+            running = None
+        #
+
+        if (running is loop):
+
+            self._wake(rev, symbols)
+        #
+        else:
+
+            loop.call_soon_threadsafe(self._wake, rev, symbols)
+        #
+    #
+
+    def _wake(self, rev:int, symbols:Optional[Set[str]]):
+
+        self.rev = max(self.rev, rev)
+
+        for symbol, subs in self._subs.items():
+
+            if (symbols is None  or  symbol in symbols):
+
+                for event in subs:
+
+                    event.set()
+                #
+            #
+        #
+    #
+
+    def listening(self) -> bool:
+
+        return (bool(self._subs))
+    #
+
+    def stats(self) -> dict:
+
+        return {"symbols": len(self._subs), "subscribers": sum(len(subs) for subs in self._subs.values()), "rev": self.rev}
+    #
+#
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
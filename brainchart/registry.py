@@ -0,0 +1,404 @@
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Modules
+#
+# runtime/datafeed/registry.json: symbol metadata shared by `Symbol._register` and the backend.
+#
+# The backend keeps one parsed Registry in memory and re-reads the file only when its signature
+# (mtime, size, inode) changes or a reload is requested, so `/config`, `/search`, `/symbols`, ...
+# never parse JSON per request. Writers replace the file atomically, so a reader never sees a
+# half-written registry. Each load also builds the SymbolIndex answering `/search`. Read-modify-write
+# updates (`Symbol._register`, `Symbol.extend`) hold `registry_lock`, so concurrent writers never
+# drop each other's entries.
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
+import os
+import json
+import bisect
+import threading
+
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+
+    import fcntl                        # POSIX: registry updates of several processes are serialized by flock
+#
+except ImportError:
+
+    fcntl = None
+#
+
+from .cache import file_signature
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Files
+#
+DEFAULT_SUPPORTED_RESOLUTIONS = ['1', '5', '15', '30', '60', '1D', '1W', '1M']
+
+
+def read_registry(path:Path) -> dict:
+
+    """Contents of `path`, or an empty registry when it is missing or unreadable."""
+
+    try:
+
+        with open(path, 'r', encoding='utf-8') as f:
+
+            registry = json.load(f)
+        #
+    #
+    except (OSError, ValueError):
+
+        return ({})
+    #
+
+    return ((registry) if (isinstance(registry, dict)) else ({}))
+#
+
+def write_registry(path:Path, registry:dict):
+
+    """Replace `path` with `registry` atomically (write a sibling file, then rename)."""
+
+    path = Path(path)
+    tmp  = path.with_name(path.name + ".tmp")
+
+    with open(tmp, 'w', encoding='utf-8') as f:
+
+        json.dump(registry, f, indent=4)
+    #
+
+    os.replace(tmp, path)
+#
+
+@contextmanager
+def registry_lock(path:Path) -> Iterator:
+
+    """
+    Exclusive lock for reading, changing and writing back the registry at `path`, held on the
+    sibling `registry.lock` file (no-op where flock is unavailable).
+    """
+
+    path = Path(path)
+
+    with open(path.with_name(path.stem + ".lock"), "a+b") as lock:
+
+        if (fcntl is not None):
+
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        #
+
+        yield
+    #
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Search
+#
+SEARCH_FIELDS = ("name", "full_name", "description")   # indexed besides the ticker itself
+
+
+def _ngrams(text:str, n:int=3) -> Set[str]:
+
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+#
+
+class SymbolIndex:
+
+    """
+    Search index over the registry symbols, ranked exact > prefix > substring (ticker matches
+    first within each rank), with exchange/type facets.
+
+    - exact     : lower-cased ticker and field values -> tickers
+    - prefix    : sorted (term, ticker) lists, one for tickers and one for field values and
+                  their words, scanned with bisect
+    - substring : trigram -> tickers, candidates verified against the lower-cased text
+
+    Parameters
+    ----------
+
+    symbols : dict[str, dict]
+        Ticker -> metadata, in registry order.
+    """
+
+    def __init__(self, symbols:Dict[str, dict]):
+
+        self._keys     = list(symbols)
+        self._order    = {key: i for i, key in enumerate(self._keys)}
+        self._exact    : Dict[str, List[str]]   = {}
+        self._tickers  : List[Tuple[str, str]]  = []
+        self._terms    : List[Tuple[str, str]]  = []
+        self._grams    : Dict[str, Set[str]]    = {}
+        self._text     : Dict[str, str]         = {}
+        self._exchange : Dict[str, Set[str]]    = {}
+        self._type     : Dict[str, Set[str]]    = {}
+
+        for key, meta in symbols.items():
+
+            ticker = key.lower()
+            values = [str(meta[f]).lower() for f in SEARCH_FIELDS if (meta.get(f))]
+            terms  = set(values) | {word for value in values for word in value.split()}
+
+            self._exact.setdefault(ticker, []).append(key)
+
+            for value in set(values) - {ticker}:
+
+                self._exact.setdefault(value, []).append(key)
+            #
+
+            self._tickers.append((ticker, key))
+            self._terms.extend((term, key) for term in terms)
+
+            self._text[key] = "\n".join([ticker] + values)
+
+            for gram in set().union(*(_ngrams(text) for text in [ticker] + values)):
+
+                self._grams.setdefault(gram, set()).add(key)
+            #
+
+            for facets, value in ((self._exchange, meta.get("exchange")), (self._type, meta.get("type"))):
+
+                if (value):
+
+                    facets.setdefault(str(value).lower(), set()).add(key)
+                #
+            #
+        #
+
+        self._tickers.sort()
+        self._terms.sort()
+    #
+
+    def search(self, query:str, exchange:Optional[str]=None, type:Optional[str]=None, limit:Optional[int]=None) -> List[str]:
+
+        """Matching tickers, best first, stopping as soon as `limit` are found."""
+
+        q       = (query or "").strip().lower()
+        allowed = None
+
+        for facets, value in ((self._exchange, exchange), (self._type, type)):
+
+            if (value):
+
+                keys    = facets.get(value.lower(), set())
+                allowed = (keys) if (allowed is None) else (allowed & keys)
+            #
+        #
+
+        ranked  = (iter(self._keys)) if (not q) else (self._ranked(q))
+        matches = []
+        seen    = set()
+
+        for key in ranked:
+
+            if (key in seen  or  (allowed is not None  and  key not in allowed)):
+
+                continue
+            #
+
+            seen.add(key)
+            matches.append(key)
+
+            if (limit  and  len(matches) >= limit):
+
+                break
+            #
+        #
+
+        return (matches)
+    #
+
+    def _ranked(self, q:str) -> Iterator[str]:
+
+        # exact: the ticker itself first, then the other fields
+        yield from sorted(self._exact.get(q, ()), key=lambda k: (k.lower() != q, self._order[k]))
+
+        # prefix
+        yield from self._prefixed(self._tickers, q)
+        yield from self._prefixed(self._terms, q)
+
+        # substring: ticker matches first, then the other fields
+        candidates = self._candidates(q)
+
+        yield from (key for key in candidates if (q in key.lower()))
+        yield from (key for key in candidates if (q in self._text[key]))
+    #
+
+    @staticmethod
+    def _prefixed(terms:List[Tuple[str, str]], q:str) -> Iterator[str]:
+
+        i = bisect.bisect_left(terms, (q, ""))
+
+        while (i < len(terms)  and  terms[i][0].startswith(q)):
+
+            yield (terms[i][1])
+            i += 1
+        #
+    #
+
+    def _candidates(self, q:str) -> List[str]:
+
+        """Tickers that may contain `q`, in registry order (every ticker for queries < 3 chars)."""
+
+        if (len(q) < 3):
+
+            return (self._keys)
+        #
+
+        sets = sorted((self._grams.get(gram, set()) for gram in _ngrams(q)), key=len)
+        keys = set.intersection(*sets) if (sets) else (set())
+
+        return (sorted(keys, key=self._order.__getitem__))
+    #
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Registry
+#
+class Registry:
+
+    """
+    One parsed registry.json and the structures derived from it at load time.
+    Treat it as read-only: it is shared by every request until the file changes.
+
+    Parameters
+    ----------
+
+    raw : dict
+        The file contents: server entries ("server_port", "server_url") and one metadata
+        dict per ticker.
+
+    signature : tuple, optional
+        File signature the registry was read at.
+    """
+
+    def __init__(self, raw:dict, signature:Optional[tuple]=None):
+
+        self.raw       = raw
+        self.signature = signature
+        self.symbols   : Dict[str, dict] = {key: meta for key, meta in raw.items() if (isinstance(meta, dict))}
+
+        resolutions = set()
+        versions    = []
+        lasts       = []
+
+        for meta in self.symbols.values():
+
+            resolutions.update(meta.get("supported_resolutions", DEFAULT_SUPPORTED_RESOLUTIONS))
+            versions.append(meta.get("data_version") or 0)
+            lasts.append((meta.get("bar_stats") or {}).get("last_timestamp"))
+        #
+
+        self.supported_resolutions : List[str]     = sorted(resolutions)
+        self.version               : Optional[int] = (max(versions)) if (versions) else (None)
+        self.index                 : SymbolIndex   = SymbolIndex(self.symbols)
+
+        # Newest bar (ms) over all symbols; None if any symbol was registered without `bar_stats`
+        self.last_timestamp        : Optional[int] = (max(lasts)) if (lasts  and  None not in lasts) else (None)
+    #
+
+    def get(self, ticker:str) -> Optional[dict]:
+
+        return (self.symbols.get(ticker))
+    #
+
+    def stats(self, ticker:str) -> Optional[dict]:
+
+        """`bar_stats` recorded by `Symbol._register` (first/last timestamp, count, ...), or None."""
+
+        meta = self.symbols.get(ticker)
+
+        return ((meta.get("bar_stats")) if (meta) else (None))
+    #
+#
+
+class RegistryStore:
+
+    """
+    In-memory, change-aware view of a registry file.
+
+    Parameters
+    ----------
+
+    path : Path
+        Location of registry.json.
+    """
+
+    def __init__(self, path:Path):
+
+        self.path      = Path(path)
+        self.loads     = 0
+        self._registry : Optional[Registry] = None
+        self._lock     = threading.Lock()
+    #
+
+    def get(self) -> Registry:
+
+        """
+        Current registry, re-read only when the file changed on disk.
+        Raises FileNotFoundError while there is no registry file.
+        """
+
+        signature = file_signature(self.path)
+        registry  = self._registry
+
+        if (registry is not None  and  registry.signature == signature):
+
+            return (registry)
+        #
+
+        with self._lock:
+
+            if (self._registry is None  or  self._registry.signature != signature):
+
+                self._load(signature)
+            #
+
+            return (self._registry)
+        #
+    #
+
+    def reload(self) -> Registry:
+
+        """Re-read the file unconditionally (reload hook)."""
+
+        with self._lock:
+
+            self._load(file_signature(self.path))
+
+            return (self._registry)
+        #
+    #
+
+    def stats(self) -> dict:
+
+        registry = self._registry
+
+        return {
+            "loads"   : self.loads,
+            "symbols" : (len(registry.symbols)) if (registry is not None) else (0),
+            "version" : (registry.version) if (registry is not None) else (None),
+        }
+    #
+
+    def _load(self, signature:tuple):
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+
+            raw = json.load(f)
+        #
+
+        self._registry = Registry((raw) if (isinstance(raw, dict)) else ({}), signature)
+        self.loads    += 1
+    #
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
@@ -0,0 +1,345 @@
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Modules
+#
+# Serialization of `/history` payloads.
+#
+# `history_json` writes the UDF {"s","t","o","h","l","c","v"} object straight from NumPy columns to
+# JSON bytes. Timestamps and prices are fixed-point decimals, so their digits are produced with
+# vectorized integer arithmetic on a byte matrix and no Python object is created per bar.
+#
+# `history_binary` is the opt-in compact alternative (`/history?format=binary`): typed
+# little-endian arrays with delta-encoded timestamps, decoded in the browser by the
+# `BrainChartDatafeed` adapter of widget.py. `history_batch_binary` frames several such payloads
+# (`/history/batch?format=binary`) into one response.
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
+from typing import List, Optional, Sequence, Tuple
+
+import json
+
+import numpy as np
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### JSON
+#
+_POW10        = 10 ** np.arange(19, dtype=np.int64)
+_MAX_DECIMALS = 9                      # floats with more decimals fall back to stdlib json
+_MAX_EXACT    = 2 ** 53                # scaled values above this are no longer exact integers
+
+_SPACE, _COMMA, _DOT, _MINUS, _ZERO = (ord(ch) for ch in " ,.-0")
+
+# "0000" ... "9999", each packed in one uint32: digits are gathered four at a time
+_QUADS = np.frombuffer("".join(f"{i:04d}" for i in range(10_000)).encode(), dtype=np.uint32)
+
+
+def _decimals(x:np.ndarray) -> Optional[int]:
+
+    """Fewest decimals k such that every value of `x` is exactly m / 10**k, or None."""
+
+    top = float(np.abs(x).max(initial=0))
+
+    for k in range(_MAX_DECIMALS + 1):
+
+        scale = float(_POW10[k])
+
+        if (top * scale >= _MAX_EXACT):
+
+            return (None)
+        #
+        if (np.array_equal(np.rint(x * scale) / scale, x)):
+
+            return (k)
+        #
+    #
+
+    return (None)
+#
+
+def _digits(a:np.ndarray, width:int) -> np.ndarray:
+
+    """(n, width) ASCII digits of non-negative int64 `a`, zero-padded on the left."""
+
+    count = -(-width // 4)
+    quads = np.empty((len(a), count), dtype=np.uint32)
+
+    for i in range(count - 1, -1, -1):
+
+        a, r        = np.divmod(a, 10_000)
+        quads[:, i] = _QUADS[r]
+    #
+
+    return (quads.view(np.uint8)[:, 4 * count - width:])
+#
+
+def _number_rows(m:np.ndarray, k:int, is_float:bool) -> np.ndarray:
+
+    """
+    One fixed-width ASCII row per value of `m / 10**k`, ending in ','. Rows are padded with
+    spaces (leading zeros, trailing zeros of the fraction) that `_split` drops; floats keep at
+    least one decimal ("1.0"), like `json.dumps`.
+    """
+
+    n     = len(m)
+    a     = np.abs(m)
+    width = len(str(int(a.max()) // int(_POW10[k])))       # integer digits of the widest number
+    frac  = (max(k, 1) + 1) if (is_float) else (0)
+    rows  = np.empty((n, 1 + width + frac + 1), dtype=np.uint8)
+
+    rows[:, 0]          = _SPACE
+    rows[:, 1:1 + width] = _digits(a // _POW10[k], width)
+    rows[:, -1]         = _COMMA
+
+    if (is_float):
+
+        rows[:, 1 + width] = _DOT
+        rows[:, 2 + width:-1] = (_digits(a % _POW10[k], k)) if (k > 0) else (_ZERO)
+
+        trailing = np.ones(n, dtype=bool)
+
+        for j in range(2 + width + k - 1, 2 + width, -1):
+
+            trailing &= (rows[:, j] == _ZERO)
+            rows[trailing, j] = _SPACE
+        #
+    #
+
+    if (width > 1):
+
+        lead = (a // _POW10[k])[:, None] < _POW10[width - 1:0:-1]        # leading zeros become spaces
+        rows[:, 1:width] -= lead.astype(np.uint8) * np.uint8(_ZERO - _SPACE)
+    #
+    else:
+
+        lead = np.zeros((n, 0), dtype=bool)
+    #
+
+    negative = np.flatnonzero(m < 0)
+
+    if (len(negative)):
+
+        rows[negative, lead[negative].sum(axis=1)] = _MINUS
+    #
+
+    return (rows)
+#
+
+def _float_rows(x:np.ndarray) -> Optional[np.ndarray]:
+
+    finite = np.isfinite(x)
+    clean  = (x) if (finite.all()) else (np.where(finite, x, 0.0))
+    k      = _decimals(clean)
+
+    if (k is None):
+
+        return (None)
+    #
+
+    rows = _number_rows(np.rint(clean * float(_POW10[k])).astype(np.int64), k, is_float=True)
+
+    if (not finite.all()):
+
+        null      = np.full(rows.shape[1], _SPACE, dtype=np.uint8)
+        null[-5:] = np.frombuffer(b"null,", dtype=np.uint8)
+
+        rows[~finite] = null
+    #
+
+    return (rows)
+#
+
+def _split(rows:np.ndarray, lengths:List[int]) -> List[bytes]:
+
+    """Cut the rows of several concatenated arrays back into one JSON array each, without padding."""
+
+    out   = []
+    start = 0
+
+    for n in lengths:
+
+        chunk  = rows[start:start + n]
+        start += n
+
+        out.append(b"[" + chunk[chunk != _SPACE].tobytes()[:-1] + b"]")
+    #
+
+    return (out)
+#
+
+def json_arrays(arrays:Sequence[np.ndarray]) -> List[bytes]:
+
+    """
+    Each of `arrays` as a JSON array, parsing back to the same numbers as
+    `json.dumps(arr.tolist())`. Integers and floats with a short decimal form (prices,
+    volumes, ...) get their digits from integer arithmetic, all arrays of a kind in one pass;
+    NaN / ±inf become null. Floats without a short decimal form use stdlib `json`.
+    """
+
+    arrays = [np.asarray(arr) for arr in arrays]
+    out    = [b"[]"] * len(arrays)
+    ints   = [i for i, arr in enumerate(arrays) if (arr.dtype.kind in "iu"  and  len(arr))]
+    floats = [i for i, arr in enumerate(arrays) if (arr.dtype.kind not in "iu"  and  len(arr))]
+
+    if (ints):
+
+        rows = _number_rows(np.concatenate([arrays[i].astype(np.int64, copy=False) for i in ints]), 0, is_float=False)
+
+        for i, encoded in zip(ints, _split(rows, [len(arrays[i]) for i in ints])):
+
+            out[i] = encoded
+        #
+    #
+
+    if (floats):
+
+        rows = _float_rows(np.concatenate([arrays[i].astype(np.float64, copy=False) for i in floats]))
+
+        if (rows is not None):
+
+            for i, encoded in zip(floats, _split(rows, [len(arrays[i]) for i in floats])):
+
+                out[i] = encoded
+            #
+        #
+        elif (len(floats) > 1):
+
+            for i in floats:
+
+                out[i] = json_arrays([arrays[i]])[0]
+            #
+        #
+        else:
+
+            values = arrays[floats[0]].astype(object)
+            values[~np.isfinite(arrays[floats[0]].astype(np.float64))] = None
+
+            out[floats[0]] = json.dumps(values.tolist(), separators=(",", ":")).encode()
+        #
+    #
+
+    return (out)
+#
+
+def history_json(t:np.ndarray, o:np.ndarray, h:np.ndarray, l:np.ndarray, c:np.ndarray, v:np.ndarray) -> bytes:
+
+    """
+    UDF `/history` "ok" payload as JSON bytes. Columns passed as the same array object
+    (e.g. a `#SERIES` symbol where o = h = l = c) are encoded once.
+    """
+
+    columns = (("t", t), ("o", o), ("h", h), ("l", l), ("c", c), ("v", v))
+    unique  = list({id(arr): arr for _, arr in columns}.values())
+    encoded = dict(zip((id(arr) for arr in unique), json_arrays(unique)))
+
+    return (b'{"s":"ok",' + b",".join(b'"' + key.encode() + b'":' + encoded[id(arr)] for key, arr in columns) + b"}")
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Binary
+#
+HISTORY_BINARY_MAGIC      = b"BCH1"
+HISTORY_BINARY_MEDIA_TYPE = "application/octet-stream"
+
+
+def _pad8(data:bytes) -> bytes:
+
+    return (data + b"\0" * (-len(data) % 8))
+#
+
+def _value_block(arr:Optional[np.ndarray]) -> Tuple[int, bytes]:
+
+    """(bytes per value, data) of one price/volume column: float32 when lossless, else float64."""
+
+    if (arr is None):
+
+        return (0, b"")
+    #
+
+    x   = np.asarray(arr, dtype=np.float64)
+    x32 = x.astype("<f4")
+
+    if (np.array_equal(x32.astype(np.float64), x, equal_nan=True)):
+
+        return (4, _pad8(x32.tobytes()))
+    #
+
+    return (8, x.astype("<f8").tobytes())
+#
+
+def history_binary(t:np.ndarray, o:Optional[np.ndarray], h:Optional[np.ndarray], l:Optional[np.ndarray], c:np.ndarray, v:Optional[np.ndarray], ms:bool=False) -> bytes:
+
+    """
+    UDF `/history` "ok" payload in the compact binary layout (little-endian, arrays 8-byte aligned):
+
+        0   b"BCH1"
+        4   uint32     n, number of bars
+        8   float64    t[0], in time units
+        16  uint8[5]   bytes per value of c, o, h, l, v: 4 (float32), 8 (float64) or 0 (absent:
+                       o/h/l equal c, no volume)
+        21  uint8      time unit: 0 = seconds, 1 = milliseconds
+        22  uint8      bytes per time delta: 4 (uint32; also 0, in older payloads) or 8 (float64,
+                       when a gap does not fit in uint32); then 1 byte of padding
+        24  deltas[n]  time units since the previous bar (0 for the first one)
+        ..  c, o, h, l, v arrays, in that order
+
+    `t` must be sorted seconds, as served by the bar pyramid, or milliseconds with `ms=True`
+    (sub-second tick bars; a gap of ~49.7 days already overflows uint32 there).
+    """
+
+    t      = np.asarray(t, dtype=np.int64)
+    n      = len(t)
+    deltas = np.diff(t, prepend=t[:1]) if (n) else (t)
+    wide   = (n > 0  and  int(deltas.max()) > np.iinfo(np.uint32).max)
+    blocks = [_value_block(arr) for arr in (c, o, h, l, v)]
+    header = (
+        HISTORY_BINARY_MAGIC
+        + np.array([n], dtype="<u4").tobytes()
+        + np.array([t[0] if (n) else (0)], dtype="<f8").tobytes()
+        + bytes(size for size, _ in blocks) + bytes([int(ms), (8) if (wide) else (4)]) + b"\0"
+    )
+
+    return (header + _pad8(deltas.astype(("<f8") if (wide) else ("<u4")).tobytes()) + b"".join(data for _, data in blocks))
+#
+
+HISTORY_BATCH_MAGIC = b"BCB1"
+
+
+def history_batch_binary(payloads:Sequence[Tuple[str, bytes]]) -> bytes:
+
+    """
+    `/history/batch` response in binary form, one entry per (symbol, payload):
+
+        0   b"BCB1"
+        4   uint32     number of entries
+        then, per entry, starting 8-byte aligned:
+        0   uint32     symbol length (UTF-8 bytes)
+        4   uint32     payload length
+        8   symbol, padded to 8 bytes
+        ..  payload, padded to 8 bytes: a `history_binary` layout, or UDF JSON ("no_data", "error")
+
+    Payloads stay 8-byte aligned within the response, so their arrays decode in place.
+    """
+
+    parts = [HISTORY_BATCH_MAGIC, np.array([len(payloads)], dtype="<u4").tobytes()]
+
+    for symbol, payload in payloads:
+
+        name = symbol.encode()
+
+        parts.append(np.array([len(name), len(payload)], dtype="<u4").tobytes())
+        parts.append(_pad8(name))
+        parts.append(_pad8(payload))
+    #
+
+    return (b"".join(parts))
+#
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
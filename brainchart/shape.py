@@ -14,6 +14,7 @@ import json
 from enum import Enum
 from typing import List, Dict, Optional, Union, Any, Sequence, Iterable
 from dataclasses import dataclass, fields
+from datetime import datetime
 
 
 from .symbol import Symbol
@@ -1008,10 +1009,50 @@ def _options_to_dict(options:Optional[Union[ShapeOptions, Dict[str, Any], Drawin
 
     raise ShapeError("options must be ShapeOptions, a dict, or a DrawingOverrides")
 #
+
+def _shape_payload(shape_type:ShapeType, points:Union[ShapePoint, Sequence[ShapePoint]], options:Optional[Union[ShapeOptions, Dict[str, Any], DrawingOverrides]]) -> Dict[str, Any]:
+
+    """Validated {shape_type, points, options} of one drawing, as the backend expects it."""
+
+    shape_value = _shape_value(shape_type)
+    pts         = _normalize_points(points)
+
+    # enforce point count
+    need = _required_points(shape_value)
+    if (len(pts) != need):
+
+        raise ShapeError(f"{shape_value}: need {need} point(s), got {len(pts)}")
+    #
+
+    return {
+        "shape_type" : shape_value,
+        "points"     : pts,
+        "options"    : _options_to_dict(options, shape_value),
+    }
+#
+
+def _shape_spec_payload(spec:Union[Sequence, Dict[str, Any]]) -> Dict[str, Any]:
+
+    """`_shape_payload` of a `CreateShapes` item: (shape_type, points[, options]) or a dict with those keys."""
+
+    if (isinstance(spec, dict)):
+
+        return (_shape_payload(spec["shape_type"], spec["points"], spec.get("options")))
+    #
+
+    if (len(spec) not in (2, 3)):
+
+        raise ShapeError("shapes: each item is (shape_type, points) or (shape_type, points, options)")
+    #
+
+    return (_shape_payload(spec[0], spec[1], (spec[2]) if (len(spec) == 3) else (None)))
+#
 ###################################################################################################
 ###################################################################################################
 ################################################################################################### Shaping
 #
+SHAPES_CHUNK_SIZE = 1000        # shapes per POST /shapes/bulk request of CreateShapes
+
 def CreateShape(symbol:Symbol|str, shape_type:ShapeType, points:Union[ShapePoint, Sequence[ShapePoint]], *, options:Optional[Union[ShapeOptions, Dict[str, Any]]]=None, shape_id:Optional[int]=None) -> Dict:
     
     """
@@ -1030,24 +1071,8 @@ def CreateShape(symbol:Symbol|str, shape_type:ShapeType, points:Union[ShapePoint
     Returns: dict (backend Shape row)
     """
 
-    server_url  = _server_url_from_registry()
-    shape_value = _shape_value(shape_type)
-    pts         = _normalize_points(points)
-
-    # enforce point count
-    need = _required_points(shape_value)
-    if (len(pts) != need):
-
-        raise ShapeError(f"{shape_value}: need {need} point(s), got {len(pts)}")
-    #
-
-    payload = {
-        "symbol"     : _symbol_str(symbol),
-        "shape_type" : shape_value,
-        "points"     : pts,
-        "options"    : _options_to_dict(options, shape_value),
-    }
-
+    server_url = _server_url_from_registry()
+    payload    = {"symbol": _symbol_str(symbol), **_shape_payload(shape_type, points, options)}
 
     if (shape_id is not None):
 
@@ -1061,6 +1086,51 @@ def CreateShape(symbol:Symbol|str, shape_type:ShapeType, points:Union[ShapePoint
     return (response.json())
 #
 
+def CreateShapes(symbol:Symbol|str, shapes:Iterable[Union[Sequence, Dict[str, Any]]], *, chunk_size:int=SHAPES_CHUNK_SIZE, server_url:Optional[str]=None) -> List[int]:
+
+    """
+    Create many drawings on one symbol through `POST /shapes/bulk`.
+
+    Parameters
+    ----------
+    symbol     : Symbol | str
+    shapes     : iterable of (shape_type, points) / (shape_type, points, options) tuples,
+                 or dicts with those keys; validated like `CreateShape`
+    chunk_size : shapes per request; each chunk is inserted in one transaction
+    server_url : backend URL, `Default=server_url of registry.json`
+
+    Every shape is validated before anything is sent. Chunks already sent stay created when
+    a later one fails.
+
+    Returns: list[int] (ids of the new shapes, in order)
+    """
+
+    payloads   = [_shape_spec_payload(spec) for spec in shapes]
+    server_url = server_url or _server_url_from_registry()
+    sym        = _symbol_str(symbol)
+    chunk_size = max(1, int(chunk_size))
+    ids        = []
+
+    with requests.Session() as session:
+
+        for start in range(0, len(payloads), chunk_size):
+
+            try:
+
+                r = session.post(f"{server_url}/shapes/bulk", json={"symbol": sym, "shapes": payloads[start:start + chunk_size]}, timeout=60)
+                r.raise_for_status()
+                ids.extend(r.json()["ids"])
+            #
+            except Exception as e:
+
+                raise ShapeError(f"CreateShapes failed after {len(ids)} shape(s): {e}") from e
+            #
+        #
+    #
+
+    return (ids)
+#
+
 def GetAllShapes(symbol:Union["Symbol", str]) -> list[dict]:
 
     """
@@ -1083,6 +1153,30 @@ def GetAllShapes(symbol:Union["Symbol", str]) -> list[dict]:
     #
 #
 
+def GetShapesBetween(symbol:Union["Symbol", str], start:Union[int, float], end:Union[int, float], server_url:str|None=None) -> list[dict]:
+
+    """
+    Return the shapes of a symbol whose time extent intersects [start, end] (seconds or ms),
+    e.g. the range shown on the chart. Horizontal lines and rays reach any range after them.
+    """
+
+    server_url = server_url or _server_url_from_registry()
+    sym        = _symbol_str(symbol)
+    params     = {"symbol": sym, "from": ShapePoint._to_seconds(start), "to": ShapePoint._to_seconds(end)}
+
+    try:
+
+        r = requests.get(f"{server_url}/shapes", params=params, timeout=10)
+        r.raise_for_status()
+        data = r.json()
+        return list(data.get("items", []))
+    #
+    except Exception as e:
+
+        raise ShapeError(f"GetShapesBetween failed: {e}") from e
+    #
+#
+
 def RemoveShape(symbol:Union["Symbol", str], shape_id:int) -> bool:
 
     """
@@ -1113,41 +1207,58 @@ def RemoveShape(symbol:Union["Symbol", str], shape_id:int) -> bool:
     #
 #
 
-def RemoveAllShapes(symbol:Union["Symbol", str]) -> int:
+def RemoveShapes(symbol:Union["Symbol", str, None]=None, *, shape_type:Optional[ShapeType]=None, ids:Optional[Iterable[int]]=None, created_before:Optional[datetime]=None, server_url:Optional[str]=None) -> int:
 
     """
-    Delete ALL shapes for a symbol.
-    Returns the count of successfully deleted rows.
+    Delete every shape matching all the given filters through `POST /shapes/delete`, a single
+    SQL DELETE on the backend. At least one filter is required.
+
+    Parameters
+    ----------
+    symbol         : Symbol | str | None
+    shape_type     : ShapeType | None
+    ids            : iterable of shape ids | None
+    created_before : datetime | None (backend local time)
+    server_url     : backend URL, `Default=server_url of registry.json`
+
+    Returns: int (number of deleted rows)
     """
 
-    items = GetAllShapes(symbol)
+    payload = {
+        "symbol"         : (_symbol_str(symbol)) if (symbol is not None) else (None),
+        "shape_type"     : (_shape_value(shape_type)) if (shape_type is not None) else (None),
+        "ids"            : ([int(i) for i in ids]) if (ids is not None) else (None),
+        "created_before" : (created_before.isoformat()) if (created_before is not None) else (None),
+    }
 
-    if not items:
+    if (all(value is None for value in payload.values())):
 
-        return 0
+        raise ShapeError("RemoveShapes: at least one filter is required")
     #
 
-    server_url = _server_url_from_registry()
-    deleted    = 0
-    for rec in items:
+    server_url = server_url or _server_url_from_registry()
 
-        try:
+    try:
 
-            rid = int(rec["id"])
-            r = requests.delete(f"{server_url}/shapes/{rid}", timeout=10)
-            if r.ok:
+        r = requests.post(f"{server_url}/shapes/delete", json=payload, timeout=60)
+        r.raise_for_status()
 
-                deleted += 1
-            #
-        #
-        except Exception:
+        return (int(r.json()["deleted"]))
+    #
+    except Exception as e:
 
-            # swallow and continue so a single failure doesn't stop the batch
-            pass
-        #
+        raise ShapeError(f"RemoveShapes failed: {e}") from e
     #
+#
 
-    return (deleted)
+def RemoveAllShapes(symbol:Union["Symbol", str], server_url:Optional[str]=None) -> int:
+
+    """
+    Delete ALL shapes for a symbol.
+    Returns the count of deleted rows.
+    """
+
+    return (RemoveShapes(symbol, server_url=server_url))
 #
 
 
@@ -1167,6 +1278,11 @@ class Shapes:
         return CreateShape(self.symbol, shape_type, points, options=options)
     #
 
+    def create_many(self, shapes:Iterable[Sequence|dict], chunk_size:int=SHAPES_CHUNK_SIZE) -> list[int]:
+
+        return CreateShapes(self.symbol, shapes, chunk_size=chunk_size, server_url=self.server_url)
+    #
+
     def update(self, shape_id:int, shape_type:ShapeType, points:ShapePoint|Sequence[ShapePoint], options:ShapeOptions|dict|DrawingOverrides|None=None) -> dict:
 
         return CreateShape(self.symbol, shape_type, points, options=options, shape_id=shape_id)
@@ -1177,14 +1293,24 @@ class Shapes:
         return GetAllShapes(self.symbol)
     #
 
+    def between(self, start:Union[int, float], end:Union[int, float]) -> list[dict]:
+
+        return GetShapesBetween(self.symbol, start, end, server_url=self.server_url)
+    #
+
     def remove(self, shape_id: int) -> bool:
 
         return RemoveShape(self.symbol, shape_id)
     #
 
+    def remove_many(self, shape_type:ShapeType|None=None, ids:Iterable[int]|None=None, created_before:datetime|None=None) -> int:
+
+        return RemoveShapes(self.symbol, shape_type=shape_type, ids=ids, created_before=created_before, server_url=self.server_url)
+    #
+
     def remove_all(self) -> int:
 
-        return RemoveAllShapes(self.symbol)
+        return RemoveAllShapes(self.symbol, server_url=self.server_url)
     #
 #
 ###################################################################################################
@@ -6,10 +6,19 @@
 from pathlib import Path
 
 import pandas as pd
-import json
+import requests
+import time
 
 from typing import List, Dict, Optional, Any, Literal
 from enum import Enum
+
+from .datastore import COMPACT_SEGMENTS, append_bars, check_price_dtype, check_storage_format, compact_in_background, list_segments, segments_dir, ticks_key, write_bars
+from .registry import read_registry, write_registry, registry_lock
+from .history import TICK_COLUMNS, TickStore, bar_summary, extend_summary
+#
+
+# Keep-alive connection for `Symbol.append` / `Symbol.update_last_bar`: live updates skip the TCP handshake
+_live_session = requests.Session()
 #
 ###################################################################################################
 ###################################################################################################
@@ -297,6 +306,12 @@ class Symbol:
         The DF.
         `Default=pd.DataFrame()`
 
+    ticks_df : pd.DataFrame, optional
+        Trades with 'timestamp' (ms), 'price' and optional 'size' columns. Stored next to the
+        bars; the backend builds N-second and N-tick ('100T') bars from them on demand.
+        Sets `has_ticks`. With an empty `tohlcv_df`, the bars are built from the ticks (1S).
+        `Default=None`
+
     ticker : str, optional
         Global unique identifier used for data requests (preferred over `name` if set).
         Avoid ":" unless following "EXCHANGE:SYMBOL" format (e.g., "NYSE:IBM").
@@ -504,6 +519,25 @@ class Symbol:
         Supported **monthly** resolutions (ascending), e.g. ["1","3","6","12"].
         Required to enable monthly resolutions. Also used to build higher multiples.
         `Default=["1"]`
+
+
+
+
+
+    storage_format : str, optional
+        On-disk format of the bars under `runtime/datafeed/`:
+        - "csv"     → plain CSV, no extra dependency.
+        - "parquet" → columnar Parquet (requires `pyarrow`).
+        - "feather" → Arrow IPC / Feather (requires `pyarrow`).
+        - "npy"     → one fixed-width `.npy` file per column, memory-mapped by the backend
+                      (best for very large symbols; the page cache is shared by all workers).
+        With the columnar formats the backend reads only the columns a request needs.
+        `Default="csv"`
+
+    price_dtype : str, optional
+        dtype of the value columns in the "npy" format: "float64" or "float32" (half the size,
+        ~7 significant digits). Timestamps are always int64.
+        `Default="float64"`
     """
 
     _tickers = []
@@ -515,6 +549,7 @@ class Symbol:
         ################################################################################################## Urgent
         #
         tohlcv_df                : pd.DataFrame                      = pd.DataFrame(),
+        ticks_df                 : Optional[pd.DataFrame]            = None,
         series_columns           : list[str]                         = None,
         series_colors            : list[str]                         = None,
         series_panels            : list[Literal['panel', 'overlay']] = None,
@@ -567,6 +602,11 @@ class Symbol:
         weekly_multipliers       : Optional[List[str]]               = ["1"],
         monthly_multipliers      : Optional[List[str]]               = ["1"],
         #
+        ################################################################################################## Storage
+        #
+        storage_format           : Literal['csv','parquet','feather','npy'] = "csv",
+        price_dtype              : Literal['float64','float32']             = "float64",
+        #
         ################################################################################################## .
         #
         # endregion
@@ -618,6 +658,7 @@ class Symbol:
 
 
         self.tohlcv_df                = tohlcv_df
+        self.ticks_df                 = ticks_df
         self.series_columns           = series_columns
         self.series_colors            = series_colors
         self.series_panels            = series_panels
@@ -651,7 +692,7 @@ class Symbol:
         self.has_daily                = has_daily
         self.has_intraday             = has_intraday
         self.has_seconds              = has_seconds
-        self.has_ticks                = has_ticks
+        self.has_ticks                = (has_ticks) or (ticks_df is not None)
         self.has_weekly_and_monthly   = has_weekly_and_monthly
         self.has_empty_bars           = has_empty_bars
         self.build_seconds_from_ticks = build_seconds_from_ticks
@@ -662,6 +703,9 @@ class Symbol:
         self.weekly_multipliers       = weekly_multipliers
         self.monthly_multipliers      = monthly_multipliers
 
+        self.storage_format           = check_storage_format(storage_format)
+        self.price_dtype              = check_price_dtype(price_dtype)
+
 
         self.session                  = session
         self.timezone                 = str(timezone)
@@ -670,6 +714,131 @@ class Symbol:
         Symbol._tickers.append(self.ticker)
     #
 
+    def append(self, bars_df:pd.DataFrame) -> dict:
+
+        """
+        Push bars received after `BrainChart(...)` registered this symbol to the running server.
+        The server keeps them in memory next to the stored bars (the stored file is not
+        rewritten) and streams every touched bar to the open charts.
+
+        Parameters
+        ----------
+
+        bars_df : pd.DataFrame
+            Same columns as `tohlcv_df` ('timestamp' in ms, OHLCV, series columns), any subset
+            but 'timestamp'. A bar at the timestamp of the last bar updates it; missing
+            open/high/low of new bars default to close and a missing volume to 0. Bars older
+            than the last bar are rejected.
+
+        Returns: dict (server reply: {"s": "ok", "rows": live rows, "version": ...})
+        """
+
+        columns = {}
+
+        for name in bars_df.columns:
+
+            if (pd.api.types.is_numeric_dtype(bars_df[name])):
+
+                values        = bars_df[name].to_numpy(dtype=object)
+                values[pd.isna(bars_df[name]).to_numpy()] = None
+                columns[name] = values.tolist()
+            #
+        #
+
+        return (self._post_live(columns))
+    #
+
+    def update_last_bar(self, timestamp:int, close:float, open:Optional[float]=None, high:Optional[float]=None, low:Optional[float]=None, volume:Optional[float]=None, **series:float) -> dict:
+
+        """
+        Update the forming bar at `timestamp` (ms) or start a new one after it. Fields left to
+        None keep their value, and a new close widens high/low, so a tick can be pushed as
+        `update_last_bar(ts, close=price)`. Extra keyword arguments set series columns.
+
+        Returns: dict (server reply, see `append`)
+        """
+
+        bar = {"timestamp": int(timestamp), "open": open, "high": high, "low": low, "close": close, "volume": volume, **series}
+
+        return (self._post_live({name: [(None) if (value is None) else (float(value))] for name, value in bar.items()}))
+    #
+
+    def extend(self, bars_df:pd.DataFrame) -> Path:
+
+        """
+        Persist bars received after registration without rewriting the stored history: `bars_df`
+        is stored as a new segment next to the bars, and only this symbol's registry entry
+        (`bar_stats`, `data_version`) is updated. A running server serves them on the next
+        request (bars pushed with `append` are dropped then, as after a re-registration).
+        Once `COMPACT_SEGMENTS` segments piled up, they are merged in a background thread.
+        Registering the symbol again writes `tohlcv_df` as is.
+
+        Parameters
+        ----------
+
+        bars_df : pd.DataFrame
+            Same columns as `tohlcv_df`, with timestamps at or after the last stored bar; a bar at
+            that timestamp replaces it.
+
+        Returns: Path (the written segment)
+        """
+
+        datafeed_dir  = Path(__file__).parent.parent / "runtime" / "datafeed"
+        registry_path = datafeed_dir / "registry.json"
+
+        datafeed_dir.mkdir(parents=True, exist_ok=True)
+
+        # Held from the last-bar check to the registry write: concurrent extends (or a
+        # re-registration) of any symbol must not overwrite each other's registry entries
+        with registry_lock(registry_path):
+
+            registry = read_registry(registry_path)
+            entry    = registry.get(self.ticker)
+
+            if (not isinstance(entry, dict)):
+
+                raise ValueError(f"Symbol '{self.ticker}' is not registered")
+            #
+
+            stats = entry.get("bar_stats") or {}
+            last  = stats.get("last_timestamp")
+
+            if (last is not None  and  len(bars_df)  and  int(bars_df["timestamp"].min()) < last):
+
+                raise ValueError(f"Bars before the last stored bar ({last}) can't be appended; register the symbol again instead")
+            #
+
+            path = append_bars(bars_df, datafeed_dir, self.ticker, self.price_dtype)
+
+            numeric           = [name for name in bars_df.columns if (pd.api.types.is_numeric_dtype(bars_df[name]))]
+            self.bar_stats    = extend_summary(stats, {name: bars_df[name].to_numpy() for name in numeric})
+            self.data_version = max(time.time_ns(), int(entry.get("data_version") or 0) + 1)
+
+            entry["bar_stats"]    = self.bar_stats
+            entry["data_version"] = self.data_version
+
+            write_registry(registry_path, registry)
+        #
+
+        if (len(list_segments(segments_dir(datafeed_dir, self.ticker))) >= COMPACT_SEGMENTS):
+
+            compact_in_background(datafeed_dir, self.ticker, self.price_dtype)
+        #
+
+        return (path)
+    #
+
+    def _post_live(self, columns:Dict[str, list]) -> dict:
+
+        root_dir   = Path(__file__).parent.parent
+        server_url = read_registry(root_dir / "runtime" / "datafeed" / "registry.json").get("server_url", "http://localhost:8000")
+
+        response = _live_session.post(f"{server_url}/bars/append", json={"symbol": self.ticker, "bars": columns}, timeout=10)
+        response.raise_for_status()
+
+        return (response.json())
+    #
+
     def _normalize_series_specs(self,
                                 default_color:str="#22c55e", default_panel:str="pane", default_style:str="line", default_width:int=1) -> list[dict]:
         
@@ -704,27 +873,29 @@ class Symbol:
         root_dir      = Path(__file__).parent.parent
         datafeed_dir  = root_dir / "runtime" / "datafeed"
         datafeed_dir.mkdir(parents=True, exist_ok=True)
-        csv_path      = datafeed_dir / f"{self.ticker}.csv"
         registry_path = datafeed_dir / "registry.json"
 
-        registry = {}
-
-        if (registry_path.exists()):
-
-            with open(registry_path, 'r', encoding='utf-8') as f:
+        # Tick data is stored like the bars; without bars, the 1S bars built from the ticks stand in
+        if (self.ticks_df is not None):
 
-                try:
+            ticks = [name for name in TICK_COLUMNS if (name in self.ticks_df.columns)]
 
-                    registry = json.load(f)
-                #
-                except Exception:
+            if (self.tohlcv_df.empty):
 
-                    registry = {}
-                #
+                self.tohlcv_df = pd.DataFrame(TickStore({name: self.ticks_df[name].to_numpy() for name in ticks}).level("1S"))
             #
+
+            write_bars(self.ticks_df[ticks], datafeed_dir, ticks_key(self.ticker), self.storage_format, self.price_dtype)
         #
 
-        
+        # Bars are written before the registry entry that announces their new version, so a
+        # client can never cache old bars under the new data_version (see fast_api ETags)
+        write_bars(self.tohlcv_df, datafeed_dir, self.ticker, self.storage_format, self.price_dtype)
+
+        # Summary of the stored bars (first/last timestamp, count, price range, base resolution),
+        # so the backend answers `/time` and range checks from the registry alone
+        numeric           = [name for name in self.tohlcv_df.columns if (pd.api.types.is_numeric_dtype(self.tohlcv_df[name]))]
+        self.bar_stats    = bar_summary({name: self.tohlcv_df[name].to_numpy() for name in numeric}) if ("timestamp" in numeric) else (None)
 
         symbol_info = self._as_dict()
         specs       = self._normalize_series_specs()
@@ -735,15 +906,19 @@ class Symbol:
             symbol_info["library_custom_fields"] = lcf
         #
 
+        # Read-modify-write under the lock, so a concurrent `extend` or registration keeps its entry
+        with registry_lock(registry_path):
 
-        registry[self.ticker] = symbol_info
+            registry          = read_registry(registry_path)
+            previous          = registry.get(self.ticker)
+            previous          = (previous.get("data_version", 0)) if (isinstance(previous, dict)) else (0)
+            self.data_version = max(time.time_ns(), int(previous) + 1)
 
-        with open(registry_path, 'w', encoding='utf-8') as f:
+            symbol_info["data_version"] = self.data_version
+            registry[self.ticker]       = symbol_info
 
-            json.dump(registry, f, indent=4)
+            write_registry(registry_path, registry)
         #
-
-        self.tohlcv_df.to_csv(csv_path, index=False)
     #
 #
 ###################################################################################################
@@ -37,6 +37,8 @@ raw_index_html                        = r'''
             //
             {javascript_function_getParameterByName}
 
+            {javascript_class_BrainChartDatafeed}
+
             {javascript_window_addEventListener}
             //
             /////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
@@ -74,6 +76,186 @@ javascript_function_getParameterByName = r'''
 '''
 #
 
+javascript_class_BrainChartDatafeed    = r'''
+            // UDF datafeed whose getBars() asks /history for the compact binary format
+            // (layout: brainchart/serialize.py::history_binary) and decodes it with typed arrays,
+            // and whose subscribeBars() listens to the /stream Server-Sent Events instead of polling.
+            // getBars() calls made together for the same window (compare symbols, #SERIES overlays)
+            // are sent as one /history/batch request.
+            const HISTORY_BATCH_DELAY = 10;     // ms getBars() calls are collected for one batch
+
+            function decodeBinaryHistory(buffer, base = 0) {
+                const view  = new DataView(buffer, base);
+                const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+                if (magic !== 'BCH1') throw new Error('Unexpected binary history payload');
+
+                const n      = view.getUint32(4, true);
+                const align8 = (size) => Math.ceil(size / 8) * 8;
+                const wide   = view.getUint8(22) === 8;   // float64 deltas: a gap overflowed uint32
+                const deltas = wide ? new Float64Array(buffer, base + 24, n) : new Uint32Array(buffer, base + 24, n);
+                const cols   = {};
+                let offset   = 24 + align8((wide ? 8 : 4) * n);
+
+                ['c', 'o', 'h', 'l', 'v'].forEach((name, i) => {
+                    const size = view.getUint8(16 + i);
+                    if (size === 0) return;
+                    cols[name] = (size === 4) ? new Float32Array(buffer, base + offset, n) : new Float64Array(buffer, base + offset, n);
+                    offset    += align8(size * n);
+                });
+
+                const bars  = new Array(n);
+                const scale = (view.getUint8(21) === 1) ? 1 : 1000;   // time unit: 0 = seconds, 1 = milliseconds
+                let time    = view.getFloat64(8, true);
+                for (let i = 0; i < n; ++i) {
+                    time += deltas[i];
+                    const close = cols.c[i];
+                    const bar   = {
+                        time  : time * scale,
+                        open  : cols.o ? cols.o[i] : close,
+                        high  : cols.h ? cols.h[i] : close,
+                        low   : cols.l ? cols.l[i] : close,
+                        close : close,
+                    };
+                    if (cols.v) bar.volume = cols.v[i];
+                    bars[i] = bar;
+                }
+                return bars;
+            }
+
+            // Split a /history/batch binary response (layout: brainchart/serialize.py::history_batch_binary)
+            // into { symbol: [offset, length] } of its payloads
+            function splitBinaryBatch(buffer) {
+                const view    = new DataView(buffer);
+                const magic   = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+                if (magic !== 'BCB1') throw new Error('Unexpected binary batch payload');
+
+                const align8  = (size) => Math.ceil(size / 8) * 8;
+                const decoder = new TextDecoder();
+                const entries = {};
+                let offset    = 8;
+                for (let i = view.getUint32(4, true); i > 0; --i) {
+                    const nameLength = view.getUint32(offset, true);
+                    const length     = view.getUint32(offset + 4, true);
+                    const symbol     = decoder.decode(new Uint8Array(buffer, offset + 8, nameLength));
+                    offset          += 8 + align8(nameLength);
+                    entries[symbol]  = [offset, length];
+                    offset          += align8(length);
+                }
+                return entries;
+            }
+
+            // Hand one UDF history payload (binary bars, or JSON no_data / error) to getBars() callbacks
+            function deliverHistory(data, onResult, onError) {
+                if (data.s === 'ok') {
+                    onResult(data.bars, { noData: false });
+                } else if (data.s === 'no_data') {
+                    onResult([], { noData: true, nextTime: data.nextTime });
+                } else {
+                    onError(data.errmsg || 'history request failed');
+                }
+            }
+
+            function binaryPayload(buffer, offset, length) {
+                const view = new DataView(buffer, offset, Math.min(length, 4));
+                if (length >= 4 && String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3)) === 'BCH1') {
+                    return { s: 'ok', bars: decodeBinaryHistory(buffer, offset) };
+                }
+                return JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, offset, length)));
+            }
+
+            class BrainChartDatafeed extends Datafeeds.UDFCompatibleDatafeed {
+
+                constructor(datafeedURL, updateFrequency, limitedServerResponse) {
+                    super(datafeedURL, updateFrequency, limitedServerResponse);
+                    this._brainchartUrl = datafeedURL;
+                    this._streams       = {};
+                    this._batches       = {};
+                }
+
+                subscribeBars(symbolInfo, resolution, onTick, listenerGuid, onResetCacheNeededCallback) {
+                    const params = new URLSearchParams({ symbol: symbolInfo.ticker || '', resolution: resolution });
+                    const source = new EventSource(`${this._brainchartUrl}/stream?${params}`);
+                    source.onmessage = (event) => onTick(JSON.parse(event.data));
+                    // The stored bars changed (Symbol.extend, re-registration): drop the cached ones and reload
+                    source.addEventListener('reset', () => {
+                        if (onResetCacheNeededCallback) onResetCacheNeededCallback();
+                        try { window.tvWidget.activeChart().resetData(); } catch (_) { }
+                    });
+                    this._streams[listenerGuid] = source;
+                }
+
+                unsubscribeBars(listenerGuid) {
+                    const source = this._streams[listenerGuid];
+                    if (source) {
+                        source.close();
+                        delete this._streams[listenerGuid];
+                    }
+                }
+
+                getBars(symbolInfo, resolution, periodParams, onResult, onError) {
+                    const key = [resolution, periodParams.from, periodParams.to, periodParams.countBack].join('|');
+                    let batch = this._batches[key];
+                    if (!batch) {
+                        batch = this._batches[key] = { resolution: resolution, periodParams: periodParams, requests: [] };
+                        setTimeout(() => {
+                            delete this._batches[key];
+                            this._fetchBatch(batch);
+                        }, HISTORY_BATCH_DELAY);
+                    }
+                    batch.requests.push({ symbol: symbolInfo.ticker || '', onResult: onResult, onError: onError });
+                }
+
+                _historyParams(resolution, periodParams) {
+                    const params = new URLSearchParams({
+                        resolution : resolution,
+                        from       : periodParams.from,
+                        to         : periodParams.to,
+                        format     : 'binary',
+                    });
+                    if (periodParams.countBack !== undefined) params.set('countback', periodParams.countBack);
+                    return params;
+                }
+
+                _fetchBatch(batch) {
+                    const params  = this._historyParams(batch.resolution, batch.periodParams);
+                    const symbols = [...new Set(batch.requests.map((request) => request.symbol))];
+                    const failed  = (e) => batch.requests.forEach((request) => request.onError((e && e.message) || String(e)));
+
+                    // A lone symbol keeps the plain /history request (and its HTTP caching)
+                    if (symbols.length === 1) {
+                        params.set('symbol', symbols[0]);
+                        fetch(`${this._brainchartUrl}/history?${params}`, { credentials: 'same-origin' })
+                            .then(async (response) => {
+                                const buffer = await response.arrayBuffer();
+                                const data   = binaryPayload(buffer, 0, buffer.byteLength);
+                                batch.requests.forEach((request) => deliverHistory(data, request.onResult, request.onError));
+                            })
+                            .catch(failed);
+                        return;
+                    }
+
+                    symbols.forEach((symbol) => params.append('symbols', symbol));
+                    fetch(`${this._brainchartUrl}/history/batch?${params}`, { credentials: 'same-origin' })
+                        .then(async (response) => {
+                            if (!(response.headers.get('Content-Type') || '').startsWith('application/octet-stream')) {
+                                const data = await response.json();
+                                throw new Error(data.errmsg || data.detail || 'history request failed');
+                            }
+                            const buffer  = await response.arrayBuffer();
+                            const entries = splitBinaryBatch(buffer);
+                            const decoded = {};
+                            symbols.forEach((symbol) => {
+                                const entry     = entries[symbol];
+                                decoded[symbol] = entry ? binaryPayload(buffer, entry[0], entry[1]) : { s: 'error', errmsg: 'missing from batch' };
+                            });
+                            batch.requests.forEach((request) => deliverHistory(decoded[request.symbol], request.onResult, request.onError));
+                        })
+                        .catch(failed);
+                }
+            }
+'''
+#
+
 javascript_window_addEventListener     = r'''
             window.addEventListener('DOMContentLoaded', initOnReady, false);
 '''
@@ -317,11 +499,21 @@ function_onChartReady = r'''
                     const serverIdByEntityId = new Map();  // entityId (number) -> server shape id
                     const pendingCreates = [];         // queue of server IDs that we're about to create
                     const suppressDbDelete = new Set();  // entityIds we're removing programmatically (don't DELETE)
-                    const sigById = new Map();  // server shape id -> last signature
-
-
-                    const POLL_MS = 1500;
+                    const revById = new Map();  // server shape id -> revision drawn
+                    const undrawnById = new Map();  // server shape id -> record the chart refused to draw yet (retried on refresh)
+                    let shapesRev = 0;                  // high-water mark of the last /shapes?since= answer
+                    let refreshing = null;              // running incrementalRefresh(), calls overlapping it wait for it
+                    let shapesEpoch = 0;                // bumped by clearRendered(), a refresh started before it is dropped
+                    let shapeWindow = null;             // { from, to } (s) the drawn shapes are scoped to; null: every shape
+                    const WINDOW_MARGIN = 1;            // visible spans loaded on each side, so scrolling does not refetch at once
+                    const WINDOW_SHRINK = 4;            // after zooming in this far, scope the shapes again
+
+
+                    const POLL_MS = 1500;               // fallback polling while /shapes/stream is unavailable
+                    const STREAM_RETRY_MS = 5000;       // delay before reopening a lost /shapes/stream
                     let pollTimer = null;
+                    let shapeStream = null;
+                    let streamRetry = null;
 
 
                     // Map TradingView drawing events <-> DB sync
@@ -342,7 +534,7 @@ function_onChartReady = r'''
                                 if (sid != null) {
                                     serverIdByEntityId.delete(entityId);
                                     renderedById.delete(sid);
-                                    sigById.delete(sid);
+                                    revById.delete(sid);
                                 }
                                 return;
                             }
@@ -355,7 +547,7 @@ function_onChartReady = r'''
                                     .finally(() => {
                                         serverIdByEntityId.delete(entityId);
                                         renderedById.delete(sid);
-                                        sigById.delete(sid);
+                                        revById.delete(sid);
                                     });
                             }
                         }
@@ -375,39 +567,52 @@ function_onChartReady = r'''
                         });
                     }
 
-                    function makeSig(rec) {
-                        const pts = toPoints(rec.points);
-                        const opts = rec.options || {};
-
-                        const uniq = (rec.id != null) ? `#${rec.id}` : `#${Math.random().toString(36).slice(2)}`;
-                        return `${rec.symbol}|${rec.shape_type}|${JSON.stringify(pts)}|${JSON.stringify(opts)}${uniq}`;
-                    }
-
                     function clearRendered() {
                         for (const id of renderedById.values()) {
+                            // Removed to redraw, not by the user — don't DELETE
+                            suppressDbDelete.add(id);
                             try { chart.removeEntity(id); } catch (_) { }
                         }
                         renderedById.clear();
                         serverIdByEntityId.clear();
-                        sigById.clear();
+                        revById.clear();
+                        undrawnById.clear();
+                        shapesRev = 0;
+                        shapesEpoch += 1;
+                        shapeWindow = null;
                     }
 
-                    async function fetchShapes(sym) {
+                    function windowQuery() {
+                        return shapeWindow ? `&from=${shapeWindow.from}&to=${shapeWindow.to}` : '';
+                    }
+
+                    // Shapes of `sym` in the window changed after revision `since` (all live ones for 0): { items, deleted, rev, reset }
+                    async function fetchShapes(sym, since) {
                         try {
-                            const r = await fetch(`/shapes?symbol=${encodeURIComponent(sym)}`, { cache: 'no-store' });
-                            if (!r.ok) return [];
-                            const j = await r.json();
-                            return j.items || [];
-                        } catch (_) { return []; }
+                            const r = await fetch(`/shapes?symbol=${encodeURIComponent(sym)}&since=${since}${windowQuery()}`, { cache: 'no-store' });
+                            if (!r.ok) return null;
+                            return await r.json();
+                        } catch (_) { return null; }
+                    }
+
+                    function undraw(sid) {
+                        undrawnById.delete(sid);
+                        const entityId = renderedById.get(sid);
+                        if (entityId == null) return;
+                        // We're removing because the server says it's gone — don't DELETE again
+                        suppressDbDelete.add(entityId);
+                        try { chart.removeEntity(entityId); } catch (_) { }
+                        renderedById.delete(sid);
+                        serverIdByEntityId.delete(entityId);
+                        revById.delete(sid);
                     }
 
                     async function draw(rec) {
-                        const sig = makeSig(rec);
                         const pts = toPoints(rec.points);
                         const opts = Object.assign({ shape: rec.shape_type }, rec.options || {});
 
                         // If this id already exists and content did not change, skip
-                        if (rec.id && sigById.get(rec.id) === sig) return;
+                        if (rec.id && revById.get(rec.id) >= rec.rev) return;
 
                         // Update existing entity in-place if this id is already on the chart
                         if (rec.id && renderedById.has(rec.id)) {
@@ -417,7 +622,7 @@ function_onChartReady = r'''
                                 if (api) {
                                     api.setPoints(pts);
                                     api.setProperties(opts);
-                                    sigById.set(rec.id, sig);
+                                    revById.set(rec.id, rec.rev);
                                     return; // <-- no recreation
                                 }
                             } catch (e) { console.error(e); }
@@ -432,64 +637,117 @@ function_onChartReady = r'''
                         if (rec.id != null && entityId != null) {
                             renderedById.set(rec.id, entityId);
                             serverIdByEntityId.set(entityId, rec.id);
-                            sigById.set(rec.id, sig);
+                            revById.set(rec.id, rec.rev);
+                            undrawnById.delete(rec.id);
+                        } else if (rec.id != null) {
+                            undrawnById.set(rec.id, rec);
                         }
                     }
 
 
-                    async function incrementalRefresh() {
-                        const sym = chart.symbol();
-                        const items = await fetchShapes(sym);
-                        const incomingIds = new Set(items.map(r => r.id).filter(x => x != null));
-
-                        // add new
-                        for (const rec of items) await draw(rec);
-
-                        // remove missing (if any were deleted server-side)
-                        for (const [sid, entityId] of renderedById.entries()) {
-                            if (!incomingIds.has(sid)) {
-                                // We're removing because the server says it's gone — don't DELETE again
-                                suppressDbDelete.add(entityId);
-                                try { chart.removeEntity(entityId); } catch (_) { }
-                                renderedById.delete(sid);
-                                serverIdByEntityId.delete(entityId);
-                                sigById.delete(sid);
-                                // keep renderedSigs so reappearing identical content doesn't flicker
+                    // Apply one delta ({ items, deleted, rev, reset } from `load()`) after the ones before it;
+                    // with `reset`, start over from an empty chart. A delta with `reset` set is a full list:
+                    // every shape missing from it is gone
+                    async function syncShapes(load, reset = false) {
+                        while (refreshing) await refreshing;
+                        refreshing = (async () => {
+                            if (reset) clearRendered();
+                            const epoch = shapesEpoch;
+                            const delta = await load();
+                            if (!delta || epoch !== shapesEpoch) return;
+
+                            let gone = delta.deleted || [];
+                            if (delta.reset) {
+                                const keep = new Set((delta.items || []).map(rec => rec.id));
+                                gone = [...renderedById.keys(), ...undrawnById.keys()].filter(sid => !keep.has(sid));
                             }
-                        }
+                            for (const sid of gone) undraw(sid);
+                            for (const rec of [...undrawnById.values(), ...(delta.items || [])]) {
+                                if (epoch !== shapesEpoch) return;
+                                await draw(rec);
+                            }
+                            shapesRev = Math.max(shapesRev, delta.rev);
+                        })();
+                        try { await refreshing; } finally { refreshing = null; }
                     }
 
-                    async function fullRefresh() {
-                        clearRendered();
-                        await incrementalRefresh();
+                    // Apply only what changed on the server since the last refresh
+                    function incrementalRefresh() { return syncShapes(() => fetchShapes(chart.symbol(), shapesRev)); }
+
+                    // Scope the drawn shapes to the visible time range (plus margins): load the shapes
+                    // of a new window, remove the ones outside it, and follow the window's changes only
+                    async function loadWindow(range) {
+                        if (!range || !(range.to > range.from)) {
+                            if (!shapeStream && !pollTimer) openShapeStream();   // no range yet: every shape
+                            return;
+                        }
+                        const span = range.to - range.from;
+                        if (shapeWindow && range.from >= shapeWindow.from && range.to <= shapeWindow.to
+                            && shapeWindow.to - shapeWindow.from <= WINDOW_SHRINK * (1 + 2 * WINDOW_MARGIN) * span) return;
+
+                        shapeWindow = {
+                            from: Math.floor(range.from - WINDOW_MARGIN * span),
+                            to: Math.ceil(range.to + WINDOW_MARGIN * span),
+                        };
+                        closeShapeStream();
+                        await syncShapes(async () => {
+                            const snapshot = await fetchShapes(chart.symbol(), 0);
+                            if (snapshot) snapshot.reset = true;
+                            return snapshot;
+                        });
+                        openShapeStream();
                     }
 
                     function startPolling() { stopPolling(); pollTimer = setInterval(incrementalRefresh, POLL_MS); }
                     function stopPolling() { if (pollTimer) { clearInterval(pollTimer); pollTimer = null; } }
 
+                    // Server push: /shapes/stream sends each committed change of the symbol's shapes;
+                    // while it is lost, poll and try to reopen it from the last revision applied
+                    function openShapeStream() {
+                        closeShapeStream();
+                        if (typeof EventSource === 'undefined') { startPolling(); return; }
 
-                    // ── boot: try once now, and again after first data load (single-shot)
-                    incrementalRefresh();
+                        const sym = chart.symbol();
+                        const source = new EventSource(`/shapes/stream?symbol=${encodeURIComponent(sym)}&since=${shapesRev}${windowQuery()}`);
+                        source.onopen = () => stopPolling();
+                        source.onmessage = (event) => {
+                            const delta = JSON.parse(event.data);
+                            if (sym === chart.symbol()) syncShapes(async () => delta);
+                        };
+                        source.onerror = () => {
+                            closeShapeStream();
+                            startPolling();
+                            streamRetry = setTimeout(openShapeStream, STREAM_RETRY_MS);
+                        };
+                        shapeStream = source;
+                    }
+
+                    function closeShapeStream() {
+                        if (streamRetry) { clearTimeout(streamRetry); streamRetry = null; }
+                        if (shapeStream) { shapeStream.close(); shapeStream = null; }
+                    }
+
+
+                    // ── boot: draw the shapes of the visible range; retry what could not be drawn after first data load (single-shot)
+                    loadWindow(chart.getVisibleRange());
+                    chart.onVisibleRangeChanged().subscribe(null, (range) => loadWindow(range));
                     chart.onDataLoaded().subscribe(null, function () {
-                        incrementalRefresh();
+                        loadWindow(chart.getVisibleRange()).then(incrementalRefresh);
                     }, true);
 
-                    startPolling();
-
                     // ── symbol switch: hard reset, redraw once data is ready
                     chart.onSymbolChanged().subscribe(null, function () {
+                        closeShapeStream();
                         stopPolling();
                         clearRendered();
 
                         // draw immediately (in case data is cached already)
-                        incrementalRefresh();
+                        loadWindow(chart.getVisibleRange());
 
                         // then single-shot after bars finish loading (avoids stacking handlers)
                         chart.onDataLoaded().subscribe(null, function () {
-                            fullRefresh();
+                            loadWindow(chart.getVisibleRange()).then(incrementalRefresh);
                         }, true);
-
-                        startPolling();
                     });
 
                     // -----------------------------------------------------------------------------------------------------------------------------
@@ -1457,9 +1715,11 @@ class ChartWidget:
 
     datafeed : JavaScriptCode, required
         Datafeed implementation supplying symbols, history, and (optionally) quotes/streaming.
+        `BrainChartDatafeed` is the UDF datafeed reading history in BrainChart's binary format;
+        any UDF datafeed (JSON history) also works.
         Example:
             `new Datafeeds.UDFCompatibleDatafeed("https://demo_feed.tradingview.com")`.
-        `Default=new Datafeeds.UDFCompatibleDatafeed(datafeedUrl, undefined, {maxResponseLength: 1000, expectedOrder: 'latestFirst'})`
+        `Default=new BrainChartDatafeed(datafeedUrl, undefined, {maxResponseLength: 1000, expectedOrder: 'latestFirst'})`
 
     container : str, required
         Container element id for the widget iframe
@@ -1549,7 +1809,7 @@ class ChartWidget:
                  #
                  debug                                    : Optional[bool]                                 = False,
                  library_path                             : str                                            = "/charting_library/charting_library/",
-                 datafeed                                 : JavaScriptCode                                 = r'''new Datafeeds.UDFCompatibleDatafeed(datafeedUrl, undefined, {maxResponseLength: 1000, expectedOrder: 'latestFirst'})''',
+                 datafeed                                 : JavaScriptCode                                 = r'''new BrainChartDatafeed(datafeedUrl, undefined, {maxResponseLength: 1000, expectedOrder: 'latestFirst'})''',
                  container                                : str                                            = "tv_chart_container",
                  theme                                    : Optional[ThemeName]                            = ThemeName.dark,
                  symbol                                   : Symbol                                         = Symbol(),
@@ -1701,6 +1961,7 @@ class ChartWidget:
                                                         )
 
         html_index = raw_index_html.format(javascript_function_getParameterByName=javascript_function_getParameterByName,
+                                           javascript_class_BrainChartDatafeed=javascript_class_BrainChartDatafeed,
                                            javascript_window_addEventListener=javascript_window_addEventListener,
                                            JAVASCRIPT_FUNCTION_INITONREADY=onready,
                                           )
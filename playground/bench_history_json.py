@@ -0,0 +1,92 @@
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Modules
+#
+# Benchmark of the `/history` serialization paths:
+#   - tolist + JSONResponse : the previous path (boxed Python floats re-encoded by stdlib json)
+#   - history_json          : NumPy columns written straight to JSON bytes
+#
+# Run from the project root:  python playground/bench_history_json.py
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#
+import sys
+import json
+import timeit
+
+from pathlib import Path
+
+import numpy as np
+
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from brainchart.serialize import history_json
+#
+###################################################################################################
+###################################################################################################
+################################################################################################### Bench
+#
+def make_bars(n:int, seed:int=0) -> dict:
+
+    rng   = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+
+    return {
+        "timestamp" : 1_700_000_000 + np.arange(n, dtype=np.int64),
+        "open"      : np.round(close + rng.normal(0, 0.1, n), 4),
+        "high"      : np.round(close + 1, 4),
+        "low"       : np.round(close - 1, 4),
+        "close"     : np.round(close, 4),
+        "volume"    : rng.integers(0, 10_000, n).astype(np.float64),
+    }
+#
+
+def via_tolist(bars:dict) -> bytes:
+
+    return (JSONResponse(content={
+        "s": "ok",
+        "t": bars["timestamp"].tolist(),
+        "o": bars["open"].tolist(),
+        "h": bars["high"].tolist(),
+        "l": bars["low"].tolist(),
+        "c": bars["close"].tolist(),
+        "v": bars["volume"].tolist(),
+    }).body)
+#
+
+def via_numpy(bars:dict) -> bytes:
+
+    return (history_json(bars["timestamp"], bars["open"], bars["high"], bars["low"], bars["close"], bars["volume"]))
+#
+
+def main():
+
+    print(f"{'bars':>8} {'tolist+json (ms)':>18} {'history_json (ms)':>18} {'speedup':>8}")
+
+    for n in (1_000, 5_000, 20_000, 100_000):
+
+        bars = make_bars(n)
+
+        assert json.loads(via_tolist(bars)) == json.loads(via_numpy(bars))
+
+        reps   = max(3, 200_000 // n)
+        old_ms = min(timeit.repeat(lambda: via_tolist(bars), number=reps, repeat=5)) / reps * 1e3
+        new_ms = min(timeit.repeat(lambda: via_numpy(bars) , number=reps, repeat=5)) / reps * 1e3
+
+        print(f"{n:>8} {old_ms:>18.3f} {new_ms:>18.3f} {old_ms / new_ms:>7.1f}x")
+    #
+#
+
+if (__name__ == "__main__"):
+
+    main()
+#
+###################################################################################################
+###################################################################################################
+###################################################################################################
+#